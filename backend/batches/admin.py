@@ -0,0 +1,23 @@
+from django.contrib import admin
+from .models import BatchItem, UploadBatch
+
+
+@admin.register(UploadBatch)
+class UploadBatchAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the UploadBatch model
+    """
+
+    list_display = ("id", "total", "created_at", "updated_at")
+    readonly_fields = ("id", "created_at", "updated_at")
+
+
+@admin.register(BatchItem)
+class BatchItemAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the BatchItem model
+    """
+
+    list_display = ("id", "name", "batch", "file", "created_at")
+    search_fields = ("name",)
+    readonly_fields = ("id", "batch", "file", "session", "error", "created_at")
@@ -0,0 +1,169 @@
+"""
+Server-sent events for upload batches
+
+Every server process keeps one feed per batch that has viewers. The feed polls
+the batch state and pushes the items that changed, then a progress summary, to
+all of its subscribers, so the database is read once per interval no matter
+how many clients follow the batch. A new subscriber first receives the whole
+current state, which also makes reconnecting after a dropped connection safe.
+
+Streams end once the batch is done, and otherwise after
+`UPLOAD_BATCH_EVENTS_MAX_DURATION` seconds. Browsers' EventSource reconnects
+by itself, and the limit stops streams to clients that went away, which the
+server may not notice.
+"""
+
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .progress import batch_state, summarize
+
+# Milliseconds clients wait before reconnecting
+RETRY_MS = 2000
+
+feeds = {}
+
+
+def encode(event, data):
+    """
+    One server-sent event with a JSON payload
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class Changes:
+    """
+    Turns successive batch states into the events that bring a client from
+    one state to the next
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.progress = None
+
+    def update(self, state):
+        if state is None:
+            return [("gone", {})]
+        total, states = state
+        events = [
+            ("item", item) for item in states if self.items.get(item["id"]) != item
+        ]
+        self.items = {item["id"]: item for item in states}
+        progress = summarize(total, states)
+        if events or progress != self.progress:
+            events.append(("progress", progress))
+        self.progress = progress
+        if progress["done"]:
+            events.append(("done", progress))
+        return events
+
+    def replay(self):
+        """
+        Events describing the whole current state
+        """
+        if self.progress is None:
+            return []
+        events = [("item", item) for item in self.items.values()]
+        events.append(("progress", self.progress))
+        if self.progress["done"]:
+            events.append(("done", self.progress))
+        return events
+
+
+class BatchFeed:
+    """
+    Polls one batch while anyone in this process follows it
+    """
+
+    def __init__(self, batch_id):
+        self.batch_id = batch_id
+        self.changes = Changes()
+        self.subscribers = set()
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue()
+        for event in self.changes.replay():
+            queue.put_nowait(event)
+        self.subscribers.add(queue)
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers:
+            self.stop()
+
+    def stop(self):
+        if feeds.get(self.batch_id) is self:
+            del feeds[self.batch_id]
+        if self.task is not None and self.task is not asyncio.current_task():
+            self.task.cancel()
+
+    async def run(self):
+        while True:
+            state = await sync_to_async(batch_state)(self.batch_id)
+            events = self.changes.update(state)
+            for queue in self.subscribers:
+                for event in events:
+                    queue.put_nowait(event)
+            if events and events[-1][0] in ("done", "gone"):
+                # Later viewers get a new feed that reports the final state
+                self.stop()
+                return
+            await asyncio.sleep(settings.UPLOAD_BATCH_EVENTS_POLL_INTERVAL)
+
+
+async def stream(batch_id):
+    """
+    Event stream of a batch for one client, fed by the shared feed
+    """
+    feed = feeds.get(batch_id)
+    if feed is None:
+        feed = feeds[batch_id] = BatchFeed(batch_id)
+    queue = feed.subscribe()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.UPLOAD_BATCH_EVENTS_MAX_DURATION
+    try:
+        yield f"retry: {RETRY_MS}\n\n".encode()
+        while loop.time() < deadline:
+            try:
+                event, data = await asyncio.wait_for(
+                    queue.get(), settings.UPLOAD_BATCH_EVENTS_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield b": keep-alive\n\n"
+                continue
+            yield encode(event, data)
+            if event in ("done", "gone"):
+                return
+    finally:
+        feed.unsubscribe(queue)
+
+
+def stream_sync(batch_id):
+    """
+    Event stream of a batch for WSGI servers, polling on its own
+    """
+    changes = Changes()
+    deadline = time.monotonic() + settings.UPLOAD_BATCH_EVENTS_MAX_DURATION
+    last_sent = time.monotonic()
+    yield f"retry: {RETRY_MS}\n\n".encode()
+    while time.monotonic() < deadline:
+        events = changes.update(batch_state(batch_id))
+        for event, data in events:
+            yield encode(event, data)
+        if events:
+            last_sent = time.monotonic()
+            if events[-1][0] in ("done", "gone"):
+                return
+        elif time.monotonic() - last_sent > settings.UPLOAD_BATCH_EVENTS_HEARTBEAT:
+            last_sent = time.monotonic()
+            yield b": keep-alive\n\n"
+        time.sleep(settings.UPLOAD_BATCH_EVENTS_POLL_INTERVAL)
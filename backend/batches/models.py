@@ -0,0 +1,107 @@
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from files.models import File, UploadSession
+
+
+class UploadBatchQuerySet(models.QuerySet):
+    def expired(self):
+        """
+        Batches older than their time-to-live
+        """
+        cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_BATCH_TTL)
+        return self.filter(created_at__lt=cutoff)
+
+    def purge_expired(self, limit=None):
+        """
+        Delete expired batches and their items, not the files
+        Returns the number of batches removed
+        """
+        ids = self.expired().order_by("created_at").values_list("pk", flat=True)
+        if limit is not None:
+            ids = ids[:limit]
+        purged, _ = self.filter(pk__in=list(ids)).delete()
+        return purged
+
+
+class UploadBatch(models.Model):
+    """
+    Group of files uploaded together, followed until they are parsed
+    """
+
+    id = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False, verbose_name=_("Batch ID")
+    )
+    total = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text=_("Number of files the batch will hold, if known"),
+        verbose_name=_("Total"),
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    objects = UploadBatchQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Upload Batch")
+        verbose_name_plural = _("Upload Batches")
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return str(self.id)
+
+
+class BatchItem(models.Model):
+    """
+    File of an upload batch, received directly or through an upload session
+
+    Only what happens on upload is stored here; whether the file is parsed is
+    read from its parse jobs, so items never go stale.
+    """
+
+    class Status(models.TextChoices):
+        RECEIVED = "received", _("Received")
+        STORED = "stored", _("Stored")
+        PARSED = "parsed", _("Parsed")
+        FAILED = "failed", _("Failed")
+
+    id = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False, verbose_name=_("Item ID")
+    )
+    batch = models.ForeignKey(
+        UploadBatch,
+        on_delete=models.CASCADE,
+        related_name="items",
+        verbose_name=_("Batch"),
+    )
+    name = models.CharField(max_length=255, verbose_name=_("Name"))
+    file = models.ForeignKey(
+        File,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="batch_items",
+        verbose_name=_("File"),
+    )
+    session = models.ForeignKey(
+        UploadSession,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="batch_items",
+        verbose_name=_("Upload Session"),
+    )
+    error = models.TextField(blank=True, verbose_name=_("Error"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+
+    class Meta:
+        verbose_name = _("Batch Item")
+        verbose_name_plural = _("Batch Items")
+        ordering = ["created_at", "id"]
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,82 @@
+"""
+Progress of upload batches
+
+The state of every item is derived in a single query from what the database
+already records: the item's upload error and file, the file's parse result and
+its latest parse job. The parse worker and every server process therefore see
+the same progress without any message passing between them.
+"""
+
+from django.db.models import Exists, OuterRef, Subquery
+from parsing.models import ParseJob, ParseResult
+
+from .models import BatchItem, UploadBatch
+
+Status = BatchItem.Status
+# States an item does not leave any more
+FINAL_STATUSES = {Status.PARSED, Status.FAILED}
+
+
+def item_status(row):
+    """
+    Status and error of an item row annotated by `batch_state`
+    """
+    if row["error"]:
+        return Status.FAILED, row["error"]
+    if row["file"] is None:
+        return Status.RECEIVED, ""
+    if row["parsed"]:
+        return Status.PARSED, ""
+    if row["job_status"] == ParseJob.Status.FAILED:
+        return Status.FAILED, row["job_error"]
+    return Status.STORED, ""
+
+
+def batch_state(batch_id):
+    """
+    (total, item states) of a batch, or None if it does not exist
+    Item states are dicts of id, name, file, status and error, in upload order.
+    """
+    batch = UploadBatch.objects.filter(pk=batch_id).values("total").first()
+    if batch is None:
+        return None
+    jobs = ParseJob.objects.filter(file=OuterRef("file")).order_by("-queued_at")
+    rows = (
+        BatchItem.objects.filter(batch_id=batch_id)
+        .annotate(
+            parsed=Exists(ParseResult.objects.filter(file=OuterRef("file"))),
+            job_status=Subquery(jobs.values("status")[:1]),
+            job_error=Subquery(jobs.values("error")[:1]),
+        )
+        .values("id", "name", "file", "error", "parsed", "job_status", "job_error")
+    )
+    states = []
+    for row in rows:
+        status, error = item_status(row)
+        states.append(
+            {
+                "id": str(row["id"]),
+                "name": row["name"],
+                "file": str(row["file"]) if row["file"] else None,
+                "status": status.value,
+                "error": error,
+            }
+        )
+    return batch["total"], states
+
+
+def summarize(total, states):
+    """
+    Counts of items per status, and whether the batch is done: every expected
+    file has arrived and none of them is waiting to be stored or parsed
+    """
+    counts = {status.value: 0 for status in Status}
+    for state in states:
+        counts[state["status"]] += 1
+    finished = counts[Status.PARSED] + counts[Status.FAILED]
+    expected = max(total or 0, len(states))
+    return {
+        "total": expected,
+        **counts,
+        "done": bool(states) and finished == expected,
+    }
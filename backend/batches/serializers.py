@@ -0,0 +1,72 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from .models import BatchItem, UploadBatch
+
+
+class UploadBatchSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the UploadBatch model
+    """
+
+    events_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadBatch
+        fields = ["id", "total", "events_url", "created_at", "updated_at"]
+        read_only_fields = ["id", "created_at", "updated_at"]
+
+    def get_events_url(self, obj) -> str:
+        """
+        Get the full URL of the batch's event stream
+        """
+        url = reverse("batch-events", kwargs={"pk": obj.pk})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
+
+class BatchItemStateSerializer(serializers.Serializer):
+    """
+    Current state of a file in a batch
+    """
+
+    id = serializers.UUIDField()
+    name = serializers.CharField()
+    file = serializers.UUIDField(allow_null=True)
+    status = serializers.ChoiceField(choices=BatchItem.Status.choices)
+    error = serializers.CharField(allow_blank=True)
+
+
+class BatchProgressSerializer(serializers.Serializer):
+    """
+    Counts of the files of a batch per status
+    """
+
+    total = serializers.IntegerField()
+    received = serializers.IntegerField()
+    stored = serializers.IntegerField()
+    parsed = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    done = serializers.BooleanField()
+
+
+class UploadBatchStateSerializer(UploadBatchSerializer):
+    """
+    Batch with the state of its files, for documentation
+    """
+
+    progress = BatchProgressSerializer()
+    items = BatchItemStateSerializer(many=True)
+
+    class Meta(UploadBatchSerializer.Meta):
+        fields = UploadBatchSerializer.Meta.fields + ["progress", "items"]
+
+
+class BatchAttachSerializer(serializers.Serializer):
+    """
+    Files already uploaded, or upload sessions still in progress, to add to a
+    batch
+    """
+
+    files = serializers.ListField(child=serializers.UUIDField(), required=False)
+    sessions = serializers.ListField(child=serializers.UUIDField(), required=False)
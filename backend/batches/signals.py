@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from files.models import UploadSession
+
+from .models import BatchItem
+
+
+@receiver(post_save, sender=UploadSession)
+def link_finalized_session(sender, instance, raw=False, **kwargs):
+    """
+    Give batch items the file their upload session was finalized into, as
+    sessions are removed some time after finalizing
+    """
+    if instance.file_id and not raw:
+        BatchItem.objects.filter(session=instance, file__isnull=True).update(
+            file=instance.file_id
+        )
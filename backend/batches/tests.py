@@ -0,0 +1,109 @@
+import asyncio
+import json
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from files.testing import MediaTestCase
+from parsing.models import ParseResult
+
+from . import events
+from .models import UploadBatch
+
+
+def parse_events(content):
+    """
+    (event, data) pairs of a server-sent event stream, without comments
+    """
+    parsed = []
+    for message in content.decode().split("\n\n"):
+        fields = dict(
+            line.split(": ", 1)
+            for line in message.splitlines()
+            if line and not line.startswith(":")
+        )
+        if "event" in fields:
+            parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+
+@override_settings(
+    UPLOAD_BATCH_EVENTS_POLL_INTERVAL=0.01,
+    UPLOAD_BATCH_EVENTS_MAX_DURATION=5,
+)
+class BatchEventsTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        response = self.client.post("/api/v1/batches/", {"total": 2})
+        self.assertEqual(response.status_code, 201)
+        self.batch_id = response.json()["id"]
+        self.url = f"/api/v1/batches/{self.batch_id}/events/"
+        uploads = [
+            SimpleUploadedFile("a.pdf", b"%PDF-1.4 a"),
+            SimpleUploadedFile("empty.pdf", b""),
+        ]
+        response = self.client.post(
+            f"/api/v1/batches/{self.batch_id}/files/", {"file": uploads}
+        )
+        self.assertEqual(response.status_code, 207)
+        self.file_id = response.json()["results"][0]["id"]
+
+    def parse(self):
+        ParseResult.objects.create(
+            file_id=self.file_id, parser_version="1", data={"pages": []}
+        )
+
+    def assertDone(self, received):
+        names = [event for event, _ in received]
+        self.assertEqual(names[-2:], ["progress", "done"])
+        items = {data["name"]: data for event, data in received if event == "item"}
+        self.assertEqual(items["a.pdf"]["status"], "parsed")
+        self.assertEqual(items["a.pdf"]["file"], self.file_id)
+        self.assertEqual(items["empty.pdf"]["status"], "failed")
+        self.assertIn("empty", items["empty.pdf"]["error"])
+        progress = received[-1][1]
+        self.assertEqual((progress["parsed"], progress["failed"]), (1, 1))
+        self.assertTrue(progress["done"])
+
+    def test_finished_batch(self):
+        self.parse()
+        response = self.client.get(self.url)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = b"".join(response.streaming_content)
+        self.assertTrue(content.startswith(b"retry: "))
+        self.assertDone(parse_events(content))
+
+    @override_settings(UPLOAD_BATCH_EVENTS_MAX_DURATION=0.05)
+    def test_stream_ends_after_max_duration(self):
+        received = parse_events(b"".join(self.client.get(self.url).streaming_content))
+        self.assertEqual([event for event, _ in received][-1], "progress")
+        self.assertEqual(received[-1][1]["stored"], 1)
+        self.assertFalse(received[-1][1]["done"])
+
+    async def test_asgi_stream_follows_changes(self):
+        response = await self.async_client.get(self.url)
+        chunks = aiter(response.streaming_content)
+        received = []
+        while not received or received[-1][0] != "progress":
+            received += parse_events(await anext(chunks))
+        self.assertEqual(received[-1][1]["stored"], 1)
+        # Fed by the feed this process keeps for the batch
+        feed = events.feeds[uuid.UUID(self.batch_id)]
+        self.assertEqual(len(feed.subscribers), 1)
+
+        await sync_to_async(self.parse)()
+
+        async def rest():
+            return [chunk async for chunk in chunks]
+
+        received = parse_events(b"".join(await asyncio.wait_for(rest(), 5)))
+        self.assertEqual(received[0][0], "item")
+        self.assertEqual(received[0][1]["status"], "parsed")
+        self.assertEqual([event for event, _ in received][-2:], ["progress", "done"])
+        self.assertNotIn(feed.batch_id, events.feeds)
+
+    def test_unknown_batch(self):
+        UploadBatch.objects.all().delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
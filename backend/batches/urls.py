@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import BatchEventsView
+
+urlpatterns = [
+    path("batches/<uuid:pk>/events/", BatchEventsView.as_view(), name="batch-events"),
+]
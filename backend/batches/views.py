@@ -0,0 +1,177 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.views import View
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema, extend_schema_view
+from files.bulk import create_files
+from files.models import File, UploadSession
+from files.serializers import BulkResultSerializer, BulkUploadSerializer
+from files.views import bulk_response, json_response
+from .events import stream, stream_sync
+from .models import BatchItem, UploadBatch
+from .progress import batch_state, summarize
+from .serializers import BatchAttachSerializer, UploadBatchSerializer
+from .serializers import UploadBatchStateSerializer
+
+
+def error_text(errors):
+    """
+    Validation errors of an upload as one line of text
+    """
+    if isinstance(errors, dict):
+        return "; ".join(
+            f"{field}: {' '.join(map(str, messages))}"
+            for field, messages in errors.items()
+        )
+    return " ".join(map(str, errors))
+
+
+@extend_schema_view(
+    create=extend_schema(
+        description="Open a batch, optionally with the number of files it will hold"
+    ),
+    update=extend_schema(description="Update the expected number of files"),
+    partial_update=extend_schema(description="Update the expected number of files"),
+)
+class UploadBatchViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.UpdateModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    API endpoint for batches of uploads followed until they are parsed.
+
+    Open a batch, upload files into it with `files/` or add upload sessions and
+    uploaded files with `items/`, then follow every file through received,
+    stored, parsed or failed at `events/` or by retrieving the batch.
+    """
+
+    queryset = UploadBatch.objects.all()
+    serializer_class = UploadBatchSerializer
+
+    def perform_create(self, serializer):
+        """
+        Create the batch and opportunistically drop expired ones
+        """
+        UploadBatch.objects.purge_expired(limit=100)
+        serializer.save()
+
+    @extend_schema(
+        description="Retrieve a batch with the state of each of its files",
+        responses=UploadBatchStateSerializer,
+    )
+    def retrieve(self, request, *args, **kwargs):
+        batch = self.get_object()
+        return Response(self.state(batch))
+
+    def state(self, batch):
+        total, states = batch_state(batch.pk)
+        data = self.get_serializer(batch).data
+        data["progress"] = summarize(total, states)
+        data["items"] = states
+        return data
+
+    @extend_schema(
+        description=(
+            "Upload files into the batch, like the bulk upload of files. The "
+            "files are listed as received while they are being stored."
+        ),
+        request={"multipart/form-data": BulkUploadSerializer},
+        responses={201: BulkResultSerializer, 207: BulkResultSerializer},
+    )
+    @action(detail=True, methods=["post"])
+    def files(self, request, pk=None):
+        batch = self.get_object()
+        uploads = request.FILES.getlist("file")
+        if not uploads:
+            raise ValidationError({"file": "Upload at least one file"})
+        names = request.data.getlist("user_defined_file_name")
+        max_length = BatchItem._meta.get_field("name").max_length
+        items = BatchItem.objects.bulk_create(
+            [
+                BatchItem(batch=batch, name=upload.name[:max_length])
+                for upload in uploads
+            ]
+        )
+        try:
+            results = create_files(uploads, names, self.get_serializer_context())
+        except Exception:
+            for item in items:
+                item.error = "Upload could not be stored"
+            BatchItem.objects.bulk_update(items, ["error"])
+            raise
+        for item, result in zip(items, results):
+            if result["status"] == status.HTTP_201_CREATED:
+                item.file_id = result["file"]["id"]
+            else:
+                item.error = error_text(result["errors"])
+        BatchItem.objects.bulk_update(items, ["file", "error"])
+        return bulk_response(results, status.HTTP_201_CREATED)
+
+    @extend_schema(
+        description=(
+            "Add uploaded files, or upload sessions that are still in progress, "
+            "to the batch"
+        ),
+        request=BatchAttachSerializer,
+        responses={201: UploadBatchStateSerializer},
+    )
+    @action(detail=True, methods=["post"])
+    def items(self, request, pk=None):
+        batch = self.get_object()
+        serializer = BatchAttachSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        file_ids = serializer.validated_data.get("files", [])
+        session_ids = serializer.validated_data.get("sessions", [])
+        files = File.objects.in_bulk(file_ids)
+        sessions = UploadSession.objects.in_bulk(session_ids)
+        errors = {}
+        if len(files) < len(set(file_ids)):
+            errors["files"] = "Unknown file ids"
+        if len(sessions) < len(set(session_ids)):
+            errors["sessions"] = "Unknown upload session ids"
+        if errors:
+            raise ValidationError(errors)
+
+        items = [
+            BatchItem(batch=batch, name=file.filename(), file=file)
+            for file in files.values()
+        ]
+        items += [
+            BatchItem(
+                batch=batch,
+                name=session.user_defined_file_name or session.original_file_name,
+                session=session,
+                file_id=session.file_id,
+            )
+            for session in sessions.values()
+        ]
+        BatchItem.objects.bulk_create(items)
+        return Response(self.state(batch), status=status.HTTP_201_CREATED)
+
+
+class BatchEventsView(View):
+    """
+    Server-sent events following the files of a batch
+
+    Sends an `item` event per file whenever its state changes, a `progress`
+    event with the counts per state after every change, and `done` once every
+    file is parsed or failed.
+    """
+
+    async def get(self, request, pk):
+        if not await UploadBatch.objects.filter(pk=pk).aexists():
+            return json_response({"detail": "Not found."}, status=404)
+        if isinstance(request, ASGIRequest):
+            content = stream(pk)
+        else:
+            content = stream_sync(pk)
+        response = StreamingHttpResponse(content, content_type="text/event-stream")
+        response.headers["Cache-Control"] = "no-cache"
+        # Sent as produced instead of buffered by nginx
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once Django is set up. Admits API requests before their body is
+# received, see throttling/asgi.py
+from throttling.asgi import AdmissionApplication  # noqa: E402
+
+application = AdmissionApplication(django_application)
@@ -0,0 +1,73 @@
+"""
+Gunicorn configuration for serving the backend in production
+
+    gunicorn -c config/gunicorn.conf.py
+
+By default every worker process runs Uvicorn on the ASGI application, so slow
+clients are read on the event loop instead of holding a worker, and the async
+file and health views never wait behind sync views. Set GUNICORN_WORKER_CLASS
+to `gthread` to serve the WSGI application with threads instead.
+
+Worker sizing: every worker is a separate process with its own copy of the app
+and database connection, and a process can only use one core. Django runs all
+sync views of a process in a single thread under ASGI, so sync endpoints
+(uploads, writes, search, invoices) get one request at a time per worker. The
+default is one worker per core but at least two, so a long sync request never
+stalls all others; raise it where requests mostly wait on the database or disk
+rather than the CPU. See the README for measurements.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+workers = int(os.getenv("WEB_CONCURRENCY", max(2, multiprocessing.cpu_count())))
+threads = int(os.getenv("GUNICORN_THREADS", 4))  # Per worker, gthread only
+
+# Uvicorn workers serve the ASGI application, the built-in workers WSGI
+if worker_class.startswith("uvicorn."):
+    wsgi_app = "config.asgi:application"
+else:
+    wsgi_app = "config.wsgi:application"
+
+# Seconds a worker may spend on one request before it is restarted; chunked
+# uploads keep single requests short
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory held by per-process caches
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 20000))
+max_requests_jitter = max_requests // 10
+
+# Restart workers when the code changes, for development with mounted sources
+reload = os.getenv("GUNICORN_RELOAD", "0") == "1"
+
+# Trust X-Forwarded-* headers from a reverse proxy in front of the container
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+# Workers write their metrics to files here, so a scrape of /metrics answered
+# by any worker covers all of them (see config/metrics.py)
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "invoice-parser-metrics"),
+)
+
+
+def on_starting(server):
+    # Counters start from zero with the server, not with the old files
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
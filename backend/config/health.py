@@ -0,0 +1,147 @@
+"""
+Dependency checks for the readiness probe
+
+Each check returns a dict with at least `ok`. The checks touch the database
+and the media volume, so their results are kept for `HEALTH_CHECK_TTL`
+seconds per process, and concurrent probes wait for a single run. However
+often load balancers probe, each process checks at most once per TTL.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from files.uploadhandler import incoming_upload_dir
+from parsing.models import ParseJob
+
+
+def timed(check):
+    """
+    Run a check, adding its duration and turning exceptions into failures
+    """
+    started = time.perf_counter()
+    try:
+        result = check()
+    except Exception as e:
+        result = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def check_database():
+    """
+    The database answers a query and, for SQLite, grants the write lock
+    within `HEALTH_DATABASE_LOCK_TIMEOUT` seconds
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        if connection.vendor == "sqlite":
+            cursor.execute("PRAGMA busy_timeout")
+            (busy_timeout,) = cursor.fetchone()
+            timeout = int(settings.HEALTH_DATABASE_LOCK_TIMEOUT * 1000)
+            cursor.execute(f"PRAGMA busy_timeout = {timeout}")
+            try:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("ROLLBACK")
+            finally:
+                cursor.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+    return {"ok": True}
+
+
+def check_disk():
+    """
+    The media volume has at least `HEALTH_MIN_FREE_BYTES` free
+    """
+    usage = shutil.disk_usage(settings.MEDIA_ROOT)
+    return {
+        "ok": usage.free >= settings.HEALTH_MIN_FREE_BYTES,
+        "free_bytes": usage.free,
+        "total_bytes": usage.total,
+    }
+
+
+def check_storage():
+    """
+    A file can be written and synced where uploads are received
+    """
+    directory = incoming_upload_dir()
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=".health-") as probe:
+        probe.write(b"ok")
+        probe.flush()
+        os.fsync(probe.fileno())
+    return {"ok": True}
+
+
+def check_queue():
+    """
+    Queued parse jobs, and how long the oldest has waited; a lag beyond
+    `HEALTH_QUEUE_MAX_LAG` seconds means the parse workers are stuck or gone
+    """
+    queued = ParseJob.objects.filter(status=ParseJob.Status.QUEUED)
+    oldest = queued.order_by("queued_at").values_list("queued_at", flat=True)
+    oldest = oldest.first()
+    lag = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    max_lag = settings.HEALTH_QUEUE_MAX_LAG
+    return {
+        "ok": not max_lag or lag <= max_lag,
+        "depth": queued.count(),
+        "lag_seconds": round(lag, 1),
+    }
+
+
+CHECKS = {
+    "database": check_database,
+    "disk": check_disk,
+    "storage": check_storage,
+    "queue": check_queue,
+}
+
+
+def run_checks():
+    try:
+        return {name: timed(check) for name, check in CHECKS.items()}
+    finally:
+        # Probes come rarely enough not to keep a connection per thread
+        connection.close()
+
+
+class CachedChecks:
+    """
+    Results of the latest run of the checks, refreshed after the TTL
+    """
+
+    def __init__(self):
+        self.results = None
+        self.checked_at = None
+        self.expires = 0.0
+        self.lock = threading.Lock()
+
+    def fresh(self):
+        return self.results is not None and time.monotonic() < self.expires
+
+    def refresh(self):
+        with self.lock:
+            # Another probe may have run the checks while this one waited
+            if not self.fresh():
+                self.results = run_checks()
+                self.checked_at = timezone.now()
+                self.expires = time.monotonic() + settings.HEALTH_CHECK_TTL
+
+    async def get(self):
+        """
+        (results, time of the run), without leaving the event loop while fresh
+        """
+        if not self.fresh():
+            await sync_to_async(self.refresh)()
+        return self.results, self.checked_at
+
+
+checks = CachedChecks()
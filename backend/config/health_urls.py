@@ -1,14 +1,39 @@
 from django.http import JsonResponse
 from django.urls import path
 
+from .health import checks
 
-def health_check(request):
+
+async def health_check(request):
     """
     Simple health check endpoint that returns a 200 OK response
+    Async, so it is answered on the event loop even while sync views are busy
     """
     return JsonResponse({"status": "ok"})
 
 
+async def readiness_check(request):
+    """
+    503 unless the database, the media volume, storage and the parse queue
+    are all healthy, with the result of each check
+    Results are cached for HEALTH_CHECK_TTL seconds.
+    """
+    results, checked_at = await checks.get()
+    ready = all(result["ok"] for result in results.values())
+    return JsonResponse(
+        {
+            "status": "ok" if ready else "unavailable",
+            "checked_at": checked_at,
+            "checks": results,
+        },
+        status=200 if ready else 503,
+    )
+
+
 urlpatterns = [
     path("", health_check, name="health_check"),
+    # The process serves requests; restart it otherwise
+    path("live/", health_check, name="liveness_check"),
+    # The process can handle uploads; route traffic elsewhere otherwise
+    path("ready/", readiness_check, name="readiness_check"),
 ]
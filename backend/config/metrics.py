@@ -0,0 +1,203 @@
+"""
+Prometheus metrics of the backend
+
+Requests are measured by `config.middleware.MetricsMiddleware`: latency,
+request and response body sizes, and the number and duration of database
+queries, per view and method. Storage operations are timed where they happen.
+Everything is served in the Prometheus text format at /metrics.
+
+Under Gunicorn every worker process writes its metrics to files in
+PROMETHEUS_MULTIPROC_DIR (set up in `config/gunicorn.conf.py`), and a scrape
+adds up the files of all workers, so whichever worker answers, the totals are
+the same. Without that variable, as with `runserver`, metrics live in memory.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Powers of 4 from 256 bytes to 1 GB
+SIZE_BUCKETS = [256 * 4**power for power in range(12)]
+LATENCY_BUCKETS = [
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+]
+QUERY_COUNT_BUCKETS = [0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500]
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time until the response is returned, excluding streamed bodies",
+    ["view", "method", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_SIZE = Histogram(
+    "http_request_size_bytes",
+    "Request body size from Content-Length",
+    ["view", "method"],
+    buckets=SIZE_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes",
+    "Response body size, for responses of a known size",
+    ["view", "method"],
+    buckets=SIZE_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries per request",
+    ["view", "method"],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_QUERY_TIME = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database queries per request",
+    ["view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+STORAGE_LATENCY = Histogram(
+    "storage_operation_duration_seconds",
+    "Time spent writing, opening, reading or deleting stored content",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class RequestStats:
+    """
+    Database work of the request being handled
+    """
+
+    __slots__ = ["queries", "query_time"]
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+
+# Context variables reach the threads sync_to_async runs queries in
+current_request = ContextVar("current_request", default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding each query to the current request's stats
+    """
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_time += time.perf_counter() - started
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """
+    Wrap every query of a new database connection, see `count_queries`
+    """
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+class Children:
+    """
+    Labelled children of a metric, looked up once per label values
+    """
+
+    def __init__(self, metric):
+        self.metric = metric
+        self.children = {}
+
+    def __getitem__(self, labels):
+        child = self.children.get(labels)
+        if child is None:
+            child = self.children[labels] = self.metric.labels(*labels)
+        return child
+
+
+request_latency = Children(REQUEST_LATENCY)
+request_size = Children(REQUEST_SIZE)
+response_size = Children(RESPONSE_SIZE)
+request_queries = Children(REQUEST_QUERIES)
+request_query_time = Children(REQUEST_QUERY_TIME)
+storage_latency = Children(STORAGE_LATENCY)
+
+
+def record_request(request, response, stats, duration):
+    """
+    Record the metrics of a handled request
+    """
+    match = request.resolver_match
+    labels = (match.view_name if match else "unmatched", request.method)
+    request_latency[labels + (str(response.status_code),)].observe(duration)
+    request_queries[labels].observe(stats.queries)
+    request_query_time[labels].observe(stats.query_time)
+    length = request.META.get("CONTENT_LENGTH")
+    if length:
+        request_size[labels].observe(int(length))
+    if not response.streaming:
+        response_size[labels].observe(len(response.content))
+    elif response.has_header("Content-Length"):
+        response_size[labels].observe(int(response["Content-Length"]))
+
+
+def observe_storage(operation, duration):
+    storage_latency[(operation,)].observe(duration)
+
+
+@contextmanager
+def timed_storage(operation):
+    """
+    Time a storage operation, such as "write" or "open"
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_storage(operation, time.perf_counter() - started)
+
+
+def registry():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return collected
+    return REGISTRY
+
+
+async def metrics_view(request):
+    """
+    Metrics in the Prometheus text format, optionally behind a bearer token
+    Async, so scrapes are answered even while sync views are busy
+    """
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+    return HttpResponse(generate_latest(registry()), content_type=CONTENT_TYPE_LATEST)
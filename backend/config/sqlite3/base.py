@@ -0,0 +1,34 @@
+"""
+SQLite backend with a configurable connection profile
+
+Django's SQLite backend opens transactions with a plain BEGIN, which only
+takes the write lock at the first write. When two connections both read
+first, the second to write cannot wait for the first and fails at once with
+"database is locked", whatever the busy timeout. Starting transactions with
+BEGIN IMMEDIATE takes the write lock up front, so writers queue on the busy
+timeout instead. The PRAGMAs in OPTIONS["pragmas"] are applied to every new
+connection, as most of them only last as long as the connection.
+"""
+
+from django.db.backends.sqlite3 import base
+
+# Options of this backend, not passed on to sqlite3.connect()
+BACKEND_OPTIONS = ["pragmas", "transaction_mode"]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for name in BACKEND_OPTIONS:
+            params.pop(name, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict["OPTIONS"].get("pragmas", {}).items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.settings_dict["OPTIONS"].get("transaction_mode", "DEFERRED")
+        self.cursor().execute(f"BEGIN {mode}")
@@ -0,0 +1,21 @@
+from django.core.files.storage import FileSystemStorage
+
+from .metrics import timed_storage
+
+
+class InstrumentedFileSystemStorage(FileSystemStorage):
+    """
+    File system storage recording how long writes, opens and deletes take
+    """
+
+    def _save(self, name, content):
+        with timed_storage("write"):
+            return super()._save(name, content)
+
+    def _open(self, name, mode="rb"):
+        with timed_storage("open"):
+            return super()._open(name, mode)
+
+    def delete(self, name):
+        with timed_storage("delete"):
+            super().delete(name)
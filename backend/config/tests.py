@@ -0,0 +1,148 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from prometheus_client.parser import text_string_to_metric_families
+from rest_framework.test import APITransactionTestCase
+
+from files.testing import MediaTestCase, TemporaryMediaMixin
+from parsing.models import ParseJob
+
+from . import health
+
+
+class MetricsTests(MediaTestCase):
+    def scrape(self, **headers):
+        response = self.client.get("/metrics", **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(response.content.decode())
+            for sample in family.samples
+        }
+
+    def count(self, samples, name, **labels):
+        return samples.get((f"{name}_count", tuple(sorted(labels.items()))), 0)
+
+    def test_requests_are_measured_per_view_method_and_status(self):
+        labels = {"view": "file-list", "method": "GET"}
+        before = self.scrape()
+        self.client.get("/api/v1/files/?page_size=1")
+        self.client.get("/api/v1/files/?page_size=2")
+        self.client.get("/api/v1/missing/")
+        after = self.scrape()
+
+        for name, extra in [
+            ("http_request_duration_seconds", {"status": "200"}),
+            ("http_request_db_queries", {}),
+            ("http_request_db_duration_seconds", {}),
+            ("http_response_size_bytes", {}),
+        ]:
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.count(after, name, **labels, **extra)
+                    - self.count(before, name, **labels, **extra),
+                    2,
+                )
+        queries = ("http_request_db_queries_sum", tuple(sorted(labels.items())))
+        self.assertGreater(after[queries], before.get(queries, 0))
+        unmatched = {"view": "unmatched", "method": "GET", "status": "404"}
+        self.assertEqual(
+            self.count(after, "http_request_duration_seconds", **unmatched)
+            - self.count(before, "http_request_duration_seconds", **unmatched),
+            1,
+        )
+
+    def test_uploads_and_storage(self):
+        before = self.scrape()
+        with open(__file__, "rb") as content:
+            self.client.post("/api/v1/files/", {"file": content})
+        after = self.scrape()
+
+        size = {"view": "file-list", "method": "POST"}
+        self.assertEqual(
+            self.count(after, "http_request_size_bytes", **size)
+            - self.count(before, "http_request_size_bytes", **size),
+            1,
+        )
+        write = {"operation": "write"}
+        self.assertEqual(
+            self.count(after, "storage_operation_duration_seconds", **write)
+            - self.count(before, "storage_operation_duration_seconds", **write),
+            1,
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response["WWW-Authenticate"], "Bearer")
+        self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong")
+        self.scrape(HTTP_AUTHORIZATION="Bearer secret")
+
+
+class ReadinessTests(TemporaryMediaMixin, APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        # Fresh results for every test, not those of an earlier one
+        patcher = mock.patch("config.health_urls.checks", health.CachedChecks())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def ready(self, status):
+        response = self.client.get("/health/ready/")
+        self.assertEqual(response.status_code, status)
+        return response.json()
+
+    def test_ready(self):
+        body = self.ready(200)
+        self.assertEqual(body["status"], "ok")
+        self.assertEqual(set(body["checks"]), {"database", "disk", "storage", "queue"})
+        for name, result in body["checks"].items():
+            with self.subTest(check=name):
+                self.assertTrue(result["ok"])
+                self.assertIn("duration_ms", result)
+
+    @override_settings(HEALTH_MIN_FREE_BYTES=2**62)
+    def test_full_disk(self):
+        body = self.ready(503)
+        self.assertEqual(body["status"], "unavailable")
+        self.assertFalse(body["checks"]["disk"]["ok"])
+        self.assertTrue(body["checks"]["database"]["ok"])
+
+    @override_settings(HEALTH_QUEUE_MAX_LAG=60)
+    def test_queue_lag(self):
+        self.upload()
+        ParseJob.objects.update(queued_at=timezone.now() - timedelta(hours=1))
+        queue = self.ready(503)["checks"]["queue"]
+        self.assertFalse(queue["ok"])
+        self.assertEqual(queue["depth"], 1)
+        self.assertGreaterEqual(queue["lag_seconds"], 3600)
+
+    def test_failing_check(self):
+        def broken():
+            raise OSError("read-only file system")
+
+        with mock.patch.dict(health.CHECKS, {"storage": broken}):
+            storage = self.ready(503)["checks"]["storage"]
+        self.assertEqual(storage["error"], "OSError: read-only file system")
+
+
+@override_settings(HEALTH_CHECK_TTL=5)
+class CachedChecksTests(SimpleTestCase):
+    async def test_results_are_reused_for_the_ttl(self):
+        checks = health.CachedChecks()
+        results = {"database": {"ok": True}}
+        with mock.patch.object(health, "run_checks", return_value=results) as run:
+            first = await checks.get()
+            self.assertEqual(first[0], results)
+            self.assertEqual(await checks.get(), first)
+            self.assertEqual(run.call_count, 1)
+
+            later = time.monotonic() + 6
+            with mock.patch("time.monotonic", return_value=later):
+                await checks.get()
+            self.assertEqual(run.call_count, 2)
@@ -19,25 +19,48 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from django.contrib.staticfiles.urls import staticfiles_urlpatterns
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import routers
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularRedocView,
     SpectacularSwaggerView,
 )
-from files.views import FileViewSet
+from batches.views import UploadBatchViewSet
+from config.metrics import metrics_view
+from files.views import AsyncFileDetailView, AsyncFileListView
+from files.views import FileViewSet, UploadSessionViewSet
+from invoices.views import InvoiceLineItemViewSet, InvoiceViewSet
 
 # API Router configuration
 router = routers.DefaultRouter()
 router.register(r"files", FileViewSet)
+router.register(r"uploads", UploadSessionViewSet)
+router.register(r"batches", UploadBatchViewSet)
+router.register(r"invoices", InvoiceViewSet)
+router.register(r"line-items", InvoiceLineItemViewSet)
 
 urlpatterns = [
     # Django Admin
     path("admin/", admin.site.urls),
-    # API URLs
+    # API URLs, with async views in front of the router for file reads
+    # Named like the router's routes they front, for reverse() and metrics
+    path("api/v1/files/", csrf_exempt(AsyncFileListView.as_view()), name="file-list"),
+    path(
+        "api/v1/files/<uuid:pk>/",
+        csrf_exempt(AsyncFileDetailView.as_view()),
+        name="file-detail",
+    ),
     path("api/v1/", include(router.urls)),
+    path("api/v1/", include("parsing.urls")),
+    path("api/v1/", include("invoices.urls")),
+    path("api/v1/", include("batches.urls")),
+    path("api/v1/", include("previews.urls")),
     # Health check endpoint
     path("health/", include("config.health_urls")),
+    # Prometheus metrics, at the path scrapers use by default
+    path("metrics", metrics_view, name="metrics"),
     # API Documentation
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
@@ -48,6 +71,7 @@ urlpatterns = [
     path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
 ]
 
-# Serve media files during development
+# Serve static and media files during development, under any server
 if settings.DEBUG:
+    urlpatterns += staticfiles_urlpatterns()
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
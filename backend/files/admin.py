@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import File
+from search.engine import filter_files
+
+from .models import Blob, File, UploadSession
 
 
 @admin.register(File)
@@ -8,17 +10,108 @@ class FileAdmin(admin.ModelAdmin):
     Admin configuration for the File model
     """
 
-    list_display = ("id", "filename", "original_file_name", "uploaded_at", "updated_at")
-    list_filter = ("uploaded_at", "updated_at")
+    list_display = (
+        "id",
+        "filename",
+        "original_file_name",
+        "mime_type",
+        "size",
+        "uploaded_at",
+        "updated_at",
+    )
+    list_filter = ("mime_type", "uploaded_at", "updated_at")
     search_fields = ("original_file_name", "user_defined_file_name")
-    readonly_fields = ("id", "original_file_name", "uploaded_at", "updated_at")
+    readonly_fields = (
+        "id",
+        "original_file_name",
+        "blob",
+        "sha256",
+        "size",
+        "mime_type",
+        "deduplicated",
+        "uploaded_at",
+        "updated_at",
+    )
     fieldsets = (
         (
             None,
             {"fields": ("id", "file", "original_file_name", "user_defined_file_name")},
         ),
+        (
+            "Storage",
+            {"fields": ("blob", "sha256", "size", "mime_type", "deduplicated")},
+        ),
         (
             "Timestamps",
             {"fields": ("uploaded_at", "updated_at"), "classes": ("collapse",)},
         ),
     )
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Match names and extracted text through the full-text index rather than
+        LIKE scans over the name columns
+        """
+        if not search_term.strip():
+            return queryset, False
+        return filter_files(queryset, search_term), False
+
+    def save_model(self, request, obj, form, change):
+        """
+        Store newly uploaded content through the shared blob store
+        """
+        if "file" in form.changed_data:
+            upload = obj.file.file
+            blob, created = Blob.objects.acquire(upload, upload.sha256)
+            if obj.blob_id:
+                Blob.objects.release([obj.blob_id])
+            obj.file, obj.blob, obj.deduplicated = blob.file.name, blob, not created
+            obj.sha256, obj.size, obj.mime_type = (
+                blob.sha256,
+                blob.size,
+                upload.mime_type,
+            )
+            if not change:
+                obj.original_file_name = upload.name
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the UploadSession model
+    """
+
+    list_display = ("id", "original_file_name", "total_size", "file", "expires_at")
+    list_filter = ("created_at", "expires_at")
+    search_fields = ("original_file_name", "user_defined_file_name")
+    readonly_fields = ("id", "file", "created_at", "updated_at", "expires_at")
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the Blob model
+    """
+
+    list_display = (
+        "sha256",
+        "file",
+        "size",
+        "ref_count",
+        "created_at",
+        "verified_at",
+        "problem",
+    )
+    list_filter = ("problem",)
+    search_fields = ("sha256",)
+    readonly_fields = (
+        "id",
+        "sha256",
+        "file",
+        "size",
+        "ref_count",
+        "created_at",
+        "verified_at",
+        "problem",
+    )
@@ -5,3 +5,6 @@ class FilesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "files"
     verbose_name = "File Management"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,116 @@
+"""
+Batch operations on files
+
+Each operation runs in a single transaction and writes its rows with one bulk
+query instead of one request and a few queries per file. Items are validated
+one by one and reported with an HTTP-like status, so a bad item does not fail
+the rest of the batch. Bulk writes bypass post_save, so the `files_bulk_created`
+and `files_bulk_updated` signals let other apps handle the batch instead. Bulk
+deletes send `files_bulk_deleted` once in place of a post_delete per file.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import File
+from .serializers import FileRenameSerializer, FileSerializer
+from .signals import bulk_delete, files_bulk_created, files_bulk_deleted
+from .signals import files_bulk_updated
+from .uploads import prepare_upload
+
+
+def create_files(uploads, names=(), context=None):
+    """
+    Store a list of uploaded files, naming them after `names` where given
+    Returns a result per upload, in order
+    """
+    # One serializer validates every item, so its fields are built only once
+    validator = FileSerializer(context=context)
+    results, files = [], []
+    with transaction.atomic():
+        for index, uploaded_file in enumerate(uploads):
+            data = {"file": uploaded_file}
+            if index < len(names) and names[index]:
+                data["user_defined_file_name"] = names[index]
+            try:
+                fields = validator.run_validation(data)
+            except ValidationError as e:
+                results.append({"index": index, "status": 400, "errors": e.detail})
+                continue
+            file = prepare_upload(fields.pop("file"), **fields)
+            files.append(file)
+            results.append({"index": index, "status": 201, "file": file})
+
+        File.objects.bulk_create(files)
+        files_bulk_created.send(sender=File, files=files)
+    return serialize(results, context)
+
+
+def rename_files(items, context=None):
+    """
+    Set the user-defined names of files, given as dicts with an `id` and a
+    `user_defined_file_name`
+    Returns a result per item, in order
+    """
+    validator = FileRenameSerializer()
+    changes = []
+    for item in items:
+        try:
+            changes.append(validator.run_validation(item))
+        except ValidationError as e:
+            changes.append(e)
+
+    results, renamed = [], {}
+    with transaction.atomic():
+        ids = [change["id"] for change in changes if isinstance(change, dict)]
+        files = File.objects.select_for_update().in_bulk(ids)
+        now = timezone.now()
+        for index, change in enumerate(changes):
+            if isinstance(change, ValidationError):
+                results.append({"index": index, "status": 400, "errors": change.detail})
+                continue
+            file = files.get(change["id"])
+            if file is None:
+                results.append({"index": index, "id": change["id"], "status": 404})
+                continue
+            file.user_defined_file_name = change["user_defined_file_name"]
+            file.updated_at = now
+            renamed[file.pk] = file
+            results.append({"index": index, "status": 200, "file": file})
+
+        renamed = list(renamed.values())
+        File.objects.bulk_update(renamed, ["user_defined_file_name", "updated_at"])
+        files_bulk_updated.send(sender=File, files=renamed)
+    return serialize(results, context)
+
+
+def delete_files(ids):
+    """
+    Delete the files with the given ids and release their stored content
+    Returns a result per id, in order
+    """
+    with transaction.atomic():
+        files = File.objects.filter(pk__in=ids)
+        existing = set(files.values_list("id", flat=True))
+        # Stored content is deleted in one go once the transaction commits
+        with bulk_delete():
+            files.delete()
+        files_bulk_deleted.send(sender=File, ids=existing)
+    return [
+        {"index": index, "id": file_id, "status": 204 if file_id in existing else 404}
+        for index, file_id in enumerate(ids)
+    ]
+
+
+def serialize(results, context):
+    """
+    Replace the File instances in results with their serialized data
+    """
+    with_file = [result for result in results if "file" in result]
+    files = [result["file"] for result in with_file]
+    data = FileSerializer(files, many=True, context=context).data
+    for result, file, file_data in zip(with_file, files, data):
+        result["id"] = file.pk
+        result["file"] = file_data
+    return results
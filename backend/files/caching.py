@@ -0,0 +1,97 @@
+"""
+Conditional GET and response caching for file reads
+
+File listings are versioned by a change counter that is bumped whenever a file
+is created, changed or deleted, and single files by their `updated_at`. The
+version makes up the ETag of a response, so a client polling with
+`If-None-Match` is answered with 304 after a single indexed lookup, and the
+rendered JSON of a version is kept in the `api` cache so other clients asking
+for the same page skip the queries and serialization altogether. Entries are
+never invalidated explicitly: a change yields a new version and thus new keys,
+and stale entries expire from the cache.
+"""
+
+import hashlib
+
+from django.core.cache import caches
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+from .models import ChangeCounter
+
+FILES_COLLECTION = "files"
+
+# Cacheable by the client, but revalidated on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def bump_version(name):
+    """
+    Advance the version of a collection, creating its counter on first use
+    """
+    if not ChangeCounter.objects.filter(name=name).update(value=F("value") + 1):
+        counter, created = ChangeCounter.objects.get_or_create(
+            name=name, defaults={"value": 1}
+        )
+        if not created:
+            bump_version(name)
+
+
+async def aget_version(name):
+    """
+    Current version of a collection, 0 if it never changed
+    """
+    counters = ChangeCounter.objects.filter(name=name)
+    return await counters.values_list("value", flat=True).afirst() or 0
+
+
+def response_key(request, *version):
+    """
+    Cache key of the response to a request for a given version of the data
+
+    Includes the host and scheme, as responses contain absolute URLs.
+    """
+    parts = [request.scheme, request.get_host(), request.get_full_path(), *version]
+    return hashlib.md5("\n".join(map(str, parts)).encode()).hexdigest()
+
+
+def not_modified(request, etag):
+    """
+    304 response if the client already has the representation tagged `etag`
+    """
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return None
+    # Weak comparison, as required for If-None-Match
+    tags = {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+    if "*" not in tags and etag.removeprefix("W/") not in tags:
+        return None
+    response = HttpResponseNotModified()
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+async def cached_json_response(request, key, build):
+    """
+    JSON response for the data returned by the coroutine function `build`
+
+    Answers with 304 when the client's copy is current, and otherwise renders
+    the data only if the `api` cache does not hold it yet.
+    """
+    etag = f'W/"{key}"'
+    response = not_modified(request, etag)
+    if response is not None:
+        return response
+
+    cache = caches["api"]
+    content = await cache.aget(key)
+    if content is None:
+        content = JSONRenderer().render(await build())
+        await cache.aset(key, content)
+    response = HttpResponse(content, content_type="application/json")
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return response
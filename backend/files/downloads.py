@@ -0,0 +1,237 @@
+"""
+Download responses for stored files
+
+Responses carry a strong ETag made from the stored SHA-256 of the content and
+a Last-Modified date, answer conditional requests with 304 without touching
+the disk, and serve single byte ranges so document viewers can seek.
+
+The bytes themselves are sent by whatever is cheapest in the deployment: with
+`FILE_DOWNLOAD_OFFLOAD` set, the web server in front of Django sends the file
+named by an X-Sendfile or X-Accel-Redirect header. Otherwise, under WSGI, the
+response wraps the open file, which WSGI servers hand to `os.sendfile` through
+`wsgi.file_wrapper`. Django's ASGI handler would read such a sync stream into
+memory before sending it, so under ASGI the file is read in blocks of
+`READ_BLOCK_SIZE` in Django's sync thread and sent as each block is read.
+"""
+
+import io
+import os
+import re
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+from django.utils.http import parse_http_date_safe, quote_etag
+from rest_framework.negotiation import BaseContentNegotiation
+
+from config.metrics import observe_storage
+
+from .export import aiterate
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Bytes read at a time when the file is sent by Python under ASGI
+READ_BLOCK_SIZE = 256 * 1024
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """
+    Accept any Accept header, as downloads are not rendered by DRF
+    """
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return (renderers[0], renderers[0].media_type)
+
+
+class FileRange:
+    """
+    Read-only view of a byte range of an open file
+
+    The underlying file descriptor is positioned at the start of the range, so
+    `wsgi.file_wrapper` implementations using `os.sendfile` send exactly the
+    range (limited by the Content-Length header) without reading it in Python.
+    """
+
+    def __init__(self, fileobj, start, length):
+        self.file = fileobj
+        self.end = start + length
+        self.read_time = 0.0
+        fileobj.seek(start)
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def read(self, size=-1):
+        remaining = max(self.end - self.file.tell(), 0)
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        started = time.perf_counter()
+        data = self.file.read(size)
+        self.read_time += time.perf_counter() - started
+        return data
+
+    def tell(self):
+        return self.file.tell()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_END:
+            return self.file.seek(self.end + offset)
+        return self.file.seek(offset, whence)
+
+    def seekable(self):
+        return True
+
+    def close(self):
+        # Time spent reading the range, not sending it; nothing with sendfile
+        if self.read_time:
+            observe_storage("read", self.read_time)
+        self.file.close()
+
+
+def read_blocks(filelike):
+    """
+    Blocks of a file-like object, which is closed once they are consumed
+    """
+    try:
+        yield from iter(lambda: filelike.read(READ_BLOCK_SIZE), b"")
+    finally:
+        filelike.close()
+
+
+def parse_range(header, size):
+    """
+    Start and length of a single `bytes=` range, clipped to the file size
+
+    Returns None when the header should be ignored (missing, malformed or
+    asking for several ranges) and raises ValueError when the range cannot be
+    satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = min(int(last), size)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range starts beyond the end of the file")
+    return start, end - start + 1
+
+
+def validators(file):
+    """
+    ETag and Last-Modified timestamp of a file's content
+    The ETag is only known for files with a stored content hash
+    """
+    etag = quote_etag(file.sha256) if file.sha256 else None
+    return etag, int(file.updated_at.timestamp())
+
+
+def if_range_matches(request, etag, last_modified):
+    """
+    Whether a range request may be served partially, per its If-Range header
+    """
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return etag is not None and if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def download_response(request, file, as_attachment=False):
+    """
+    Response sending the content of a File, honoring conditional and range
+    request headers
+    """
+    if not file.file:
+        raise Http404("File has no stored content")
+
+    etag, last_modified = validators(file)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Last-Modified": http_date(last_modified),
+        # Cacheable, but revalidated as the content of a File may be replaced
+        "Cache-Control": "private, no-cache",
+    }
+    if etag:
+        headers["ETag"] = etag
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        for name, value in headers.items():
+            not_modified.headers.setdefault(name, value)
+        return not_modified
+
+    content_type = file.mime_type or "application/octet-stream"
+    filename = file.filename()
+    offload = settings.FILE_DOWNLOAD_OFFLOAD
+    if offload:
+        # The front web server sends the file and handles ranges itself
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if offload == "x-accel-redirect":
+            location = settings.FILE_DOWNLOAD_ACCEL_PREFIX + quote(file.file.name)
+            response.headers["X-Accel-Redirect"] = location
+        else:
+            response.headers["X-Sendfile"] = file.file.path
+        response.headers["Content-Disposition"] = content_disposition_header(
+            as_attachment, filename
+        )
+        return response
+
+    try:
+        fileobj = open(file.file.path, "rb", buffering=0)
+    except FileNotFoundError:
+        raise Http404("Stored content is missing")
+    size = os.fstat(fileobj.fileno()).st_size
+
+    byte_range = None
+    if request.method in ("GET", "HEAD") and if_range_matches(
+        request, etag, last_modified
+    ):
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except ValueError:
+            fileobj.close()
+            return HttpResponse(
+                status=416, headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+
+    start, length = byte_range or (0, size)
+    content = FileRange(fileobj, start, length)
+    status = 206 if byte_range else 200
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        response = StreamingHttpResponse(
+            aiterate(read_blocks(content)),
+            content_type=content_type,
+            status=status,
+            headers=headers,
+        )
+        response.headers["Content-Disposition"] = content_disposition_header(
+            as_attachment, filename
+        )
+    else:
+        response = FileResponse(
+            content,
+            as_attachment=as_attachment,
+            filename=filename,
+            content_type=content_type,
+            status=status,
+            headers=headers,
+        )
+    response.headers["Content-Length"] = str(length)
+    if byte_range:
+        response.headers["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+    return response
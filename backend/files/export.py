@@ -0,0 +1,250 @@
+"""
+Streaming export of files and their metadata
+
+An export is produced on the fly as a sequence of byte chunks: a ZIP archive
+of the stored content with a `manifest.ndjson` of file and invoice metadata,
+or the NDJSON manifest alone. Files are read from the database in keyset
+pages and the content copied in blocks, so memory does not grow with the size
+of the content; the ZIP's central directory, written at the end, takes a few
+hundred bytes per file. Each page is a complete query, as under ASGI other
+requests use the same thread and database connection between two chunks.
+"""
+
+import json
+import os
+import tempfile
+import uuid
+import zipfile
+from datetime import date, datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q, prefetch_related_objects
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+
+from invoices.filters import filter_invoices, parse_param
+from invoices.serializers import InvoiceSerializer
+
+from .models import File
+from .serializers import FileSerializer
+
+# Bytes collected before a chunk is handed to the server
+CHUNK_SIZE = 256 * 1024
+READ_BUFFER_SIZE = 1024 * 1024
+# Manifest bytes kept in memory before spilling to a temporary file
+MANIFEST_SPOOL_SIZE = 1024 * 1024
+MANIFEST_NAME = "manifest.ndjson"
+# Invoice query parameters that restrict an export to parsed files
+INVOICE_FILTERS = [
+    "vendor",
+    "vendor_contains",
+    "currency",
+    "date_from",
+    "date_to",
+    "min_total",
+    "max_total",
+]
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def export_queryset(params):
+    """
+    Files selected by export query parameters: `id` (repeated or comma
+    separated), `uploaded_from` and `uploaded_to` dates, and the invoice
+    filters such as `date_from` and `date_to` for the invoice date
+    """
+    files = File.objects.all()
+    ids = [
+        value.strip()
+        for values in params.getlist("id")
+        for value in values.split(",")
+        if value.strip()
+    ]
+    if ids:
+        if len(ids) > settings.FILE_BULK_MAX_ITEMS:
+            raise ValidationError(
+                {"id": f"Export at most {settings.FILE_BULK_MAX_ITEMS} ids at once"}
+            )
+        try:
+            files = files.filter(id__in=[uuid.UUID(value) for value in ids])
+        except ValueError:
+            raise ValidationError({"id": "Must be file ids"})
+    uploaded_from = parse_param(params, "uploaded_from", date.fromisoformat)
+    if uploaded_from:
+        files = files.filter(uploaded_at__gte=start_of_day(uploaded_from))
+    uploaded_to = parse_param(params, "uploaded_to", date.fromisoformat)
+    if uploaded_to:
+        files = files.filter(
+            uploaded_at__lt=start_of_day(uploaded_to + timedelta(days=1))
+        )
+    if any(params.get(name) for name in INVOICE_FILTERS):
+        files = filter_invoices(files, params, prefix="invoice__")
+    return files
+
+
+def pages(files, size=500):
+    """
+    Files in upload order, newest first, one page at a time with their
+    invoices and line items
+    """
+    files = files.select_related("invoice").order_by("-uploaded_at", "-id")
+    last = None
+    while True:
+        page = files
+        if last is not None:
+            page = files.filter(
+                Q(uploaded_at__lt=last.uploaded_at)
+                | Q(uploaded_at=last.uploaded_at, id__lt=last.id)
+            )
+        batch = list(page[:size])
+        if not batch:
+            return
+        prefetch_related_objects(batch, "invoice__line_items")
+        yield batch
+        last = batch[-1]
+
+
+def archive_path(file):
+    """
+    Path of a file's content in the archive, unique by its id
+    """
+    name = file.filename().replace("/", "_").replace("\\", "_")
+    return f"files/{file.id}-{name}"
+
+
+class Manifest:
+    """
+    Renders manifest lines with one serializer instance per model
+    """
+
+    def __init__(self, context):
+        self.file_serializer = FileSerializer(context=context)
+        self.invoice_serializer = InvoiceSerializer(context=context)
+
+    def line(self, file, **extra):
+        invoice = getattr(file, "invoice", None)
+        entry = {
+            **extra,
+            "file": self.file_serializer.to_representation(file),
+            "invoice": (
+                self.invoice_serializer.to_representation(invoice)
+                if invoice is not None
+                else None
+            ),
+        }
+        return json.dumps(entry, cls=JSONEncoder).encode() + b"\n"
+
+
+def export_ndjson(files, context=None):
+    """
+    Byte chunks of the NDJSON manifest of the files
+    """
+    manifest = Manifest(context or {})
+    for batch in pages(files):
+        yield b"".join(manifest.line(file) for file in batch)
+
+
+class Sink:
+    """
+    Write-only file object collecting what a ZipFile writes until drained
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        self.size = 0
+        return data
+
+
+def export_zip(files, context=None):
+    """
+    Byte chunks of a ZIP archive of the files' content and manifest
+    Content is stored as is, as documents and images are compressed already.
+    """
+    manifest = Manifest(context or {})
+    storage = File._meta.get_field("file").storage
+    sink = Sink()
+    with tempfile.SpooledTemporaryFile(MANIFEST_SPOOL_SIZE) as lines:
+        # Without seek and tell on the sink, sizes follow each entry's content
+        with zipfile.ZipFile(sink, "w") as archive:
+            for batch in pages(files):
+                for file in batch:
+                    path = archive_path(file)
+                    try:
+                        content = open(storage.path(file.file.name), "rb")
+                    except FileNotFoundError:
+                        # Missing content, reported by the scrubber
+                        lines.write(manifest.line(file, path=None))
+                        continue
+                    with content:
+                        info = zipfile.ZipInfo(path, local_time(file.uploaded_at))
+                        info.file_size = os.fstat(content.fileno()).st_size
+                        with archive.open(info, "w") as entry:
+                            for block in iter(
+                                lambda: content.read(READ_BUFFER_SIZE), b""
+                            ):
+                                entry.write(block)
+                                if sink.size >= CHUNK_SIZE:
+                                    yield sink.drain()
+                    lines.write(manifest.line(file, path=path))
+
+            info = zipfile.ZipInfo(MANIFEST_NAME, local_time(timezone.now()))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            lines.seek(0)
+            with archive.open(info, "w", force_zip64=True) as entry:
+                for block in iter(lambda: lines.read(READ_BUFFER_SIZE), b""):
+                    entry.write(block)
+                    if sink.size >= CHUNK_SIZE:
+                        yield sink.drain()
+    yield sink.drain()
+
+
+def local_time(value):
+    """
+    ZIP timestamp of an aware datetime; ZIP cannot store dates before 1980
+    """
+    value = timezone.localtime(value)
+    return max(value.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+
+
+def export(files, output="zip", context=None):
+    """
+    Byte chunks of an export of the files as a "zip" archive or "ndjson"
+    """
+    if output == "ndjson":
+        return export_ndjson(files, context)
+    return export_zip(files, context)
+
+
+async def aiterate(chunks):
+    """
+    Async iterator over sync chunks, each produced in Django's sync thread
+
+    Django's ASGI handler reads sync streaming content into memory before
+    sending it, so streams served under ASGI are wrapped in this.
+    """
+    try:
+        while True:
+            chunk = await sync_to_async(next)(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
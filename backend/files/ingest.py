@@ -0,0 +1,333 @@
+"""
+Bulk ingest of files from a local directory tree
+
+Files are hashed and copied into MEDIA_ROOT by a pool of threads, each in a
+single pass that writes next to its final location, so storing new content is
+a rename (`hashlib` and file I/O release the GIL). The main thread stores each
+batch in one transaction with bulk queries, naming the content with the same
+`file_upload_path` as uploads. Every committed batch is appended to a
+manifest, and later runs skip what it lists, so an interrupted ingest resumes
+where it stopped. Files whose content is already stored under the same name
+are skipped as well, which covers a batch committed just before a crash.
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Blob, File
+from .signals import files_bulk_created
+from .uploadhandler import SNIFF_SIZE, incoming_upload_dir, sniff_mime_type
+from .uploads import PartFile
+
+COPY_BUFFER_SIZE = 1024 * 1024
+MAX_NAME_LENGTH = File._meta.get_field("original_file_name").max_length
+
+
+@dataclass
+class Source:
+    """
+    File found in the ingested directory
+    """
+
+    path: str
+    relpath: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class Copied:
+    """
+    Source file copied into the incoming directory, with its digest and type
+    """
+
+    source: Source
+    temp_path: str
+    sha256: str
+    mime_type: str
+
+
+def default_manifest_path(directory):
+    """
+    Manifest of a directory, kept in MEDIA_ROOT as sources may be read-only
+    """
+    digest = hashlib.md5(os.path.abspath(directory).encode()).hexdigest()
+    return os.path.join(settings.MEDIA_ROOT, "ingest", f"{digest}.jsonl")
+
+
+def read_manifest(path):
+    """
+    (relative path, size, mtime) keys of the files a manifest lists as ingested
+    """
+    keys = set()
+    try:
+        with open(path) as manifest:
+            for line in manifest:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A line cut off by a crash, its batch is checked again
+                    continue
+                keys.add((entry["path"], entry["size"], entry["mtime_ns"]))
+    except FileNotFoundError:
+        pass
+    return keys
+
+
+def end_last_line(path):
+    """
+    Terminate a manifest line cut off by a crash, so that the entries appended
+    after it are read back
+    """
+    try:
+        with open(path, "rb+") as manifest:
+            size = manifest.seek(0, os.SEEK_END)
+            if size:
+                manifest.seek(size - 1)
+                if manifest.read(1) != b"\n":
+                    manifest.write(b"\n")
+    except FileNotFoundError:
+        pass
+
+
+def scan(directory):
+    """
+    Regular, non-empty files below a directory, skipping hidden entries
+    """
+    stack = [directory]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    if stat.st_size:
+                        yield Source(
+                            path=entry.path,
+                            relpath=os.path.relpath(entry.path, directory),
+                            size=stat.st_size,
+                            mtime_ns=stat.st_mtime_ns,
+                        )
+
+
+def copy(source):
+    """
+    Copy a source file into the incoming directory while hashing it
+    """
+    digest = hashlib.sha256()
+    header = b""
+    temp_path = os.path.join(incoming_upload_dir(), uuid.uuid4().hex)
+    with open(source.path, "rb") as src, open(temp_path, "wb") as dst:
+        try:
+            for block in iter(lambda: src.read(COPY_BUFFER_SIZE), b""):
+                dst.write(block)
+                digest.update(block)
+                if len(header) < SNIFF_SIZE:
+                    header += block[: SNIFF_SIZE - len(header)]
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    return Copied(source, temp_path, digest.hexdigest(), sniff_mime_type(header))
+
+
+def remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Ingest:
+    """
+    One run of an ingest, with its counters for progress reports
+    """
+
+    def __init__(self, directory, manifest_path=None, workers=8, batch_size=500):
+        self.directory = directory
+        self.manifest_path = manifest_path or default_manifest_path(directory)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.total = self.total_bytes = 0
+        self.done = self.done_bytes = 0
+        self.ingested = self.skipped = self.failed = 0
+        self.started = None
+
+    def run(self, progress=None, errors=None):
+        """
+        Ingest every file not ingested yet, calling `progress(self)` after each
+        batch and `errors(source, exception)` for files that cannot be read
+        """
+        done = read_manifest(self.manifest_path)
+        sources = []
+        for source in scan(self.directory):
+            if (source.relpath, source.size, source.mtime_ns) in done:
+                self.skipped += 1
+            else:
+                sources.append(source)
+        self.total = len(sources)
+        self.total_bytes = sum(source.size for source in sources)
+        self.started = time.monotonic()
+
+        os.makedirs(incoming_upload_dir(), exist_ok=True)
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        end_last_line(self.manifest_path)
+        with open(self.manifest_path, "a") as manifest:
+            with ThreadPoolExecutor(self.workers) as executor:
+                batch = []
+                for copied in self.copies(executor, sources, errors):
+                    batch.append(copied)
+                    if len(batch) >= self.batch_size:
+                        self.store(batch, manifest, progress)
+                        batch = []
+                if batch:
+                    self.store(batch, manifest, progress)
+        return self
+
+    def copies(self, executor, sources, errors):
+        """
+        Copies of the sources in order, made by the pool at most two batches
+        ahead of the batch being stored
+        """
+        pending = deque()
+        try:
+            for source in sources:
+                pending.append((source, executor.submit(copy, source)))
+                if len(pending) > 2 * self.batch_size:
+                    yield from self.collect(*pending.popleft(), errors)
+            while pending:
+                yield from self.collect(*pending.popleft(), errors)
+        finally:
+            # Interrupted: drop the copies nobody is going to store
+            for source, future in pending:
+                if not future.cancel() and not future.exception():
+                    remove(future.result().temp_path)
+
+    def collect(self, source, future, errors):
+        try:
+            yield future.result()
+        except OSError as e:
+            self.failed += 1
+            self.done += 1
+            self.done_bytes += source.size
+            if errors:
+                errors(source, e)
+
+    def store(self, batch, manifest, progress):
+        """
+        Store a batch of copied files in one transaction and record it
+        """
+        try:
+            with transaction.atomic():
+                entries = self.store_batch(batch)
+        finally:
+            for copied in batch:
+                remove(copied.temp_path)
+        manifest.writelines(json.dumps(entry) + "\n" for entry in entries)
+        manifest.flush()
+        os.fsync(manifest.fileno())
+        self.done += len(batch)
+        self.done_bytes += sum(copied.source.size for copied in batch)
+        if progress:
+            progress(self)
+
+    def store_batch(self, batch):
+        """
+        Create Files for the copies in a batch that are not stored yet
+        Returns the manifest entries of the batch
+        """
+        existing = File.objects.filter(
+            sha256__in={copied.sha256 for copied in batch},
+            original_file_name__in={name_of(copied.source) for copied in batch},
+        )
+        file_ids = {
+            (sha256, name): file_id
+            for file_id, sha256, name in existing.values_list(
+                "id", "sha256", "original_file_name"
+            )
+        }
+        new, entries = [], []
+        for copied in batch:
+            key = (copied.sha256, name_of(copied.source))
+            if key in file_ids:
+                self.skipped += 1
+            else:
+                file_ids[key] = uuid.uuid4()
+                new.append(copied)
+            entries.append(
+                {
+                    "path": copied.source.relpath,
+                    "size": copied.source.size,
+                    "mtime_ns": copied.source.mtime_ns,
+                    "sha256": copied.sha256,
+                    "file": str(file_ids[key]),
+                }
+            )
+
+        references = Counter(copied.sha256 for copied in new)
+        contents = {}
+        for copied in new:
+            if copied.sha256 not in contents:
+                content = PartFile(
+                    open(copied.temp_path, "rb"), name=name_of(copied.source)
+                )
+                contents[copied.sha256] = (content, references[copied.sha256])
+        try:
+            blobs = Blob.objects.acquire_many(contents)
+        finally:
+            for content, _ in contents.values():
+                content.close()
+
+        files, seen = [], set()
+        for copied in new:
+            blob, created = blobs[copied.sha256]
+            name = name_of(copied.source)
+            files.append(
+                File(
+                    id=file_ids[(copied.sha256, name)],
+                    original_file_name=name,
+                    file=blob.file.name,
+                    blob=blob,
+                    sha256=copied.sha256,
+                    size=blob.size,
+                    mime_type=copied.mime_type,
+                    # Only the first copy of new content is not a duplicate
+                    deduplicated=not created or copied.sha256 in seen,
+                )
+            )
+            seen.add(copied.sha256)
+        File.objects.bulk_create(files)
+        files_bulk_created.send(sender=File, files=files)
+        self.ingested += len(files)
+        return entries
+
+    def rates(self):
+        """
+        Files and bytes per second so far, and the estimated seconds left
+        """
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        files_per_second = self.done / elapsed
+        bytes_per_second = self.done_bytes / elapsed
+        if self.done_bytes:
+            eta = (self.total_bytes - self.done_bytes) / bytes_per_second
+        else:
+            eta = None
+        return files_per_second, bytes_per_second, eta
+
+
+def name_of(source):
+    """
+    File name stored for a source file, shortened from the front if needed
+    """
+    return os.path.basename(source.path)[-MAX_NAME_LENGTH:]
@@ -0,0 +1,54 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+
+from files.export import export, export_queryset
+
+FILTERS = ["uploaded_from", "uploaded_to", "date_from", "date_to", "vendor"]
+
+
+class Command(BaseCommand):
+    help = "Export files and their metadata as a ZIP archive or NDJSON manifest"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "output",
+            help="Path to write to, ending in .zip or .ndjson, or - for stdout",
+        )
+        parser.add_argument(
+            "--ndjson",
+            action="store_true",
+            help="Write only the NDJSON manifest (implied by a .ndjson path)",
+        )
+        parser.add_argument(
+            "--id", action="append", default=[], help="File id, may be repeated"
+        )
+        parser.add_argument("--uploaded-from", help="Earliest upload date")
+        parser.add_argument("--uploaded-to", help="Latest upload date")
+        parser.add_argument("--date-from", help="Earliest invoice date")
+        parser.add_argument("--date-to", help="Latest invoice date")
+        parser.add_argument("--vendor", help="Exact vendor name")
+
+    def handle(self, *args, **options):
+        params = QueryDict(mutable=True)
+        params.setlist("id", options["id"])
+        for name in FILTERS:
+            if options[name]:
+                params[name] = options[name]
+        try:
+            files = export_queryset(params)
+        except ValidationError as e:
+            raise CommandError(e.detail)
+
+        path = options["output"]
+        ndjson = options["ndjson"] or path.endswith(".ndjson")
+        chunks = export(files, "ndjson" if ndjson else "zip")
+        with open(path, "wb") if path != "-" else sys.stdout.buffer as out:
+            for chunk in chunks:
+                out.write(chunk)
+        if path != "-":
+            self.stdout.write(
+                self.style.SUCCESS(f"Exported {files.count()} files to {path}")
+            )
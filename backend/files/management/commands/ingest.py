@@ -0,0 +1,82 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from files.ingest import Ingest
+
+
+def megabytes(size):
+    return f"{size / 1024 / 1024:,.1f} MB"
+
+
+class Command(BaseCommand):
+    help = "Ingest every file below a directory, resuming an interrupted ingest"
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory to ingest recursively")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=min(32, (os.cpu_count() or 1) * 4),
+            help="Threads hashing and copying files (default: 4 per CPU, max 32)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Files stored per transaction (default: 500)",
+        )
+        parser.add_argument(
+            "--manifest",
+            help="Checkpoint file listing ingested files (default: in MEDIA_ROOT)",
+        )
+        parser.add_argument(
+            "--progress-interval",
+            type=float,
+            default=2,
+            help="Seconds between progress reports (default: 2)",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"]
+        if not os.path.isdir(directory):
+            raise CommandError(f"{directory} is not a directory")
+
+        ingest = Ingest(
+            directory,
+            manifest_path=options["manifest"],
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(f"Manifest: {ingest.manifest_path}")
+        self.last_report = 0
+        self.interval = options["progress_interval"]
+        ingest.run(progress=self.progress, errors=self.error)
+        self.progress(ingest, force=True)
+
+        elapsed = time.monotonic() - ingest.started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ingested {ingest.ingested} files in {elapsed:.1f}s, "
+                f"skipped {ingest.skipped} already ingested, {ingest.failed} failed"
+            )
+        )
+
+    def progress(self, ingest, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_report < self.interval:
+            return
+        self.last_report = now
+        files_per_second, bytes_per_second, eta = ingest.rates()
+        eta = str(timedelta(seconds=round(eta))) if eta is not None else "-"
+        self.stdout.write(
+            f"{ingest.done}/{ingest.total} files, "
+            f"{megabytes(ingest.done_bytes)}/{megabytes(ingest.total_bytes)}, "
+            f"{files_per_second:,.0f} files/s, {megabytes(bytes_per_second)}/s, "
+            f"ETA {eta}"
+        )
+
+    def error(self, source, exception):
+        self.stderr.write(f"Skipping {source.relpath}: {exception}")
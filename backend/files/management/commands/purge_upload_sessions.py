@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from files.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete expired upload sessions and their partially uploaded bytes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many sessions would be removed",
+        )
+
+    def handle(self, *args, **options):
+        if options["dry_run"]:
+            count = UploadSession.objects.expired().count()
+            self.stdout.write(f"{count} expired upload sessions would be purged")
+            return
+        purged = UploadSession.objects.purge_expired()
+        self.stdout.write(
+            self.style.SUCCESS(f"Purged {purged} expired upload sessions")
+        )
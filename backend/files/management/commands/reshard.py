@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from files.reshard import reshard
+
+
+class Command(BaseCommand):
+    help = "Move stored files into the configured directory layout, online"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Files moved per transaction (default: 500)",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches to limit the load (default: 0)",
+        )
+
+    def handle(self, *args, **options):
+        width, depth = settings.UPLOAD_SHARD_WIDTH, settings.UPLOAD_SHARD_DEPTH
+        levels = ["x" * width] * depth
+        self.stdout.write(f"Layout: {'/'.join(['uploads', *levels, '<name>'])}")
+        report = reshard(
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            progress=lambda report: self.stdout.write(f"{report.moved} moved"),
+        )
+        style = self.style.WARNING if report.missing else self.style.SUCCESS
+        self.stdout.write(
+            style(
+                f"{report.moved} files moved, {report.skipped} already in place, "
+                f"{report.missing} missing"
+            )
+        )
@@ -0,0 +1,117 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from files.scrub import scrub
+
+
+def megabytes(size):
+    return f"{size / 1024 / 1024:,.1f} MB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Find orphaned files and missing or corrupt content, and check blob "
+        "reference counts"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--orphans",
+            choices=["report", "quarantine", "delete"],
+            default=settings.SCRUB_ORPHANS,
+            help="What to do with orphaned files (default: SCRUB_ORPHANS)",
+        )
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=settings.SCRUB_ORPHAN_MIN_AGE,
+            help="Seconds before an unreferenced file counts as orphaned",
+        )
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Also check stored content against its SHA-256",
+        )
+        parser.add_argument(
+            "--rate",
+            type=int,
+            default=settings.SCRUB_VERIFY_RATE,
+            help="Bytes per second read while verifying, 0 for no limit",
+        )
+        parser.add_argument(
+            "--max-bytes",
+            type=int,
+            default=None,
+            help="Bytes to verify in this run, least recently verified first",
+        )
+        parser.add_argument(
+            "--repair-ref-counts",
+            action="store_true",
+            help="Set blob reference counts from the files using them",
+        )
+        parser.add_argument(
+            "--every",
+            type=int,
+            nargs="?",
+            const=settings.SCRUB_INTERVAL,
+            help=(
+                "Keep running, scrubbing every N seconds (default: SCRUB_INTERVAL) "
+                "and verifying up to SCRUB_VERIFY_MAX_BYTES each time"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        every = options["every"]
+        max_bytes = options["max_bytes"]
+        if every is None:
+            self.run(options, max_bytes)
+            return
+
+        if max_bytes is None:
+            max_bytes = settings.SCRUB_VERIFY_MAX_BYTES
+        if settings.SCRUB_NICENESS:
+            os.nice(settings.SCRUB_NICENESS)
+        self.stdout.write(f"Scrubbing storage every {every}s")
+        try:
+            while True:
+                try:
+                    self.run(options, max_bytes)
+                except Exception as e:
+                    self.stderr.write(f"Scrub failed: {e!r}")
+                close_old_connections()
+                time.sleep(every)
+        except KeyboardInterrupt:
+            self.stdout.write("Scrubber stopped")
+
+    def run(self, options, max_bytes):
+        started = time.monotonic()
+        report = scrub(
+            orphans=options["orphans"],
+            min_age=options["min_age"],
+            verify=options["verify"],
+            rate=options["rate"],
+            max_bytes=max_bytes,
+            repair=options["repair_ref_counts"],
+        )
+        if options["verbosity"] >= 2:
+            for kind, name in report.details:
+                self.stdout.write(f"{kind}: {name}")
+
+        orphans = {"report": "found", "quarantine": "quarantined", "delete": "deleted"}
+        summary = (
+            f"{report.orphans} orphaned files ({megabytes(report.orphan_bytes)}) "
+            f"{orphans[options['orphans']]}, {report.checked} blobs checked, "
+            f"{report.verified} verified ({megabytes(report.verified_bytes)}), "
+            f"{report.missing} missing, {report.corrupt} corrupt, "
+            f"{report.ref_count_errors} wrong reference counts"
+        )
+        if options["repair_ref_counts"] and report.ref_count_errors:
+            summary += " repaired"
+        summary += f" in {time.monotonic() - started:.1f}s"
+        problems = report.missing or report.corrupt or report.ref_count_errors
+        style = self.style.WARNING if problems else self.style.SUCCESS
+        self.stdout.write(style(summary))
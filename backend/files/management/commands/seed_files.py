@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from files.seed import seed_files
+
+
+class Command(BaseCommand):
+    help = "Create synthetic files for benchmarking, see scripts/benchmark_files.py"
+
+    def add_arguments(self, parser):
+        parser.add_argument("count", type=int, help="Number of files to create")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Files inserted per transaction",
+        )
+        parser.add_argument(
+            "--no-content",
+            action="store_true",
+            help="Only create the database rows, without stored content",
+        )
+
+    def handle(self, *args, **options):
+        count = options["count"]
+        if count < 1 or options["batch_size"] < 1:
+            raise CommandError("The count and batch size must be positive")
+
+        started = time.monotonic()
+
+        def progress(created):
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"{created:,} of {count:,} files created")
+
+        created = seed_files(
+            count,
+            batch_size=options["batch_size"],
+            content=not options["no_content"],
+            progress=progress,
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created:,} files in {elapsed:.1f}s "
+                f"({created / elapsed:,.0f} per second)"
+            )
+        )
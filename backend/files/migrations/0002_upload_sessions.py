@@ -0,0 +1,116 @@
+# Generated by Django 4.2.10 on 2026-10-17 07:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadSession",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Upload Session ID",
+                    ),
+                ),
+                (
+                    "original_file_name",
+                    models.CharField(max_length=255, verbose_name="Original File Name"),
+                ),
+                (
+                    "user_defined_file_name",
+                    models.CharField(
+                        blank=True,
+                        max_length=255,
+                        null=True,
+                        verbose_name="User Defined File Name",
+                    ),
+                ),
+                (
+                    "total_size",
+                    models.PositiveBigIntegerField(verbose_name="Total Size"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created At"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated At"),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="Expires At"),
+                ),
+                (
+                    "file",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="files.file",
+                        verbose_name="File",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Upload Session",
+                "verbose_name_plural": "Upload Sessions",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="UploadChunk",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Chunk ID",
+                    ),
+                ),
+                ("offset", models.PositiveBigIntegerField(verbose_name="Offset")),
+                ("size", models.PositiveBigIntegerField(verbose_name="Size")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created At"),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="files.uploadsession",
+                        verbose_name="Upload Session",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Upload Chunk",
+                "verbose_name_plural": "Upload Chunks",
+                "ordering": ["offset"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="uploadchunk",
+            constraint=models.UniqueConstraint(
+                fields=("session", "offset"), name="unique_upload_chunk_offset"
+            ),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.10 on 2026-10-17 07:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import files.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0002_upload_sessions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Blob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Blob ID",
+                    ),
+                ),
+                (
+                    "sha256",
+                    models.CharField(
+                        max_length=64, unique=True, verbose_name="SHA-256"
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        upload_to=files.models.file_upload_path, verbose_name="File"
+                    ),
+                ),
+                ("size", models.PositiveBigIntegerField(verbose_name="Size")),
+                (
+                    "ref_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Reference Count"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created At"),
+                ),
+            ],
+            options={
+                "verbose_name": "Blob",
+                "verbose_name_plural": "Blobs",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="file",
+            name="deduplicated",
+            field=models.BooleanField(
+                default=False,
+                help_text="Whether the upload reused content that was already stored",
+                verbose_name="Deduplicated",
+            ),
+        ),
+        migrations.AddField(
+            model_name="file",
+            name="blob",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="files",
+                to="files.blob",
+                verbose_name="Blob",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.10 on 2026-10-17 07:33
+
+from django.db import migrations, models
+
+
+def copy_blob_metadata(apps, schema_editor):
+    """
+    Files stored by content already know their digest and size through the blob
+    """
+    File = apps.get_model("files", "File")
+    Blob = apps.get_model("files", "Blob")
+    for blob in Blob.objects.iterator():
+        File.objects.filter(blob=blob).update(sha256=blob.sha256, size=blob.size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0003_content_addressed_blobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="file",
+            name="mime_type",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                max_length=100,
+                verbose_name="MIME Type",
+            ),
+        ),
+        migrations.AddField(
+            model_name="file",
+            name="sha256",
+            field=models.CharField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                max_length=64,
+                null=True,
+                verbose_name="SHA-256",
+            ),
+        ),
+        migrations.AddField(
+            model_name="file",
+            name="size",
+            field=models.PositiveBigIntegerField(
+                blank=True,
+                db_index=True,
+                editable=False,
+                null=True,
+                verbose_name="Size",
+            ),
+        ),
+        migrations.RunPython(copy_blob_metadata, migrations.RunPython.noop),
+    ]
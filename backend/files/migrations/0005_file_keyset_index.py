@@ -0,0 +1,27 @@
+# Generated by Django 4.2.10 on 2026-10-17 07:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0004_upload_metadata"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="file",
+            options={
+                "ordering": ["-uploaded_at", "-id"],
+                "verbose_name": "File",
+                "verbose_name_plural": "Files",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="file",
+            index=models.Index(
+                fields=["-uploaded_at", "-id"], name="file_uploaded_at_id_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.10 on 2026-10-17 08:23
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0005_file_keyset_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeCounter",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Counter ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=50, unique=True, verbose_name="Name"),
+                ),
+                (
+                    "value",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Value"),
+                ),
+            ],
+            options={
+                "verbose_name": "Change Counter",
+                "verbose_name_plural": "Change Counters",
+                "ordering": ["name"],
+            },
+        ),
+    ]
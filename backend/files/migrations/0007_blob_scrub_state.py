@@ -0,0 +1,47 @@
+# Generated by Django 4.2.10 on 2026-10-17 08:34
+
+from django.db import migrations, models
+import files.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("files", "0006_change_counter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blob",
+            name="problem",
+            field=models.CharField(
+                blank=True,
+                choices=[("", "None"), ("missing", "Missing"), ("corrupt", "Corrupt")],
+                db_index=True,
+                default="",
+                help_text="What the scrubber found wrong with the stored content",
+                max_length=10,
+                verbose_name="Problem",
+            ),
+        ),
+        migrations.AddField(
+            model_name="blob",
+            name="verified_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="When the scrubber last checked the content against its digest",
+                null=True,
+                verbose_name="Verified At",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="blob",
+            name="file",
+            field=models.FileField(
+                db_index=True,
+                upload_to=files.models.file_upload_path,
+                verbose_name="File",
+            ),
+        ),
+    ]
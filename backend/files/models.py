@@ -1,17 +1,208 @@
 import os
 import uuid
-from django.db import models
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
 def file_upload_path(instance, filename):
     """
     Generate a unique path for uploaded files
-    Files are stored in MEDIA_ROOT/uploads/uuid-originalfilename
+    Content-addressed files are stored in MEDIA_ROOT/uploads/sha256.ext,
+    anything without a known hash in MEDIA_ROOT/uploads/uuid.ext, both fanned
+    out into subdirectories by `sharded_upload_name`
     """
     ext = filename.split(".")[-1]
-    filename = f"{instance.id}.{ext}"
-    return os.path.join("uploads", filename)
+    key = getattr(instance, "sha256", None) or instance.id
+    return sharded_upload_name(f"{key}.{ext}")
+
+
+def sharded_upload_name(filename):
+    """
+    Storage name of an upload in the configured directory fan-out, such as
+    uploads/ab/cd/abcd0123.pdf for two levels of two characters
+    """
+    width = settings.UPLOAD_SHARD_WIDTH
+    stem = filename.split(".")[0]
+    shards = [
+        stem[level * width : (level + 1) * width]
+        for level in range(settings.UPLOAD_SHARD_DEPTH)
+    ]
+    return os.path.join("uploads", *filter(None, shards), filename)
+
+
+class BlobManager(models.Manager):
+    def acquire(self, uploaded_file, sha256):
+        """
+        Return the blob holding the given content, storing it if it is new
+        Returns a (blob, created) tuple; the blob's reference count has already
+        been incremented for the caller
+        """
+        blob = self._reference(sha256)
+        if blob is not None:
+            return blob, False
+
+        blob = self.model(sha256=sha256, size=uploaded_file.size, ref_count=1)
+        blob.file.save(uploaded_file.name, uploaded_file, save=False)
+        try:
+            with transaction.atomic():
+                blob.save(force_insert=True)
+        except IntegrityError:
+            # Another request stored the same content first, keep theirs
+            blob.file.delete(save=False)
+            blob = self._reference(sha256)
+            if blob is None:
+                raise
+            return blob, False
+        return blob, True
+
+    def acquire_many(self, contents):
+        """
+        Bulk variant of `acquire` for a batch of content in one transaction
+        `contents` maps SHA-256 digests to (uploaded file, number of references)
+        pairs. Returns a dict of digest to (blob, created), with the reference
+        counts already incremented.
+        """
+        existing = set(
+            self.filter(sha256__in=contents).values_list("sha256", flat=True)
+        )
+        new = []
+        for sha256, (uploaded_file, _) in contents.items():
+            if sha256 not in existing:
+                blob = self.model(sha256=sha256, size=uploaded_file.size, ref_count=0)
+                blob.file.save(uploaded_file.name, uploaded_file, save=False)
+                new.append(blob)
+        self.bulk_create(new, ignore_conflicts=True)
+
+        by_count = defaultdict(list)
+        for sha256, (_, count) in contents.items():
+            by_count[count].append(sha256)
+        for count, digests in by_count.items():
+            self.filter(sha256__in=digests).update(ref_count=F("ref_count") + count)
+
+        blobs = self.in_bulk(list(contents), field_name="sha256")
+        created = set()
+        for blob in new:
+            if blobs[blob.sha256].pk == blob.pk:
+                created.add(blob.sha256)
+            else:
+                # Another request stored the same content first, keep theirs
+                blob.file.delete(save=False)
+        return {sha256: (blobs[sha256], sha256 in created) for sha256 in contents}
+
+    def _reference(self, sha256):
+        if self.filter(sha256=sha256).update(ref_count=F("ref_count") + 1):
+            return self.get(sha256=sha256)
+        return None
+
+    def release(self, blob_ids):
+        """
+        Drop one reference per occurrence of a blob id, deleting blobs that are
+        no longer referenced once the surrounding transaction commits
+        """
+        counts = Counter(blob_ids)
+        # One update per distinct count, which is mostly a single one
+        by_count = defaultdict(list)
+        for blob_id, count in counts.items():
+            by_count[count].append(blob_id)
+        for count, ids in by_count.items():
+            self.filter(pk__in=ids).update(ref_count=F("ref_count") - count)
+        self.delete_unreferenced(counts)
+
+    def delete_unreferenced(self, blob_ids):
+        """
+        Delete those of the given blobs that are no longer referenced, and
+        their content once the surrounding transaction commits
+        """
+        # Lock the unreferenced blobs, so a concurrent acquire waits for them to
+        # be deleted instead of referencing content that is about to go away
+        unreferenced = self.select_for_update().filter(
+            pk__in=blob_ids, ref_count__lte=0
+        )
+        names = list(unreferenced.values_list("file", flat=True))
+        if names:
+            unreferenced.delete()
+            storage = self.model._meta.get_field("file").storage
+            transaction.on_commit(lambda: [storage.delete(name) for name in names])
+
+
+class Blob(models.Model):
+    """
+    Stored file content, shared by every File with the same SHA-256 digest
+    """
+
+    id = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False, verbose_name=_("Blob ID")
+    )
+
+    class Problem(models.TextChoices):
+        NONE = "", _("None")
+        MISSING = "missing", _("Missing")
+        CORRUPT = "corrupt", _("Corrupt")
+
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name=_("SHA-256"))
+    file = models.FileField(
+        upload_to=file_upload_path, db_index=True, verbose_name=_("File")
+    )
+    size = models.PositiveBigIntegerField(verbose_name=_("Size"))
+    ref_count = models.PositiveIntegerField(
+        default=0, verbose_name=_("Reference Count")
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    verified_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        db_index=True,
+        help_text=_("When the scrubber last checked the content against its digest"),
+        verbose_name=_("Verified At"),
+    )
+    problem = models.CharField(
+        max_length=10,
+        blank=True,
+        choices=Problem.choices,
+        default=Problem.NONE,
+        db_index=True,
+        help_text=_("What the scrubber found wrong with the stored content"),
+        verbose_name=_("Problem"),
+    )
+
+    objects = BlobManager()
+
+    class Meta:
+        verbose_name = _("Blob")
+        verbose_name_plural = _("Blobs")
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return self.sha256
+
+
+class FileQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Delete the files and release their stored content
+        """
+        with transaction.atomic():
+            rows = list(self.values_list("blob_id", "file"))
+            result = super().delete()
+            release_file_content(rows)
+        return result
+
+
+def release_file_content(rows):
+    """
+    Release the content of deleted files given (blob_id, file name) pairs
+    Files stored before content addressing own their file outright
+    """
+    Blob.objects.release(blob_id for blob_id, _ in rows if blob_id)
+    names = [name for blob_id, name in rows if not blob_id and name]
+    if names:
+        storage = File._meta.get_field("file").storage
+        transaction.on_commit(lambda: [storage.delete(name) for name in names])
 
 
 class File(models.Model):
@@ -29,13 +220,49 @@ class File(models.Model):
         max_length=255, blank=True, null=True, verbose_name=_("User Defined File Name")
     )
     file = models.FileField(upload_to=file_upload_path, verbose_name=_("File"))
+    blob = models.ForeignKey(
+        Blob,
+        on_delete=models.PROTECT,
+        blank=True,
+        null=True,
+        related_name="files",
+        verbose_name=_("Blob"),
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        null=True,
+        db_index=True,
+        editable=False,
+        verbose_name=_("SHA-256"),
+    )
+    size = models.PositiveBigIntegerField(
+        blank=True, null=True, db_index=True, editable=False, verbose_name=_("Size")
+    )
+    mime_type = models.CharField(
+        max_length=100,
+        blank=True,
+        db_index=True,
+        editable=False,
+        verbose_name=_("MIME Type"),
+    )
+    deduplicated = models.BooleanField(
+        default=False,
+        help_text=_("Whether the upload reused content that was already stored"),
+        verbose_name=_("Deduplicated"),
+    )
     uploaded_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Uploaded At"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
 
+    objects = FileQuerySet.as_manager()
+
     class Meta:
         verbose_name = _("File")
         verbose_name_plural = _("Files")
-        ordering = ["-uploaded_at"]
+        ordering = ["-uploaded_at", "-id"]
+        indexes = [
+            models.Index(fields=["-uploaded_at", "-id"], name="file_uploaded_at_id_idx")
+        ]
 
     def __str__(self):
         return self.user_defined_file_name or self.original_file_name
@@ -45,3 +272,215 @@ class File(models.Model):
         Return the user-defined name if available, otherwise the original name
         """
         return self.user_defined_file_name or self.original_file_name
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete the file and release its stored content
+        """
+        with transaction.atomic():
+            rows = [(self.blob_id, self.file.name)]
+            result = super().delete(*args, **kwargs)
+            release_file_content(rows)
+        return result
+
+
+def upload_session_part_path(session_id):
+    """
+    Absolute path of the partially uploaded bytes of an upload session
+    Parts live in MEDIA_ROOT/upload_sessions so finalizing is a rename, not a copy
+    """
+    return os.path.join(settings.MEDIA_ROOT, "upload_sessions", f"{session_id}.part")
+
+
+class UploadSessionQuerySet(models.QuerySet):
+    def expired(self):
+        """
+        Sessions whose time-to-live has passed
+        """
+        return self.filter(expires_at__lt=timezone.now())
+
+    def purge_expired(self, limit=None):
+        """
+        Delete expired sessions together with their part files
+        Returns the number of sessions removed
+        """
+        sessions = self.expired().order_by("expires_at")
+        if limit is not None:
+            sessions = sessions[:limit]
+        purged = 0
+        for session in sessions:
+            session.delete()
+            purged += 1
+        return purged
+
+
+class UploadSession(models.Model):
+    """
+    Resumable upload that receives a file in byte-range chunks before it is
+    finalized into a File
+    """
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        verbose_name=_("Upload Session ID"),
+    )
+    original_file_name = models.CharField(
+        max_length=255, verbose_name=_("Original File Name")
+    )
+    user_defined_file_name = models.CharField(
+        max_length=255, blank=True, null=True, verbose_name=_("User Defined File Name")
+    )
+    total_size = models.PositiveBigIntegerField(verbose_name=_("Total Size"))
+    file = models.ForeignKey(
+        File,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name="+",
+        verbose_name=_("File"),
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+    expires_at = models.DateTimeField(db_index=True, verbose_name=_("Expires At"))
+
+    objects = UploadSessionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("Upload Session")
+        verbose_name_plural = _("Upload Sessions")
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return self.original_file_name
+
+    @property
+    def part_path(self):
+        return upload_session_part_path(self.id)
+
+    def touch(self):
+        """
+        Push the expiry forward, keeping an active session alive
+        """
+        self.expires_at = timezone.now() + timedelta(
+            seconds=settings.UPLOAD_SESSION_TTL
+        )
+
+    def save(self, *args, **kwargs):
+        if self.expires_at is None:
+            self.touch()
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """
+        Remove the part file along with the session
+        """
+        result = super().delete(*args, **kwargs)
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
+        return result
+
+    def committed_ranges(self):
+        """
+        Merged, sorted list of [start, end) byte ranges that have been received
+        """
+        ranges = []
+        for offset, size in self.chunks.order_by("offset").values_list(
+            "offset", "size"
+        ):
+            end = offset + size
+            if ranges and offset <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], end)
+            else:
+                ranges.append([offset, end])
+        return ranges
+
+    def missing_ranges(self, committed=None):
+        """
+        Sorted list of [start, end) byte ranges that are still to be uploaded
+        """
+        if committed is None:
+            committed = self.committed_ranges()
+        missing = []
+        position = 0
+        for start, end in committed:
+            if start > position:
+                missing.append([position, start])
+            position = max(position, end)
+        if position < self.total_size:
+            missing.append([position, self.total_size])
+        return missing
+
+    def next_offset(self, committed=None):
+        """
+        First byte not covered by the contiguous run of chunks starting at 0
+        """
+        if committed is None:
+            committed = self.committed_ranges()
+        if committed and committed[0][0] == 0:
+            return committed[0][1]
+        return 0
+
+    def is_complete(self):
+        return not self.missing_ranges()
+
+
+class UploadChunk(models.Model):
+    """
+    A byte range of an upload session that has been written to its part file
+    """
+
+    id = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False, verbose_name=_("Chunk ID")
+    )
+    session = models.ForeignKey(
+        UploadSession,
+        on_delete=models.CASCADE,
+        related_name="chunks",
+        verbose_name=_("Upload Session"),
+    )
+    offset = models.PositiveBigIntegerField(verbose_name=_("Offset"))
+    size = models.PositiveBigIntegerField(verbose_name=_("Size"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+
+    class Meta:
+        verbose_name = _("Upload Chunk")
+        verbose_name_plural = _("Upload Chunks")
+        ordering = ["offset"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session", "offset"], name="unique_upload_chunk_offset"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.session_id} [{self.offset}, {self.offset + self.size})"
+
+
+class ChangeCounter(models.Model):
+    """
+    Version of a collection, bumped whenever anything in it changes
+
+    Kept in the database so that every server process sees the same version
+    and can validate cached responses against it.
+    """
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        verbose_name=_("Counter ID"),
+    )
+    name = models.CharField(max_length=50, unique=True, verbose_name=_("Name"))
+    value = models.PositiveBigIntegerField(default=0, verbose_name=_("Value"))
+
+    class Meta:
+        verbose_name = _("Change Counter")
+        verbose_name_plural = _("Change Counters")
+        ordering = ["name"]
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
@@ -0,0 +1,240 @@
+"""
+Keyset pagination for file listings
+
+Pages are selected with a `WHERE (uploaded_at, id) < (cursor)` condition on a
+composite index instead of an OFFSET, so every page costs the same no matter
+how deep it is. Total counts are opt-in and come from a cached estimate, as an
+exact `COUNT(*)` on every request grows with the table.
+"""
+
+import hashlib
+import json
+import uuid
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def positive_int(value, strict=False, cutoff=None):
+    """
+    Parse a non-negative integer query parameter, or a positive one if `strict`
+    Values above `cutoff` are lowered to it; raises ValueError if invalid.
+    """
+    value = int(value)
+    if value < 0 or (strict and value == 0):
+        raise ValueError(value)
+    return min(value, cutoff) if cutoff else value
+
+
+def estimate_count(queryset):
+    """
+    Approximate number of rows in a queryset, cached for a short while
+
+    On PostgreSQL an unfiltered table is estimated from the planner statistics,
+    everything else is counted once per cache period.
+    """
+    key = "row-count:" + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    count = cache.get(key)
+    if count is not None:
+        return count
+
+    count = None
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql" and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # Tables that were never analyzed report -1
+        if row and row[0] >= 0:
+            count = row[0]
+    if count is None:
+        count = queryset.count()
+    cache.set(key, count, settings.ROW_COUNT_CACHE_TTL)
+    return count
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on a descending (timestamp, id) key
+
+    The cursor encodes the key of the last row of a page, plus whether it
+    points backwards for `previous` links. The key is unique, so rows are never
+    skipped or repeated when rows are added or removed between requests.
+    """
+
+    timestamp_field = "uploaded_at"
+    id_field = "id"
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    count_query_param = "count"
+
+    def get_page_size(self, request):
+        try:
+            return positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=settings.API_MAX_PAGE_SIZE,
+            )
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+
+    def encode_cursor(self, row, reverse):
+        position = [getattr(row, self.timestamp_field).isoformat(), str(row.pk)]
+        payload = json.dumps({"p": position, "r": int(reverse)}).encode()
+        cursor = urlsafe_b64encode(payload).decode().rstrip("=")
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """
+        Position and direction of the cursor in the request, or None
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)))
+            timestamp, pk = payload["p"]
+            timestamp = parse_datetime(timestamp)
+            if timestamp is None:
+                raise ValueError(timestamp)
+            return timestamp, uuid.UUID(pk), bool(payload["r"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound("Invalid cursor")
+
+    def get_page_queryset(self, queryset, request):
+        """
+        Slice of the queryset holding the requested page plus one extra row
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.count = None
+        count = request.query_params.get(self.count_query_param, "")
+        self.include_count = count.lower() in ("1", "true")
+
+        cursor = self.decode_cursor(request)
+        self.has_cursor = cursor is not None
+        self.reverse = bool(cursor and cursor[2])
+        if cursor:
+            timestamp, pk = cursor[:2]
+            lookup = "gt" if self.reverse else "lt"
+            # The inclusive bound on its own gives the planner an index range to
+            # scan, the OR only breaks ties within a single timestamp
+            queryset = queryset.filter(
+                Q(**{f"{self.timestamp_field}__{lookup}e": timestamp}),
+                Q(**{f"{self.timestamp_field}__{lookup}": timestamp})
+                | Q(**{f"{self.id_field}__{lookup}": pk}),
+            )
+        order = "" if self.reverse else "-"
+        queryset = queryset.order_by(
+            f"{order}{self.timestamp_field}", f"{order}{self.id_field}"
+        )
+        # One extra row tells whether there is another page in this direction
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, rows):
+        """
+        Keep the rows of the page fetched from `get_page_queryset`
+        """
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = self.has_cursor, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+        self.page = rows
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.get_page_queryset(queryset, request)
+        if self.include_count:
+            self.count = estimate_count(queryset.order_by())
+        return self.set_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        Async variant of `paginate_queryset`, for views running on an event loop
+        """
+        page = self.get_page_queryset(queryset, request)
+        if self.include_count:
+            self.count = await sync_to_async(estimate_count)(queryset.order_by())
+        return self.set_page([row async for row in page])
+
+    def get_paginated_data(self, data):
+        content = OrderedDict(
+            [("next", self.get_next_link()), ("previous", self.get_previous_link())]
+        )
+        if self.count is not None:
+            content["count"] = self.count
+        content["results"] = data
+        return content
+
+    def get_next_link(self):
+        if not (self.page and self.has_next):
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not (self.page and self.has_previous):
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {
+                    "type": "integer",
+                    "description": "Approximate total, only included with count=true",
+                },
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor from a next or previous link",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": (
+                    f"Results per page, at most {settings.API_MAX_PAGE_SIZE}"
+                ),
+                "schema": {"type": "integer"},
+            },
+            {
+                "name": self.count_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Include an approximate total count",
+                "schema": {"type": "boolean"},
+            },
+        ]
@@ -0,0 +1,151 @@
+"""
+Online move of stored content into the configured upload layout
+
+Content is moved a batch at a time while the application keeps running. Each
+file is first hard-linked at its new name, so it can be read under both names,
+then the names stored on blobs and files are switched in one transaction, and
+the old names are unlinked once the following batch has been switched, giving
+requests that read an old name just before the switch time to open it. Runs
+are resumable: content already at its new name is skipped, a link left by an
+interrupted run is reused, and old names an interrupted run did not unlink are
+collected as orphans by the scrubber.
+"""
+
+import os
+import time
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Case, CharField, F, Value, When
+from django.utils import timezone
+
+from .caching import FILES_COLLECTION, bump_version
+from .models import Blob, File, sharded_upload_name
+
+
+@dataclass
+class Report:
+    """
+    What a reshard did
+    """
+
+    moved: int = 0
+    skipped: int = 0
+    missing: int = 0
+
+
+def stored_names(queryset, batch_size):
+    """
+    Batches of the stored names in a queryset, read page by page in id order
+    """
+    queryset = queryset.order_by("id")
+    last_id = None
+    while True:
+        page = queryset.filter(id__gt=last_id) if last_id else queryset
+        rows = list(page.values_list("id", "file")[:batch_size])
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [name for _, name in rows]
+
+
+def target_name(name):
+    return sharded_upload_name(os.path.basename(name))
+
+
+def link(storage, name):
+    """
+    Hard-link stored content at its new name and return that name, or None if
+    the content is missing
+    """
+    source = storage.path(name)
+    target = target_name(name)
+    os.makedirs(os.path.dirname(storage.path(target)), exist_ok=True)
+    try:
+        os.link(source, storage.path(target))
+    except FileNotFoundError:
+        return None
+    except FileExistsError:
+        if not os.path.samefile(source, storage.path(target)):
+            # Taken by other content, link under a free variant of the name
+            target = storage.get_available_name(target)
+            os.link(source, storage.path(target))
+    return target
+
+
+def switch(renames):
+    """
+    Point the blobs and files stored under the old names at the new names
+    """
+    new_name = Case(
+        *(When(file=old, then=Value(new)) for old, new in renames.items()),
+        default=F("file"),
+        output_field=CharField(),
+    )
+    with transaction.atomic():
+        Blob.objects.filter(file__in=renames).update(file=new_name)
+        # A new updated_at gives cached responses showing the name a new key
+        files = File.objects.filter(file__in=renames).update(
+            file=new_name, updated_at=timezone.now()
+        )
+        if files:
+            bump_version(FILES_COLLECTION)
+
+
+def unlink(storage, names):
+    """
+    Remove old names, and the directories of an earlier layout they leave empty
+    """
+    uploads = storage.path("uploads")
+    for name in names:
+        path = storage.path(name)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        directory = os.path.dirname(path)
+        while directory.startswith(uploads + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                break
+            directory = os.path.dirname(directory)
+
+
+def reshard(batch_size=500, pause=0, progress=None):
+    """
+    Move all stored content to its place in the configured layout, sleeping
+    `pause` seconds between batches and calling `progress(report)` after each
+    """
+    report = Report()
+    storage = Blob._meta.get_field("file").storage
+    pending = []
+    sources = [
+        Blob.objects.all(),
+        # Files stored before content addressing own their content
+        File.objects.filter(blob__isnull=True).exclude(file=""),
+    ]
+    for queryset in sources:
+        for names in stored_names(queryset, batch_size):
+            renames = {}
+            for name in names:
+                if name == target_name(name):
+                    report.skipped += 1
+                    continue
+                target = link(storage, name)
+                if target is None:
+                    report.missing += 1
+                else:
+                    renames[name] = target
+            if not renames:
+                continue
+            switch(renames)
+            unlink(storage, pending)
+            pending = list(renames)
+            report.moved += len(renames)
+            if progress:
+                progress(report)
+            if pause:
+                time.sleep(pause)
+    unlink(storage, pending)
+    return report
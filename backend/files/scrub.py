@@ -0,0 +1,358 @@
+"""
+Consistency checks between stored content and the database
+
+The storage listing is walked lazily and looked up in the database a batch of
+names at a time, and database rows are read with server-side iterators, so a
+scrub runs in constant memory whatever the number of files. A scrub:
+
+- finds orphans: stored content no Blob or File refers to, leftovers of
+  interrupted uploads in `uploads/.incoming/`, and part files of upload
+  sessions that no longer exist. Anything younger than `min_age` is left alone
+  as it may belong to an upload in progress. Orphans are reported, moved to
+  `MEDIA_ROOT/quarantine/` or deleted.
+- checks every Blob's content for existence and size, and optionally verifies
+  its SHA-256 at a limited rate so the disk stays responsive. The least
+  recently checked blobs go first, so a byte budget per run still covers all
+  content over successive runs. Findings are stored in `Blob.problem`.
+- compares reference counts with the number of files using each blob, and
+  repairs them on request.
+"""
+
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Blob, File, UploadSession
+from .uploadhandler import incoming_upload_dir
+
+READ_BUFFER_SIZE = 1024 * 1024
+UPLOADS_DIR = "uploads"
+SESSIONS_DIR = "upload_sessions"
+QUARANTINE_DIR = "quarantine"
+# Most problem names kept for detailed output
+MAX_DETAILS = 1000
+
+
+@dataclass
+class Report:
+    """
+    What a scrub found and did
+    """
+
+    orphans: int = 0
+    orphan_bytes: int = 0
+    missing: int = 0
+    corrupt: int = 0
+    checked: int = 0
+    verified: int = 0
+    verified_bytes: int = 0
+    ref_count_errors: int = 0
+    # Names of the problematic items, for detailed output
+    details: list = field(default_factory=list)
+
+    def note(self, kind, name):
+        if len(self.details) < MAX_DETAILS:
+            self.details.append((kind, name))
+
+
+class Throttle:
+    """
+    Sleeps as needed to keep a byte rate below `rate` bytes per second
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.started = time.monotonic()
+        self.consumed = 0
+
+    def consume(self, size):
+        if not self.rate:
+            return
+        self.consumed += size
+        ahead = self.consumed / self.rate - (time.monotonic() - self.started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def walk(directory, skip=()):
+    """
+    Paths and stat results of the regular files below a directory
+    """
+    try:
+        entries = os.scandir(directory)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.path not in skip:
+                    yield from walk(entry.path, skip)
+            elif entry.is_file(follow_symlinks=False):
+                try:
+                    yield entry.path, entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    # Deleted while walking
+                    continue
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def storage_name(path):
+    """
+    Storage name of a path below MEDIA_ROOT, as stored in FileFields
+    """
+    return os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, "/")
+
+
+def find_orphans(min_age, batch_size=1000):
+    """
+    (storage name, path, size) of stored files nothing refers to, older than
+    `min_age` seconds
+    """
+    cutoff = time.time() - min_age
+    uploads = os.path.join(settings.MEDIA_ROOT, UPLOADS_DIR)
+    incoming = incoming_upload_dir()
+
+    old_files = (
+        (storage_name(path), path, stat.st_size)
+        for path, stat in walk(uploads, skip={incoming})
+        if stat.st_mtime < cutoff
+    )
+    for batch in batched(old_files, batch_size):
+        names = [name for name, _, _ in batch]
+        known = set(Blob.objects.filter(file__in=names).values_list("file", flat=True))
+        known.update(
+            File.objects.filter(blob__isnull=True, file__in=names).values_list(
+                "file", flat=True
+            )
+        )
+        yield from (item for item in batch if item[0] not in known)
+
+    # Uploads still being received are younger than the cutoff
+    for path, stat in walk(incoming):
+        if stat.st_mtime < cutoff:
+            yield storage_name(path), path, stat.st_size
+
+    parts = (
+        (path, stat)
+        for path, stat in walk(os.path.join(settings.MEDIA_ROOT, SESSIONS_DIR))
+        if stat.st_mtime < cutoff
+    )
+    for batch in batched(parts, batch_size):
+        session_ids = {}
+        for path, stat in batch:
+            session_id, ext = os.path.splitext(os.path.basename(path))
+            session_ids[path] = session_id if ext == ".part" else None
+        existing = {
+            str(pk)
+            for pk in UploadSession.objects.filter(
+                pk__in=[pk for pk in session_ids.values() if is_uuid(pk)]
+            ).values_list("pk", flat=True)
+        }
+        for path, stat in batch:
+            if session_ids[path] not in existing:
+                yield storage_name(path), path, stat.st_size
+
+
+def is_uuid(value):
+    try:
+        uuid.UUID(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def dispose(name, path, action):
+    """
+    Quarantine or delete an orphan; "report" leaves it in place
+    """
+    if action == "delete":
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    elif action == "quarantine":
+        target = os.path.join(settings.MEDIA_ROOT, QUARANTINE_DIR, name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+
+
+def sha256_of_path(path, throttle):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fileobj:
+        for block in iter(lambda: fileobj.read(READ_BUFFER_SIZE), b""):
+            digest.update(block)
+            throttle.consume(len(block))
+    return digest.hexdigest()
+
+
+def check_blobs(report, batch_size=500):
+    """
+    Check that the content of every blob exists and has the right size
+    """
+    storage = Blob._meta.get_field("file").storage
+    blobs = Blob.objects.order_by("id").only("id", "file", "size", "problem")
+    last_id = None
+    while True:
+        page = blobs.filter(id__gt=last_id) if last_id else blobs
+        batch = list(page[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        changed = []
+        for blob in batch:
+            try:
+                size = os.stat(storage.path(blob.file.name)).st_size
+            except FileNotFoundError:
+                problem = Blob.Problem.MISSING
+            else:
+                problem = (
+                    Blob.Problem.NONE if size == blob.size else Blob.Problem.CORRUPT
+                )
+            if problem == Blob.Problem.NONE and blob.problem == Blob.Problem.CORRUPT:
+                # A digest mismatch found earlier is only cleared by verifying
+                problem = Blob.Problem.CORRUPT
+            record(report, blob, problem, changed)
+        Blob.objects.bulk_update(changed, ["problem"])
+
+    # Files stored before content addressing have no blob to record problems on
+    legacy = File.objects.filter(blob__isnull=True).exclude(file="")
+    for name in legacy.values_list("file", flat=True).iterator(chunk_size=batch_size):
+        if not os.path.exists(storage.path(name)):
+            report.missing += 1
+            report.note("missing", name)
+
+
+def verify_blobs(report, rate=0, max_bytes=None, batch_size=100):
+    """
+    Check the content of blobs against their SHA-256, least recently verified
+    first, reading at most `rate` bytes per second and `max_bytes` in total
+    """
+    throttle = Throttle(rate)
+    storage = Blob._meta.get_field("file").storage
+    started = timezone.now()
+    # Verified blobs get a newer timestamp and drop out of the range
+    due = (
+        Blob.objects.filter(Q(verified_at__isnull=True) | Q(verified_at__lt=started))
+        .order_by(F("verified_at").asc(nulls_first=True), "id")
+        .only("id", "sha256", "file", "size", "problem")
+    )
+    while max_bytes is None or report.verified_bytes < max_bytes:
+        batch = list(due[:batch_size])
+        if not batch:
+            break
+        changed = []
+        for blob in batch:
+            if max_bytes is not None and report.verified_bytes >= max_bytes:
+                break
+            path = storage.path(blob.file.name)
+            try:
+                digest = sha256_of_path(path, throttle)
+            except FileNotFoundError:
+                problem = Blob.Problem.MISSING
+            else:
+                report.verified_bytes += blob.size
+                if digest == blob.sha256:
+                    problem = Blob.Problem.NONE
+                else:
+                    problem = Blob.Problem.CORRUPT
+            blob.verified_at = timezone.now()
+            record(report, blob, problem, changed, verified=True)
+        Blob.objects.bulk_update(changed, ["problem", "verified_at"])
+
+
+def record(report, blob, problem, changed, verified=False):
+    """
+    Count a blob's problem and queue the blob for saving if anything changed
+
+    Verification runs after the size check of the same scrub, which already
+    counted the blob with its previous problem, so only a change is counted.
+    """
+    if verified:
+        report.verified += 1
+        count(report, blob.problem, -1)
+    else:
+        report.checked += 1
+    count(report, problem, 1)
+    if problem and (problem != blob.problem or not verified):
+        report.note(problem, blob.file.name)
+    if verified or problem != blob.problem:
+        blob.problem = problem
+        changed.append(blob)
+
+
+def count(report, problem, delta):
+    if problem == Blob.Problem.MISSING:
+        report.missing += delta
+    elif problem == Blob.Problem.CORRUPT:
+        report.corrupt += delta
+
+
+def check_reference_counts(report, repair=False):
+    """
+    Find blobs whose reference count differs from the number of files using
+    them; `repair` sets the counts from the files and deletes unused blobs
+    """
+    wrong = Blob.objects.annotate(files_count=Count("files")).exclude(
+        ref_count=F("files_count")
+    )
+    ids = []
+    for blob_id, name in wrong.values_list("id", "file").iterator():
+        report.ref_count_errors += 1
+        report.note("ref_count", name)
+        ids.append(blob_id)
+    if not repair:
+        return
+
+    files = File.objects.filter(blob=OuterRef("pk")).order_by()
+    actual = files.values("blob").annotate(count=Count("*")).values("count")
+    for batch in batched(ids, 500):
+        with transaction.atomic():
+            # Counted in the same statement, so concurrent uploads are included
+            Blob.objects.filter(pk__in=batch).update(
+                ref_count=Coalesce(Subquery(actual), 0)
+            )
+            Blob.objects.delete_unreferenced(batch)
+
+
+def scrub(
+    orphans="report",
+    min_age=3600,
+    verify=False,
+    rate=0,
+    max_bytes=None,
+    repair=False,
+):
+    """
+    Run every check and return a Report
+    `orphans` is what to do with orphaned files: report, quarantine or delete
+    """
+    report = Report()
+    for name, path, size in find_orphans(min_age):
+        report.orphans += 1
+        report.orphan_bytes += size
+        report.note("orphan", name)
+        dispose(name, path, orphans)
+    check_blobs(report)
+    if verify:
+        verify_blobs(report, rate=rate, max_bytes=max_bytes)
+    check_reference_counts(report, repair=repair)
+    return report
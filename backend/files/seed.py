@@ -0,0 +1,70 @@
+"""
+Synthetic files for benchmarks
+
+Rows are bulk inserted a batch at a time, bypassing the upload path and its
+signals, so seeded files are neither indexed for search nor queued for
+parsing. Every file gets its own small content and blob, as an upload would,
+so deleting seeded files releases content the same way; with `content=False`
+only the rows are written, for seeds too large to be worth a file each.
+"""
+
+import hashlib
+import os
+import uuid
+
+from django.db import transaction
+
+from .caching import FILES_COLLECTION, bump_version
+from .models import Blob, File, sharded_upload_name
+
+CONTENT = "Invoice {number}\nVendor: Seed Supplies {vendor}\nTotal: {total}\n{token}\n"
+
+
+def seed_files(count, batch_size=5000, content=True, progress=None):
+    """
+    Create `count` files with synthetic content, calling `progress` with the
+    number created so far after each batch. Returns the number created.
+    """
+    storage = File._meta.get_field("file").storage
+    directories = set()
+    created = 0
+    while created < count:
+        blobs, files = [], []
+        for number in range(created, min(count, created + batch_size)):
+            data = CONTENT.format(
+                number=number + 1,
+                vendor=number % 100,
+                total=f"{number % 1000}.{number % 100:02}",
+                token=uuid.uuid4().hex,
+            ).encode()
+            sha256 = hashlib.sha256(data).hexdigest()
+            name = sharded_upload_name(f"{sha256}.txt")
+            if content:
+                path = storage.path(name)
+                directory = os.path.dirname(path)
+                if directory not in directories:
+                    os.makedirs(directory, exist_ok=True)
+                    directories.add(directory)
+                with open(path, "wb") as out:
+                    out.write(data)
+            blob = Blob(sha256=sha256, file=name, size=len(data), ref_count=1)
+            blobs.append(blob)
+            files.append(
+                File(
+                    original_file_name=f"seed-{number + 1}.txt",
+                    file=name,
+                    blob=blob,
+                    sha256=sha256,
+                    size=len(data),
+                    mime_type="text/plain",
+                )
+            )
+        with transaction.atomic():
+            Blob.objects.bulk_create(blobs)
+            File.objects.bulk_create(files)
+        created += len(files)
+        if progress:
+            progress(created)
+    if created:
+        bump_version(FILES_COLLECTION)
+    return created
@@ -1,5 +1,8 @@
+from django.conf import settings
+from django.urls import reverse
 from rest_framework import serializers
-from .models import File
+from previews.render import previewable
+from .models import File, UploadSession
 
 
 class FileSerializer(serializers.ModelSerializer):
@@ -8,6 +11,7 @@ class FileSerializer(serializers.ModelSerializer):
     """
 
     file_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
 
     class Meta:
         model = File
@@ -17,16 +21,166 @@ class FileSerializer(serializers.ModelSerializer):
             "user_defined_file_name",
             "file",
             "file_url",
+            "thumbnail_url",
+            "sha256",
+            "size",
+            "mime_type",
+            "deduplicated",
+            "uploaded_at",
+            "updated_at",
+        ]
+        read_only_fields = [
+            "id",
+            "original_file_name",
+            "sha256",
+            "size",
+            "mime_type",
+            "deduplicated",
             "uploaded_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "original_file_name", "uploaded_at", "updated_at"]
 
     def get_file_url(self, obj):
         """
-        Get the full URL for the file
+        Get the full URL of the download endpoint for the file
         """
         request = self.context.get("request")
         if request and obj.file:
-            return request.build_absolute_uri(obj.file.url)
+            return request.build_absolute_uri(
+                reverse("file-download", kwargs={"pk": obj.pk})
+            )
+        return None
+
+    def get_thumbnail_url(self, obj):
+        """
+        Get the full URL of the thumbnail, for PDFs and images
+        """
+        request = self.context.get("request")
+        if request and obj.file and previewable(obj.mime_type):
+            return request.build_absolute_uri(
+                reverse("file-thumbnail", kwargs={"pk": obj.pk})
+            )
         return None
+
+
+class BulkUploadSerializer(serializers.Serializer):
+    """
+    Multipart form of a bulk upload, fields repeated once per file
+    """
+
+    file = serializers.ListField(child=serializers.FileField())
+    user_defined_file_name = serializers.ListField(
+        child=serializers.CharField(allow_blank=True),
+        required=False,
+        help_text="Names for the files in the same order, blank for none",
+    )
+
+
+class FileRenameSerializer(serializers.ModelSerializer):
+    """
+    Item of a bulk rename: a file id and its new user-defined name
+    """
+
+    id = serializers.UUIDField()
+
+    class Meta:
+        model = File
+        fields = ["id", "user_defined_file_name"]
+        extra_kwargs = {"user_defined_file_name": {"required": True}}
+
+
+class FileIdListSerializer(serializers.Serializer):
+    """
+    Ids of the files affected by a bulk operation
+    """
+
+    ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=settings.FILE_BULK_MAX_ITEMS,
+    )
+
+
+class BulkItemResultSerializer(serializers.Serializer):
+    """
+    Outcome of one item of a bulk operation, in the order of the request
+    """
+
+    index = serializers.IntegerField()
+    id = serializers.UUIDField(required=False)
+    status = serializers.IntegerField(help_text="HTTP status the item would have")
+    file = FileSerializer(required=False)
+    errors = serializers.DictField(required=False)
+
+
+class BulkResultSerializer(serializers.Serializer):
+    """
+    Results of a bulk operation
+    """
+
+    results = BulkItemResultSerializer(many=True)
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for resumable upload sessions
+    """
+
+    chunk_size = serializers.SerializerMethodField()
+    committed_ranges = serializers.SerializerMethodField()
+    missing_ranges = serializers.SerializerMethodField()
+    next_offset = serializers.SerializerMethodField()
+    file = FileSerializer(read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = [
+            "id",
+            "original_file_name",
+            "user_defined_file_name",
+            "total_size",
+            "chunk_size",
+            "committed_ranges",
+            "missing_ranges",
+            "next_offset",
+            "file",
+            "created_at",
+            "updated_at",
+            "expires_at",
+        ]
+        read_only_fields = ["id", "file", "created_at", "updated_at", "expires_at"]
+
+    def validate_total_size(self, value):
+        if value > settings.UPLOAD_SESSION_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Uploads are limited to {settings.UPLOAD_SESSION_MAX_SIZE} bytes"
+            )
+        return value
+
+    def _committed(self, obj):
+        """
+        Committed ranges are needed by several fields, so compute them once
+        """
+        cache = self.context.setdefault("_committed_ranges", {})
+        if obj.pk not in cache:
+            cache[obj.pk] = obj.committed_ranges()
+        return cache[obj.pk]
+
+    def get_chunk_size(self, obj):
+        """
+        Largest chunk the server accepts in a single request
+        """
+        return settings.UPLOAD_SESSION_CHUNK_SIZE
+
+    def get_committed_ranges(self, obj):
+        return self._committed(obj)
+
+    def get_missing_ranges(self, obj):
+        if obj.file_id:
+            return []
+        return obj.missing_ranges(self._committed(obj))
+
+    def get_next_offset(self, obj):
+        if obj.file_id:
+            return obj.total_size
+        return obj.next_offset(self._committed(obj))
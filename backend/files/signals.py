@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .caching import FILES_COLLECTION, bump_version
+from .models import File
+
+# Sent with the list of `files` after they were created or updated in bulk,
+# which bypasses post_save; receivers should handle the whole batch at once
+files_bulk_created = Signal()
+files_bulk_updated = Signal()
+# Sent with the `ids` of files deleted in bulk inside `bulk_delete()`
+files_bulk_deleted = Signal()
+
+_deleting_in_bulk = ContextVar("deleting_in_bulk", default=False)
+
+
+@contextmanager
+def bulk_delete():
+    """
+    Skip the per-row version bump of post_delete for the deletes in the block,
+    which send `files_bulk_deleted` once instead
+    """
+    token = _deleting_in_bulk.set(True)
+    try:
+        yield
+    finally:
+        _deleting_in_bulk.reset(token)
+
+
+@receiver(post_save, sender=File)
+@receiver(post_delete, sender=File)
+def bump_files_version(sender, raw=False, **kwargs):
+    """
+    Give file listings a new version, and thus new ETags, on every change
+    """
+    if not raw and not _deleting_in_bulk.get():
+        bump_version(FILES_COLLECTION)
+
+
+@receiver(files_bulk_created)
+@receiver(files_bulk_updated)
+@receiver(files_bulk_deleted)
+def bump_files_version_once(sender, files=(), ids=(), **kwargs):
+    """
+    Give file listings a single new version for a whole batch of changes
+    """
+    if files or ids:
+        bump_version(FILES_COLLECTION)
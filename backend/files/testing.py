@@ -0,0 +1,33 @@
+"""
+Test helpers shared by the apps that store files
+"""
+
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from .uploads import store_upload
+
+
+class TemporaryMediaMixin:
+    """
+    Store the files of each test in a temporary MEDIA_ROOT, removed afterwards
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def upload(self, content=b"%PDF-1.4 invoice", name="invoice.pdf", **fields):
+        return store_upload(SimpleUploadedFile(name, content), **fields)
+
+
+class MediaTestCase(TemporaryMediaMixin, APITestCase):
+    pass
@@ -1,3 +1,577 @@
-from django.test import TestCase
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.utils import timezone
+
+from invoices.services import store_invoice
+
+from .bulk import delete_files
+from .caching import FILES_COLLECTION
+from .downloads import READ_BLOCK_SIZE
+from .ingest import Ingest, read_manifest
+from .reshard import reshard
+from .scrub import scrub
+from .models import Blob, ChangeCounter, File, UploadSession
+from .testing import MediaTestCase
+from .uploadhandler import incoming_upload_dir
+from .uploads import create_part_file, finalize_session, write_chunk
+
+
+class BlobReferenceTests(MediaTestCase):
+    def test_new_content_is_stored(self):
+        file = self.upload(b"%PDF-1.4 one")
+        self.assertFalse(file.deduplicated)
+        self.assertEqual(file.blob.ref_count, 1)
+        self.assertTrue(os.path.exists(file.file.path))
+
+    def test_duplicate_content_shares_the_blob(self):
+        first = self.upload(b"%PDF-1.4 same")
+        second = self.upload(b"%PDF-1.4 same", name="copy.pdf")
+        self.assertTrue(second.deduplicated)
+        self.assertEqual(second.blob, first.blob)
+        self.assertEqual(second.file.name, first.file.name)
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+
+    def test_delete_releases_the_blob(self):
+        first = self.upload(b"%PDF-1.4 same")
+        second = self.upload(b"%PDF-1.4 same", name="copy.pdf")
+        path = first.file.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            File.objects.filter(pk=second.pk).delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_bulk_delete_releases_each_reference(self):
+        for name in ("a.pdf", "b.pdf", "c.pdf"):
+            self.upload(b"%PDF-1.4 same", name=name)
+        self.upload(b"%PDF-1.4 other")
+        with self.captureOnCommitCallbacks(execute=True):
+            File.objects.exclude(original_file_name="a.pdf").delete()
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+
+
+class UploadSessionTests(MediaTestCase):
+    def upload_session(self, content):
+        session = UploadSession.objects.create(
+            original_file_name="invoice.pdf", total_size=len(content)
+        )
+        create_part_file(session)
+        write_chunk(session, io.BytesIO(content), 0, len(content))
+        return session
+
+    def test_finalize(self):
+        session = self.upload_session(b"%PDF-1.4 invoice")
+        file = finalize_session(session)
+        with file.file.open("rb") as stored:
+            self.assertEqual(stored.read(), b"%PDF-1.4 invoice")
+        self.assertFalse(session.chunks.exists())
+
+    def test_finalize_twice(self):
+        session = self.upload_session(b"%PDF-1.4 invoice")
+        # Both requests loaded the session before either finalized it
+        retried = UploadSession.objects.get(pk=session.pk)
+        file = finalize_session(session)
+        self.assertEqual(finalize_session(retried), file)
+        self.assertEqual(File.objects.count(), 1)
+        self.assertEqual(file.blob.ref_count, 1)
+
+
+class KeysetPaginationTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        caches["api"].clear()
+        now = timezone.now()
+        self.files = []
+        # Newest first; the middle two share a timestamp and are ordered by id
+        for seconds, name in [(0, "a"), (-1, "b"), (-1, "c"), (-2, "d"), (-3, "e")]:
+            file = self.upload(f"%PDF-1.4 {name}".encode(), name=f"{name}.pdf")
+            File.objects.filter(pk=file.pk).update(
+                uploaded_at=now + timedelta(seconds=seconds)
+            )
+            self.files.append(file)
+        self.files[1:3] = sorted(self.files[1:3], key=lambda file: file.pk)[::-1]
+        self.expected = [str(file.pk) for file in self.files]
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200)
+        return [item["id"] for item in response.json()["results"]]
+
+    def test_next_links_walk_every_file_once(self):
+        url, seen = "/api/v1/files/?page_size=2", []
+        while url:
+            response = self.client.get(url)
+            seen += self.ids(response)
+            url = response.json()["next"]
+        self.assertEqual(seen, self.expected)
+
+    def test_previous_link(self):
+        first = self.client.get("/api/v1/files/?page_size=2").json()
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        response = self.client.get(second["previous"])
+        self.assertEqual(self.ids(response), self.expected[:2])
+        self.assertIsNone(response.json()["previous"])
+        self.assertIsNotNone(response.json()["next"])
+
+    def test_rows_added_between_pages_are_not_repeated(self):
+        first = self.client.get("/api/v1/files/?page_size=2").json()
+        self.upload(b"%PDF-1.4 new")
+        second = self.client.get(first["next"])
+        self.assertEqual(self.ids(second), self.expected[2:4])
+
+    @override_settings(API_MAX_PAGE_SIZE=3)
+    def test_page_size(self):
+        for page_size, expected in [("2", 2), ("50", 3), ("0", 5), ("x", 5)]:
+            with self.subTest(page_size=page_size):
+                response = self.client.get(f"/api/v1/files/?page_size={page_size}")
+                self.assertEqual(len(self.ids(response)), expected)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/v1/files/?cursor=bm90IGpzb24")
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkDeleteVersionTests(MediaTestCase):
+    def test_bulk_delete_bumps_the_version_once(self):
+        ids = [self.upload(f"%PDF-1.4 {n}".encode()).pk for n in range(3)]
+        counters = ChangeCounter.objects.filter(name=FILES_COLLECTION)
+        version = counters.get().value
+        delete_files(ids)
+        self.assertEqual(counters.get().value, version + 1)
+
+
+class DownloadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = os.urandom(3 * READ_BLOCK_SIZE + 100)
+        file = self.upload(self.content, name="large.bin")
+        self.url = f"/api/v1/files/{file.pk}/download/"
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), self.content[10:20])
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.content)}")
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=999999999-")
+        self.assertEqual(response.status_code, 416)
+
+    async def test_asgi_range_is_streamed_in_blocks(self):
+        start = 50
+        response = await self.async_client.get(
+            self.url, headers={"Range": f"bytes={start}-"}
+        )
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(b"".join(chunks), self.content[start:])
+        self.assertEqual(response["Content-Length"], str(len(self.content) - start))
+
+
+class ConditionalGetTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        caches["api"].clear()
+        self.file = self.upload()
+        self.detail_url = f"/api/v1/files/{self.file.pk}/"
+
+    def assertNotModified(self, url, etag, if_none_match=None):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=if_none_match or etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertEqual(response.content, b"")
+
+    def test_list(self):
+        etag = self.client.get("/api/v1/files/")["ETag"]
+        self.assertNotModified("/api/v1/files/", etag)
+        # If-None-Match uses the weak comparison
+        self.assertNotModified("/api/v1/files/", etag, etag.removeprefix("W/"))
+
+        other = self.client.get("/api/v1/files/?page_size=1")["ETag"]
+        self.assertNotEqual(other, etag)
+
+    def test_list_tag_changes_after_writes(self):
+        first = self.client.get("/api/v1/files/")["ETag"]
+        new = self.upload(b"%PDF-1.4 new")
+        response = self.client.get("/api/v1/files/", HTTP_IF_NONE_MATCH=first)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(str(new.pk), [item["id"] for item in response.json()["results"]])
+
+        second = response["ETag"]
+        self.assertNotEqual(second, first)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/v1/files/{new.pk}/")
+        response = self.client.get("/api/v1/files/", HTTP_IF_NONE_MATCH=second)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], second)
+
+    def test_detail_tag_changes_after_rename(self):
+        etag = self.client.get(self.detail_url)["ETag"]
+        self.assertNotModified(self.detail_url, etag)
+
+        response = self.client.patch(
+            self.detail_url, {"user_defined_file_name": "March"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["user_defined_file_name"], "March")
+
+
+class BulkTests(MediaTestCase):
+    def statuses(self, response):
+        return [result["status"] for result in response.json()["results"]]
+
+    def test_create(self):
+        uploads = [
+            SimpleUploadedFile("a.pdf", b"%PDF-1.4 a"),
+            SimpleUploadedFile("empty.pdf", b""),
+            SimpleUploadedFile("b.pdf", b"%PDF-1.4 b"),
+        ]
+        response = self.client.post(
+            "/api/v1/files/bulk/",
+            {"file": uploads, "user_defined_file_name": ["March", "", ""]},
+        )
+        self.assertEqual(response.status_code, 207)
+        results = response.json()["results"]
+        self.assertEqual(self.statuses(response), [201, 400, 201])
+        self.assertEqual([result["index"] for result in results], [0, 1, 2])
+        self.assertIn("file", results[1]["errors"])
+        self.assertEqual(results[0]["file"]["user_defined_file_name"], "March")
+        self.assertIsNone(results[2]["file"]["user_defined_file_name"])
+        self.assertEqual(
+            set(File.objects.values_list("id", flat=True)),
+            {uuid.UUID(results[0]["id"]), uuid.UUID(results[2]["id"])},
+        )
+
+        upload = SimpleUploadedFile("copy.pdf", b"%PDF-1.4 a")
+        response = self.client.post("/api/v1/files/bulk/", {"file": [upload]})
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.json()["results"][0]["file"]["deduplicated"])
+
+    def test_rename(self):
+        first, second = self.upload(b"%PDF-1.4 a"), self.upload(b"%PDF-1.4 b")
+        items = [
+            {"id": str(first.pk), "user_defined_file_name": "March"},
+            {"id": str(uuid.uuid4()), "user_defined_file_name": "Missing"},
+            {"id": str(second.pk), "user_defined_file_name": "x" * 300},
+        ]
+        response = self.client.patch("/api/v1/files/bulk/", items, format="json")
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), [200, 404, 400])
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.user_defined_file_name, "March")
+        self.assertIsNone(second.user_defined_file_name)
+
+        response = self.client.patch("/api/v1/files/bulk/", items[:1], format="json")
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete(self):
+        first, second = self.upload(b"%PDF-1.4 a"), self.upload(b"%PDF-1.4 b")
+        missing = uuid.uuid4()
+        path = first.file.path
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/v1/files/bulk-delete/",
+                {"ids": [str(first.pk), str(missing)]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(self.statuses(response), [204, 404])
+        self.assertEqual(response.json()["results"][1]["id"], str(missing))
+        self.assertEqual(list(File.objects.all()), [second])
+        self.assertFalse(os.path.exists(path))
+
+        response = self.client.post(
+            "/api/v1/files/bulk-delete/", {"ids": [str(second.pk)]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class IngestTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source, ignore_errors=True)
+        for relpath, content in [
+            ("a.pdf", b"%PDF-1.4 a"),
+            ("b.pdf", b"%PDF-1.4 b"),
+            ("sub/c.pdf", b"%PDF-1.4 a"),
+            ("sub/d.pdf", b"%PDF-1.4 d"),
+            (".hidden.pdf", b"%PDF-1.4 hidden"),
+            ("empty.pdf", b""),
+        ]:
+            self.write(relpath, content)
+
+    def write(self, relpath, content):
+        path = os.path.join(self.source, relpath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            out.write(content)
+
+    def ingest(self, progress=None):
+        return Ingest(self.source, workers=2, batch_size=2).run(progress=progress)
+
+    def test_ingest(self):
+        ingest = self.ingest()
+        self.assertEqual((ingest.ingested, ingest.skipped, ingest.failed), (4, 0, 0))
+        names = File.objects.values_list("original_file_name", flat=True)
+        self.assertEqual(sorted(names), ["a.pdf", "b.pdf", "c.pdf", "d.pdf"])
+        first = File.objects.get(original_file_name="a.pdf")
+        copy = File.objects.get(original_file_name="c.pdf")
+        self.assertEqual(copy.blob, first.blob)
+        self.assertEqual(first.blob.ref_count, 2)
+        with copy.file.open("rb") as stored:
+            self.assertEqual(stored.read(), b"%PDF-1.4 a")
+        self.assertEqual(len(read_manifest(ingest.manifest_path)), 4)
+        self.assertEqual(os.listdir(incoming_upload_dir()), [])
+
+    def test_resume_after_interruption(self):
+        def interrupt(ingest):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            self.ingest(progress=interrupt)
+        self.assertEqual(File.objects.count(), 2)
+        self.assertEqual(os.listdir(incoming_upload_dir()), [])
+
+        ingest = self.ingest()
+        self.assertEqual((ingest.ingested, ingest.skipped), (2, 2))
+        self.assertEqual(File.objects.count(), 4)
+
+        self.write("e.pdf", b"%PDF-1.4 e")
+        ingest = self.ingest()
+        self.assertEqual((ingest.ingested, ingest.skipped), (1, 4))
+
+    def test_batch_missing_from_the_manifest_is_not_stored_twice(self):
+        manifest_path = self.ingest().manifest_path
+        with open(manifest_path) as manifest:
+            lines = manifest.readlines()
+        # As if the run crashed after committing its last batch
+        with open(manifest_path, "w") as manifest:
+            manifest.writelines(lines[:-2] + [lines[-2][:10]])
+
+        ingest = self.ingest()
+        self.assertEqual((ingest.ingested, ingest.skipped), (0, 4))
+        self.assertEqual(File.objects.count(), 4)
+        self.assertEqual(len(read_manifest(manifest_path)), 4)
+
+
+class ScrubTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.file = self.upload()
+        self.path = self.file.file.path
+
+    def write(self, name, content=b"%PDF-1.4 stray", age=7200):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            out.write(content)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_orphans(self):
+        stray = self.write("uploads/stray.pdf")
+        self.write("uploads/young.pdf", age=0)
+        self.write("uploads/.incoming/interrupted")
+        self.write(f"upload_sessions/{uuid.uuid4()}.part")
+
+        report = scrub(orphans="report")
+        self.assertEqual(report.orphans, 3)
+        self.assertEqual(report.orphan_bytes, 3 * len(b"%PDF-1.4 stray"))
+        self.assertIn(("orphan", "uploads/stray.pdf"), report.details)
+        self.assertTrue(os.path.exists(stray))
+
+        self.assertEqual(scrub(orphans="quarantine").orphans, 3)
+        self.assertFalse(os.path.exists(stray))
+        quarantined = os.path.join(self.media_root, "quarantine/uploads/stray.pdf")
+        self.assertTrue(os.path.exists(quarantined))
+        self.assertEqual(scrub().orphans, 0)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_delete_orphans(self):
+        stray = self.write("uploads/stray.pdf")
+        self.assertEqual(scrub(orphans="delete").orphans, 1)
+        self.assertFalse(os.path.exists(stray))
+        self.assertEqual(scrub(orphans="delete", min_age=0).orphans, 0)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_missing_content(self):
+        os.remove(self.path)
+        report = scrub()
+        self.assertEqual((report.checked, report.missing), (1, 1))
+        self.assertIn(("missing", self.file.file.name), report.details)
+        self.assertEqual(Blob.objects.get().problem, Blob.Problem.MISSING)
+
+    def test_corrupt_content(self):
+        with open(self.path, "r+b") as stored:
+            stored.write(b"%PDF-9.9")
+        self.assertEqual(scrub().corrupt, 0)
+        report = scrub(verify=True)
+        self.assertEqual((report.verified, report.corrupt), (1, 1))
+        self.assertEqual(Blob.objects.get().problem, Blob.Problem.CORRUPT)
+        # A later size check keeps the problem found by verifying
+        self.assertEqual(scrub().corrupt, 1)
+
+    def test_reference_counts(self):
+        Blob.objects.update(ref_count=3)
+        self.assertEqual(scrub().ref_count_errors, 1)
+        self.assertEqual(Blob.objects.get().ref_count, 3)
+        scrub(repair=True)
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+        self.assertEqual(scrub().ref_count_errors, 0)
+
+
+class ReshardTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        with override_settings(UPLOAD_SHARD_DEPTH=0):
+            self.first = self.upload(b"%PDF-1.4 same")
+            self.copy = self.upload(b"%PDF-1.4 same", name="copy.pdf")
+            self.other = self.upload(b"%PDF-1.4 other")
+        self.old_path = self.first.file.path
+
+    def test_content_is_moved_and_readable(self):
+        self.assertEqual(self.first.file.name, f"uploads/{self.first.sha256}.pdf")
+        version = ChangeCounter.objects.get(name=FILES_COLLECTION).value
+
+        report = reshard(batch_size=1)
+        self.assertEqual((report.moved, report.skipped, report.missing), (2, 0, 0))
+        self.assertFalse(os.path.exists(self.old_path))
+        sha256 = self.first.sha256
+        name = f"uploads/{sha256[:2]}/{sha256[2:4]}/{sha256}.pdf"
+        for file in (self.first, self.copy):
+            file.refresh_from_db()
+            self.assertEqual(file.file.name, name)
+            self.assertEqual(file.blob.file.name, name)
+        self.assertGreater(
+            ChangeCounter.objects.get(name=FILES_COLLECTION).value, version
+        )
+
+        response = self.client.get(f"/api/v1/files/{self.copy.pk}/download/")
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4 same")
+        self.assertEqual(scrub(min_age=0).orphans, 0)
+
+        report = reshard()
+        self.assertEqual((report.moved, report.skipped), (0, 2))
+
+    def test_missing_content_is_left_alone(self):
+        os.remove(self.old_path)
+        report = reshard()
+        self.assertEqual((report.moved, report.missing), (1, 1))
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.file.name, f"uploads/{self.first.sha256}.pdf")
+
+
+class ExportTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        self.files = []
+        for seconds, name in [(0, "a.pdf"), (-1, "b.pdf"), (-2, "c.pdf")]:
+            file = self.upload(f"%PDF-1.4 {name}".encode(), name=name)
+            File.objects.filter(pk=file.pk).update(
+                uploaded_at=now + timedelta(seconds=seconds)
+            )
+            self.files.append(file)
+        store_invoice(
+            self.files[0].pk,
+            {
+                "parser_version": "1",
+                "fields": {"vendor": "Acme", "currency": "EUR", "total": "12.50"},
+                "line_items": [
+                    {
+                        "sku": "A-1",
+                        "quantity": "1",
+                        "unit_price": "12.50",
+                        "amount": "12.50",
+                    }
+                ],
+            },
+        )
+        # Missing content is listed in the manifest without a path
+        os.remove(self.files[2].file.path)
+
+    def export(self, **params):
+        response = self.client.get("/api/v1/files/export/", params)
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    def lines(self, content):
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_zip(self):
+        response, content = self.export()
+        self.assertEqual(response["Content-Type"], "application/zip")
+        self.assertTrue(response["Content-Disposition"].startswith("attachment;"))
+
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            first, second = (
+                f"files/{file.pk}-{file.filename()}" for file in self.files[:2]
+            )
+            self.assertEqual(archive.namelist(), [first, second, "manifest.ndjson"])
+            self.assertEqual(archive.read(first), b"%PDF-1.4 a.pdf")
+            self.assertEqual(archive.read(second), b"%PDF-1.4 b.pdf")
+            lines = self.lines(archive.read("manifest.ndjson"))
+
+        self.assertEqual([line["path"] for line in lines], [first, second, None])
+        self.assertEqual(
+            [line["file"]["id"] for line in lines],
+            [str(file.pk) for file in self.files],
+        )
+        invoice = lines[0]["invoice"]
+        self.assertEqual(invoice["vendor"], "Acme")
+        self.assertEqual(invoice["line_items"][0]["sku"], "A-1")
+        self.assertIsNone(lines[1]["invoice"])
+
+    def test_ndjson(self):
+        response, content = self.export(output="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = self.lines(content)
+        self.assertEqual(len(lines), 3)
+        self.assertNotIn("path", lines[0])
+
+    async def test_asgi_export_is_streamed(self):
+        response = await self.async_client.get(
+            "/api/v1/files/export/", {"output": "ndjson"}
+        )
+        self.assertTrue(response.is_async)
+        content = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(self.lines(content)), 3)
+
+    def test_filters(self):
+        _, content = self.export(output="ndjson", vendor="Acme")
+        self.assertEqual(
+            [line["file"]["id"] for line in self.lines(content)],
+            [str(self.files[0].pk)],
+        )
+        ids = f"{self.files[1].pk},{self.files[2].pk}"
+        _, content = self.export(output="ndjson", id=ids)
+        self.assertEqual(len(self.lines(content)), 2)
+
+        response = self.client.get("/api/v1/files/export/", {"output": "tar"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/v1/files/export/", {"id": "notauuid"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,162 @@
+import hashlib
+import os
+import re
+
+from django.core.files import File as DjangoFile
+from django.db import transaction
+
+from config.metrics import timed_storage
+
+from .models import Blob, File, UploadChunk, UploadSession
+from .uploadhandler import SNIFF_SIZE, sniff_mime_type
+
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+|\*)$")
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class ChunkError(Exception):
+    """
+    Raised when a chunk cannot be accepted for an upload session
+    """
+
+
+class PartFile(DjangoFile):
+    """
+    Wrapper around a session part file that lets the storage backend move it
+    into place instead of copying its bytes
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def sha256_of(fileobj):
+    """
+    SHA-256 hex digest of a file object, read in buffer-sized blocks
+    """
+    digest = hashlib.sha256()
+    for block in iter(lambda: fileobj.read(COPY_BUFFER_SIZE), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def store_upload(uploaded_file, sha256=None, **fields):
+    """
+    Create a File for an uploaded file, sharing the stored content with any
+    earlier upload of the same bytes
+    """
+    with transaction.atomic():
+        file = prepare_upload(uploaded_file, sha256, **fields)
+        file.save(force_insert=True)
+        return file
+
+
+def prepare_upload(uploaded_file, sha256=None, **fields):
+    """
+    Store the content of an upload and return an unsaved File for it
+    Must run in a transaction that also saves the File, as the content's
+    reference count is taken right away
+    """
+    if sha256 is None:
+        sha256 = getattr(uploaded_file, "sha256", None) or sha256_of(uploaded_file)
+    mime_type = getattr(uploaded_file, "mime_type", None)
+    if mime_type is None:
+        mime_type = sniff_mime_type(uploaded_file.read(SNIFF_SIZE))
+        uploaded_file.seek(0)
+    blob, created = Blob.objects.acquire(uploaded_file, sha256)
+    fields.setdefault("original_file_name", uploaded_file.name)
+    return File(
+        file=blob.file.name,
+        blob=blob,
+        sha256=sha256,
+        size=blob.size,
+        mime_type=mime_type,
+        deduplicated=not created,
+        **fields,
+    )
+
+
+def parse_content_range(header, total_size):
+    """
+    Parse a `Content-Range: bytes start-end/total` header into a (start, end)
+    tuple where end is exclusive
+    """
+    match = CONTENT_RANGE_RE.match((header or "").strip())
+    if not match:
+        raise ChunkError("Content-Range header must look like 'bytes start-end/total'")
+    start, last, total = match.groups()
+    start, end = int(start), int(last) + 1
+    if total != "*" and int(total) != total_size:
+        raise ChunkError(f"Content-Range total must be {total_size}")
+    if start >= end or end > total_size:
+        raise ChunkError(f"Content-Range must fall within [0, {total_size})")
+    return start, end
+
+
+def create_part_file(session):
+    """
+    Allocate the part file for a new session at its final size
+    """
+    os.makedirs(os.path.dirname(session.part_path), exist_ok=True)
+    with open(session.part_path, "wb") as part:
+        part.truncate(session.total_size)
+
+
+def write_chunk(session, stream, start, end):
+    """
+    Copy the request body into the part file at the given offset and record
+    the chunk as committed once every byte has been written
+    """
+    size = end - start
+    written = 0
+    # Includes receiving the body, which is read as it is written
+    with timed_storage("chunk_write"), open(session.part_path, "r+b") as part:
+        part.seek(start)
+        while written < size:
+            data = stream.read(min(COPY_BUFFER_SIZE, size - written))
+            if not data:
+                break
+            part.write(data)
+            written += len(data)
+        if written == size and stream.read(1):
+            written += 1
+    if written != size:
+        raise ChunkError(f"Expected {size} bytes for this range, received {written}")
+
+    UploadChunk.objects.update_or_create(
+        session=session, offset=start, defaults={"size": size}
+    )
+    session.touch()
+    session.save(update_fields=["expires_at", "updated_at"])
+
+
+@transaction.atomic
+def finalize_session(session):
+    """
+    Turn a complete upload session into a File by moving its part file into
+    the uploads directory
+    Chunks may arrive in any order, so the digest needs one sequential read here
+    """
+    # Concurrent calls, such as a retried request, wait for the first to finish
+    # and return its File instead of moving the part file a second time
+    session = UploadSession.objects.select_for_update().get(pk=session.pk)
+    if session.file_id:
+        return session.file
+
+    with open(session.part_path, "rb") as part:
+        sha256 = sha256_of(part)
+        content = PartFile(part, name=session.original_file_name)
+        instance = store_upload(
+            content,
+            sha256=sha256,
+            original_file_name=session.original_file_name,
+            user_defined_file_name=session.user_defined_file_name,
+        )
+    if instance.deduplicated:
+        os.remove(session.part_path)
+
+    session.file = instance
+    session.save(update_fields=["file", "updated_at"])
+    session.chunks.all().delete()
+    return instance
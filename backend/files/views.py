@@ -1,16 +1,46 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
-from rest_framework import viewsets, status
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from django.views import View
+from rest_framework import mixins, viewsets, status
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from drf_spectacular.utils import extend_schema, extend_schema_view
-from .models import File
-from .serializers import FileSerializer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
+from .bulk import create_files, delete_files, rename_files
+from .caching import FILES_COLLECTION, aget_version, cached_json_response
+from .caching import response_key
+from .downloads import IgnoreClientContentNegotiation, download_response
+from .export import INVOICE_FILTERS, aiterate, export, export_queryset
+from .models import File, UploadSession
+from .pagination import KeysetPagination, positive_int
+from .serializers import BulkResultSerializer, BulkUploadSerializer
+from .serializers import FileIdListSerializer, FileRenameSerializer
+from .serializers import FileSerializer, UploadSessionSerializer
+from .uploads import ChunkError, create_part_file, finalize_session, parse_content_range
+from .uploads import store_upload, write_chunk
+from invoices.views import INVOICE_FILTER_PARAMETERS
+from search.engine import search
+from search.serializers import FileSearchResultSerializer
 
 # Create your views here.
 
+EXPORT_CONTENT_TYPES = {"zip": "application/zip", "ndjson": "application/x-ndjson"}
+
 
 @extend_schema_view(
-    list=extend_schema(description="List all files"),
+    list=extend_schema(
+        description="List files, newest first, one cursor page at a time"
+    ),
     retrieve=extend_schema(description="Retrieve a specific file"),
     create=extend_schema(description="Upload a new file"),
     update=extend_schema(description="Update file metadata (not the file itself)"),
@@ -24,11 +54,393 @@ class FileViewSet(viewsets.ModelViewSet):
 
     queryset = File.objects.all()
     serializer_class = FileSerializer
+    pagination_class = KeysetPagination
 
     def perform_create(self, serializer):
         """
-        Save the original filename when creating a new file
+        Store the upload by content and save the original filename
+        """
+        file_obj = serializer.validated_data.pop("file")
+        serializer.instance = store_upload(file_obj, **serializer.validated_data)
+
+    @extend_schema(
+        description=(
+            "Upload many files in one transaction. Repeat the `file` field per "
+            "file, and optionally `user_defined_file_name` in the same order. "
+            "Every file gets its own result; 207 if any of them failed."
+        ),
+        request={"multipart/form-data": BulkUploadSerializer},
+        responses={201: BulkResultSerializer, 207: BulkResultSerializer},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk_create(self, request):
+        uploads = request.FILES.getlist("file")
+        if not uploads:
+            raise ValidationError({"file": "Upload at least one file"})
+        names = request.data.getlist("user_defined_file_name")
+        results = create_files(uploads, names, self.get_serializer_context())
+        return bulk_response(results, status.HTTP_201_CREATED)
+
+    @extend_schema(
+        description=(
+            "Rename many files in one transaction. Every item gets its own "
+            "result; 207 if any of them failed."
+        ),
+        request=FileRenameSerializer(many=True),
+        responses={200: BulkResultSerializer, 207: BulkResultSerializer},
+    )
+    @bulk_create.mapping.patch
+    def bulk_rename(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Expected a non-empty list of files to rename")
+        if len(items) > settings.FILE_BULK_MAX_ITEMS:
+            raise ValidationError(
+                f"At most {settings.FILE_BULK_MAX_ITEMS} files per request"
+            )
+        results = rename_files(items, self.get_serializer_context())
+        return bulk_response(results, status.HTTP_200_OK)
+
+    @extend_schema(
+        description=(
+            "Delete many files in one transaction. Every id gets its own result "
+            "(204 deleted, 404 not found); 207 if any was not found."
+        ),
+        request=FileIdListSerializer,
+        responses={200: BulkResultSerializer, 207: BulkResultSerializer},
+    )
+    @action(detail=False, methods=["post"], url_path="bulk-delete")
+    def bulk_delete(self, request):
+        serializer = FileIdListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = delete_files(serializer.validated_data["ids"])
+        return bulk_response(results, status.HTTP_200_OK)
+
+    @extend_schema(
+        description=(
+            "Download the content of a file. Supports single byte ranges "
+            "(`Range`, `If-Range`) and conditional requests (`If-None-Match`, "
+            "`If-Modified-Since`); the ETag is the SHA-256 of the content."
+        ),
+        parameters=[
+            OpenApiParameter(
+                "attachment",
+                bool,
+                description="Ask the browser to save the file instead of showing it",
+            )
+        ],
+        responses={
+            (200, "application/octet-stream"): bytes,
+            (206, "application/octet-stream"): bytes,
+            304: None,
+            416: None,
+        },
+    )
+    @action(
+        detail=True,
+        methods=["get"],
+        content_negotiation_class=IgnoreClientContentNegotiation,
+    )
+    def download(self, request, pk=None):
+        as_attachment = request.query_params.get("attachment") in ("1", "true")
+        return download_response(request, self.get_object(), as_attachment)
+
+    @extend_schema(
+        description=(
+            "Stream a ZIP of the selected files with a `manifest.ndjson` of their "
+            "metadata and parsed invoices, or only the manifest with "
+            "`output=ndjson`. Without filters every file is exported."
+        ),
+        parameters=[
+            OpenApiParameter(
+                "id",
+                str,
+                many=True,
+                description="File ids, repeated or comma separated",
+            ),
+            OpenApiParameter("uploaded_from", str, description="Earliest upload date"),
+            OpenApiParameter("uploaded_to", str, description="Latest upload date"),
+            *(
+                parameter
+                for parameter in INVOICE_FILTER_PARAMETERS
+                if parameter.name in INVOICE_FILTERS
+            ),
+            OpenApiParameter("output", str, enum=["zip", "ndjson"], default="zip"),
+        ],
+        responses={
+            (200, "application/zip"): bytes,
+            (200, "application/x-ndjson"): bytes,
+        },
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        content_negotiation_class=IgnoreClientContentNegotiation,
+    )
+    def export(self, request):
+        output = request.query_params.get("output", "zip")
+        if output not in EXPORT_CONTENT_TYPES:
+            raise ValidationError({"output": "Must be zip or ndjson"})
+        files = export_queryset(request.query_params)
+        chunks = export(files, output, self.get_serializer_context())
+        if isinstance(request._request, ASGIRequest):
+            chunks = aiterate(chunks)
+        response = StreamingHttpResponse(
+            chunks, content_type=EXPORT_CONTENT_TYPES[output]
+        )
+        filename = f"files-{timezone.now():%Y%m%d-%H%M%S}.{output}"
+        response.headers["Content-Disposition"] = content_disposition_header(
+            True, filename
+        )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        q = request.query_params.get("q", "")
+        if q.strip():
+            return self.search(request, q)
+        return super().list(request, *args, **kwargs)
+
+    def search(self, request, q):
+        """
+        Ranked full-text search results, one page at a time
         """
-        file_obj = self.request.FILES.get("file")
-        if file_obj:
-            serializer.save(original_file_name=file_obj.name)
+        page_size = self.paginator.get_page_size(request)
+        try:
+            offset = positive_int(request.query_params.get("offset", 0))
+        except ValueError:
+            raise ValidationError({"offset": "Must be a non-negative integer"})
+
+        hits, ranked = search(q, limit=page_size + 1, offset=offset)
+        has_next = len(hits) > page_size
+        hits = hits[:page_size]
+        files = File.objects.in_bulk([uuid.UUID(str(hit["file_id"])) for hit in hits])
+        results = []
+        for hit in hits:
+            file = files.get(uuid.UUID(str(hit["file_id"])))
+            if file is not None:
+                file.search_hit = hit
+                results.append(file)
+
+        url = request.build_absolute_uri()
+        previous = None
+        if offset:
+            previous = replace_query_param(url, "offset", max(offset - page_size, 0))
+            if offset <= page_size:
+                previous = remove_query_param(url, "offset")
+        serializer = FileSearchResultSerializer(
+            results, many=True, context=self.get_serializer_context()
+        )
+        return Response(
+            {
+                "next": (
+                    replace_query_param(url, "offset", offset + page_size)
+                    if has_next
+                    else None
+                ),
+                "previous": previous,
+                "ranked": ranked,
+                "results": serializer.data,
+            }
+        )
+
+
+@extend_schema_view(
+    create=extend_schema(description="Open a resumable upload session"),
+    retrieve=extend_schema(
+        description="Get an upload session with its committed and missing byte ranges"
+    ),
+    destroy=extend_schema(description="Abort an upload session"),
+)
+class UploadSessionViewSet(
+    mixins.CreateModelMixin,
+    mixins.RetrieveModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    API endpoint for chunked, resumable uploads.
+
+    Open a session with the file name and total size, PUT byte ranges to
+    `chunks/` in any order using a `Content-Range` header, then POST to
+    `finalize/` to create the File. Interrupted uploads resume by fetching the
+    session and sending only its `missing_ranges`.
+    """
+
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+
+    def perform_create(self, serializer):
+        """
+        Allocate the part file and opportunistically drop abandoned sessions
+        """
+        UploadSession.objects.purge_expired(limit=100)
+        session = serializer.save()
+        create_part_file(session)
+
+    @extend_schema(
+        description="Upload a byte range of the file as the raw request body",
+        parameters=[
+            OpenApiParameter(
+                "Content-Range",
+                str,
+                OpenApiParameter.HEADER,
+                required=True,
+                description="Byte range of this chunk, e.g. 'bytes 0-1048575/5242880'",
+            )
+        ],
+        request={"application/octet-stream": bytes},
+        responses=UploadSessionSerializer,
+    )
+    @action(detail=True, methods=["put"])
+    def chunks(self, request, pk=None):
+        session = self.get_object()
+        if session.file_id:
+            return Response(
+                {"detail": "Upload session has already been finalized"},
+                status=status.HTTP_409_CONFLICT,
+            )
+        try:
+            start, end = parse_content_range(
+                request.headers.get("Content-Range"), session.total_size
+            )
+            if end - start > settings.UPLOAD_SESSION_CHUNK_SIZE:
+                raise ChunkError(
+                    f"Chunks are limited to {settings.UPLOAD_SESSION_CHUNK_SIZE} bytes"
+                )
+            if request.stream is None:
+                raise ChunkError("Chunk body is empty")
+            write_chunk(session, request.stream, start, end)
+        except ChunkError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data)
+
+    @extend_schema(
+        description="Assemble a complete upload session into a file",
+        request=None,
+        responses={201: FileSerializer},
+    )
+    @action(detail=True, methods=["post"])
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        if not session.file_id:
+            missing = session.missing_ranges()
+            if missing:
+                return Response(
+                    {"detail": "Upload is incomplete", "missing_ranges": missing},
+                    status=status.HTTP_409_CONFLICT,
+                )
+        instance = finalize_session(session)
+        serializer = FileSerializer(instance, context=self.get_serializer_context())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+def bulk_response(results, success_status):
+    """
+    Response listing the results of a bulk operation, 207 Multi-Status unless
+    every item succeeded
+    """
+    failed = any(result["status"] >= 400 for result in results)
+    return Response(
+        {"results": results},
+        status=status.HTTP_207_MULTI_STATUS if failed else success_status,
+    )
+
+
+def json_response(data, status=200):
+    """
+    JSON response rendered the way DRF renders it, for views outside DRF
+    """
+    return HttpResponse(
+        JSONRenderer().render(data), status=status, content_type="application/json"
+    )
+
+
+class AsyncFileView(View):
+    """
+    Async front for the file endpoints
+
+    Plain JSON reads are answered on the event loop with the async ORM, so under
+    an ASGI server they never wait for the single thread Django runs sync views
+    in. Everything else (writes, search queries and the browsable API) is
+    handed to `FileViewSet` in that thread. Subclasses answer the async reads
+    in an async `get`.
+    """
+
+    actions = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method in ("GET", "HEAD") and self.serves_async(request):
+            return self.get(request, *args, **kwargs)
+        return self.delegate(request, *args, **kwargs)
+
+    def serves_async(self, request):
+        return request.GET.get("format") != "api" and "text/html" not in (
+            request.headers.get("Accept", "")
+        )
+
+    async def delegate(self, request, *args, **kwargs):
+        view = FileViewSet.as_view(self.actions)
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+
+class AsyncFileListView(AsyncFileView):
+    """
+    Async list of files, with the same keyset pagination as `FileViewSet`
+    Pages carry an ETag of the collection version and are cached per version
+    """
+
+    actions = {"get": "list", "post": "create"}
+
+    def serves_async(self, request):
+        return super().serves_async(request) and not request.GET.get("q", "").strip()
+
+    async def get(self, request):
+        version = await aget_version(FILES_COLLECTION)
+
+        async def build():
+            paginator = KeysetPagination()
+            files = await paginator.apaginate_queryset(
+                File.objects.all(), Request(request)
+            )
+            serializer = FileSerializer(files, many=True, context={"request": request})
+            return paginator.get_paginated_data(serializer.data)
+
+        try:
+            return await cached_json_response(
+                request, response_key(request, "list", version), build
+            )
+        except NotFound as e:
+            return json_response({"detail": e.detail}, status=404)
+
+
+class AsyncFileDetailView(AsyncFileView):
+    """
+    Async retrieval of a single file, with an ETag of its last update
+    """
+
+    actions = {
+        "get": "retrieve",
+        "put": "update",
+        "patch": "partial_update",
+        "delete": "destroy",
+    }
+
+    async def get(self, request, pk):
+        updated_at = (
+            await File.objects.filter(pk=pk)
+            .values_list("updated_at", flat=True)
+            .afirst()
+        )
+        if updated_at is None:
+            return json_response({"detail": "Not found."}, status=404)
+
+        async def build():
+            file = await File.objects.aget(pk=pk)
+            return FileSerializer(file, context={"request": request}).data
+
+        try:
+            return await cached_json_response(
+                request, response_key(request, "detail", updated_at.isoformat()), build
+            )
+        except File.DoesNotExist:
+            return json_response({"detail": "Not found."}, status=404)
@@ -0,0 +1,29 @@
+from django.contrib import admin
+from .models import Invoice, InvoiceLineItem
+
+
+class InvoiceLineItemInline(admin.TabularInline):
+    model = InvoiceLineItem
+    extra = 0
+    readonly_fields = (
+        "position",
+        "sku",
+        "description",
+        "quantity",
+        "unit_price",
+        "amount",
+    )
+
+
+@admin.register(Invoice)
+class InvoiceAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the Invoice model
+    """
+
+    list_display = ("vendor", "invoice_number", "invoice_date", "currency", "total")
+    list_filter = ("currency", "invoice_date")
+    list_select_related = ("file",)
+    search_fields = ("vendor", "invoice_number")
+    readonly_fields = ("id", "file", "parser_version", "created_at", "updated_at")
+    inlines = [InvoiceLineItemInline]
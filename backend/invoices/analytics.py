@@ -0,0 +1,356 @@
+"""
+Vectorized spend analytics over invoice line items
+
+Line items are loaded as columns into NumPy arrays and every aggregate is
+computed on whole arrays at once: string columns are factorized into integer
+codes, grouped sums are `bincount`s over combined codes, and top-N lists use
+`argpartition`. Amounts are only summed per currency, as there is no exchange
+rate data to convert between them.
+
+The loaded columns are kept in memory until the invoices change, so a request
+only pays for masking and aggregating arrays, not for fetching rows.
+"""
+
+import threading
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection
+from django.db.models import CharField, Count, FloatField, Max
+from django.db.models.functions import Cast
+
+from .filters import parse_param
+from .models import Invoice, InvoiceLineItem
+
+BUCKETS = ("day", "week", "month", "year")
+PERCENTILES = (50, 90, 95, 99)
+
+# Rows fetched from the database per round trip
+CHUNK_SIZE = 50_000
+
+
+def _fetch(queryset):
+    """
+    Stream the rows of a values_list queryset through a plain cursor
+    This skips the ORM's per-row converters, which dominate at millions of rows
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            yield rows
+
+
+def _factorize(values, index):
+    """
+    Integer codes for values, adding unseen values to the label index
+    """
+    setdefault = index.setdefault
+    return [setdefault(value or "", len(index)) for value in values]
+
+
+def load_columns():
+    """
+    Load invoice and line item columns into NumPy arrays
+
+    Invoice fields are loaded once per invoice and line items only carry the
+    position of their invoice, so no join is needed. String columns are
+    factorized into integer codes and labels while loading.
+    """
+    invoices = Invoice.objects.order_by().values_list(
+        "id",
+        "file_id",
+        "vendor",
+        "currency",
+        Cast("invoice_date", CharField()),
+        Cast("total", FloatField()),
+    )
+    positions, vendors, currencies = {}, {}, {}
+    files, vendor_codes, currency_codes, dates, totals = [], [], [], [], []
+    for rows in _fetch(invoices):
+        ids, file_ids, vendor, currency, day, total = zip(*rows)
+        positions.update(zip(ids, range(len(positions), len(positions) + len(ids))))
+        files.extend(file_ids)
+        vendor_codes.extend(_factorize(vendor, vendors))
+        currency_codes.extend(_factorize(currency, currencies))
+        dates.extend(value or "NaT" for value in day)
+        totals.extend(np.nan if value is None else value for value in total)
+
+    line_items = InvoiceLineItem.objects.order_by().values_list(
+        "invoice_id",
+        "sku",
+        Cast("amount", FloatField()),
+        Cast("quantity", FloatField()),
+    )
+    skus = {}
+    invoice_index, sku_codes, amounts, quantities = [], [], [], []
+    for rows in _fetch(line_items):
+        invoice_ids, sku, amount, quantity = zip(*rows)
+        invoice_index.extend(map(positions.__getitem__, invoice_ids))
+        sku_codes.extend(_factorize(sku, skus))
+        amounts.extend(amount)
+        quantities.extend(quantity)
+
+    return {
+        "invoice_file": np.array(
+            [str(uuid.UUID(str(value))) for value in files], dtype=object
+        ),
+        "invoice_vendor_codes": np.array(vendor_codes, dtype=np.int64),
+        "invoice_currency_codes": np.array(currency_codes, dtype=np.int64),
+        "invoice_date": np.array(dates, dtype="datetime64[D]"),
+        "invoice_total": np.array(totals, dtype=np.float64),
+        "vendor_labels": np.array(list(vendors), dtype=object),
+        "currency_labels": np.array(list(currencies), dtype=object),
+        "invoice_index": np.array(invoice_index, dtype=np.int64),
+        "sku_codes": np.array(sku_codes, dtype=np.int64),
+        "sku_labels": np.array(list(skus), dtype=object),
+        "amount": np.array(amounts, dtype=np.float64),
+        "quantity": np.array(quantities, dtype=np.float64),
+    }
+
+
+_columns = {"version": None, "columns": None}
+_columns_lock = threading.Lock()
+
+
+def get_columns():
+    """
+    Columns of all line items, reloaded only when the invoices have changed
+
+    Any re-parse bumps an invoice's `updated_at` and any deletion lowers the
+    count, so the pair is a cheap version of the whole data set.
+    """
+    version = tuple(
+        Invoice.objects.aggregate(count=Count("id"), latest=Max("updated_at")).values()
+    )
+    with _columns_lock:
+        if _columns["version"] != version:
+            _columns["columns"] = load_columns()
+            _columns["version"] = version
+        return _columns["columns"]
+
+
+def select(columns, params):
+    """
+    Per-line columns for the line items matching the invoice query parameters
+    The same parameters as the invoice list endpoint are applied as array masks
+    """
+    vendor_labels = columns["vendor_labels"]
+    vendor_codes = columns["invoice_vendor_codes"]
+    currency_labels = columns["currency_labels"]
+    mask = np.ones(len(vendor_codes), dtype=bool)
+
+    vendor = parse_param(params, "vendor", str)
+    if vendor is not None:
+        mask &= (vendor_labels == vendor)[vendor_codes]
+    vendor_contains = parse_param(params, "vendor_contains", str.lower)
+    if vendor_contains is not None:
+        matches = [vendor_contains in label.lower() for label in vendor_labels]
+        mask &= np.array(matches, dtype=bool)[vendor_codes]
+    currency = parse_param(params, "currency", str.upper)
+    if currency is not None:
+        mask &= (currency_labels == currency)[columns["invoice_currency_codes"]]
+    date_from = parse_param(params, "date_from", date.fromisoformat)
+    if date_from is not None:
+        mask &= columns["invoice_date"] >= np.datetime64(date_from)
+    date_to = parse_param(params, "date_to", date.fromisoformat)
+    if date_to is not None:
+        mask &= columns["invoice_date"] <= np.datetime64(date_to)
+    min_total = parse_param(params, "min_total", Decimal)
+    if min_total is not None:
+        mask &= columns["invoice_total"] >= float(min_total)
+    max_total = parse_param(params, "max_total", Decimal)
+    if max_total is not None:
+        mask &= columns["invoice_total"] <= float(max_total)
+    file = parse_param(params, "file", lambda value: str(uuid.UUID(value)))
+    if file is not None:
+        mask &= columns["invoice_file"] == file
+
+    invoice_index = columns["invoice_index"]
+    lines = mask[invoice_index]
+    invoice_index = invoice_index[lines]
+    return {
+        "vendor_codes": vendor_codes[invoice_index],
+        "vendor_labels": vendor_labels,
+        "currency_codes": columns["invoice_currency_codes"][invoice_index],
+        "currency_labels": currency_labels,
+        "date": columns["invoice_date"][invoice_index],
+        "sku_codes": columns["sku_codes"][lines],
+        "sku_labels": columns["sku_labels"],
+        "amount": columns["amount"][lines],
+        "quantity": columns["quantity"][lines],
+    }
+
+
+def bucket_dates(dates, bucket):
+    """
+    Truncate dates to the start of their day, ISO week, month or year
+    """
+    if bucket == "week":
+        # The epoch was a Thursday, shift so weeks start on Monday
+        days = dates.astype("datetime64[D]").astype(np.int64)
+        starts = days - (days + 3) % 7
+        return starts.astype("datetime64[D]")
+    unit = {"day": "D", "month": "M", "year": "Y"}[bucket]
+    return dates.astype(f"datetime64[{unit}]")
+
+
+def _round(values):
+    return np.round(values, 2).tolist()
+
+
+def _grouped(codes, labels, currency_codes, currency_labels, amounts, quantities):
+    """
+    Sum amounts and quantities per (label, currency) pair
+    Returns parallel arrays for the groups that have at least one row
+    """
+    n_currencies = max(len(currency_labels), 1)
+    keys = codes * n_currencies + currency_codes
+    size = len(labels) * n_currencies
+    totals = np.bincount(keys, weights=amounts, minlength=size)
+    counts = np.bincount(keys, minlength=size)
+    quantity = np.bincount(keys, weights=quantities, minlength=size)
+    present = np.flatnonzero(counts)
+    return (
+        labels[present // n_currencies],
+        currency_labels[present % n_currencies],
+        totals[present],
+        counts[present],
+        quantity[present],
+    )
+
+
+def _top(n, totals):
+    """
+    Indices of the n largest totals in descending order
+    """
+    if len(totals) > n:
+        candidates = np.argpartition(-totals, n - 1)[:n]
+    else:
+        candidates = np.arange(len(totals))
+    return candidates[np.argsort(-totals[candidates], kind="stable")]
+
+
+def summarize(columns, top=10, bucket="month"):
+    """
+    Spend aggregates of line item columns as returned by `select`
+    Periods are in chronological order, top-N lists are sorted by spend
+    """
+    amounts = columns["amount"]
+    quantities = columns["quantity"]
+    if not len(amounts):
+        return {
+            "line_items": 0,
+            "currencies": [],
+            "by_vendor": [],
+            "by_period": [],
+            "top_skus": [],
+        }
+
+    currency_codes = columns["currency_codes"]
+    currency_labels = columns["currency_labels"]
+    vendor_codes = columns["vendor_codes"]
+    vendor_labels = columns["vendor_labels"]
+    sku_codes = columns["sku_codes"]
+    sku_labels = columns["sku_labels"]
+
+    # Currency breakdown with percentiles of line amounts
+    order = np.lexsort((amounts, currency_codes))
+    sorted_amounts = amounts[order]
+    bounds = np.searchsorted(currency_codes[order], np.arange(len(currency_labels) + 1))
+    currencies = []
+    for index, currency in enumerate(currency_labels):
+        values = sorted_amounts[bounds[index] : bounds[index + 1]]
+        if not len(values):
+            continue
+        currencies.append(
+            {
+                "currency": currency,
+                "total": round(float(values.sum()), 2),
+                "line_items": int(len(values)),
+                "percentiles": dict(
+                    zip(
+                        (f"p{p}" for p in PERCENTILES),
+                        _round(np.percentile(values, PERCENTILES)),
+                    )
+                ),
+            }
+        )
+
+    # Totals per vendor, top N by spend
+    vendors, vendor_currencies, totals, counts, _ = _grouped(
+        vendor_codes,
+        vendor_labels,
+        currency_codes,
+        currency_labels,
+        amounts,
+        quantities,
+    )
+    picked = _top(top, totals)
+    by_vendor = [
+        {"vendor": v, "currency": c, "total": t, "line_items": n}
+        for v, c, t, n in zip(
+            vendors[picked].tolist(),
+            vendor_currencies[picked].tolist(),
+            _round(totals[picked]),
+            counts[picked].tolist(),
+        )
+    ]
+
+    # Date-bucketed histogram of spend, skipping undated invoices
+    dated = ~np.isnat(columns["date"])
+    periods = bucket_dates(columns["date"][dated], bucket)
+    period_labels, period_codes = np.unique(periods, return_inverse=True)
+    periods, period_currencies, totals, counts, _ = _grouped(
+        period_codes,
+        period_labels.astype(str),
+        currency_codes[dated],
+        currency_labels,
+        amounts[dated],
+        quantities[dated],
+    )
+    by_period = [
+        {"period": p, "currency": c, "total": t, "line_items": n}
+        for p, c, t, n in zip(
+            periods.tolist(),
+            period_currencies.tolist(),
+            _round(totals),
+            counts.tolist(),
+        )
+    ]
+
+    # Top SKUs by spend, ignoring lines without a SKU
+    blank = np.flatnonzero(sku_labels == "")
+    has_sku = sku_codes != blank[0] if len(blank) else np.ones(len(sku_codes), bool)
+    skus, sku_currencies, totals, counts, quantity = _grouped(
+        sku_codes[has_sku],
+        sku_labels,
+        currency_codes[has_sku],
+        currency_labels,
+        amounts[has_sku],
+        quantities[has_sku],
+    )
+    picked = _top(top, totals)
+    top_skus = [
+        {"sku": s, "currency": c, "total": t, "quantity": q, "line_items": n}
+        for s, c, t, q, n in zip(
+            skus[picked].tolist(),
+            sku_currencies[picked].tolist(),
+            _round(totals[picked]),
+            _round(quantity[picked]),
+            counts[picked].tolist(),
+        )
+    ]
+
+    return {
+        "line_items": int(len(amounts)),
+        "currencies": currencies,
+        "by_vendor": by_vendor,
+        "by_period": by_period,
+        "top_skus": top_skus,
+    }
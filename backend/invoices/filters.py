@@ -0,0 +1,41 @@
+import uuid
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+
+
+def parse_param(params, name, parse):
+    """
+    Parse a query parameter, returning None when it is absent
+    """
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return parse(value)
+    except (ValueError, InvalidOperation):
+        raise ValidationError({name: f"Invalid value '{value}'"})
+
+
+def filter_invoices(queryset, params, prefix=""):
+    """
+    Apply the invoice query parameters to a queryset
+    `prefix` is the lookup path to the invoice, e.g. "invoice__" for line items
+    """
+    lookups = {
+        "vendor": ("vendor", str),
+        "vendor_contains": ("vendor__icontains", str),
+        "currency": ("currency", str.upper),
+        "date_from": ("invoice_date__gte", date.fromisoformat),
+        "date_to": ("invoice_date__lte", date.fromisoformat),
+        "min_total": ("total__gte", Decimal),
+        "max_total": ("total__lte", Decimal),
+        "file": ("file", uuid.UUID),
+    }
+    filters = {}
+    for name, (lookup, parse) in lookups.items():
+        value = parse_param(params, name, parse)
+        if value is not None:
+            filters[prefix + lookup] = value
+    return queryset.filter(**filters)
@@ -0,0 +1,98 @@
+import statistics
+import time
+import uuid
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from invoices import analytics
+from invoices.models import InvoiceLineItem
+
+
+def synthetic_columns(rows, lines_per_invoice=100, vendors=2000, skus=50000, seed=0):
+    """
+    Random columns shaped like the output of `analytics.load_columns`
+    """
+    rng = np.random.default_rng(seed)
+    invoices = max(rows // lines_per_invoice, 1)
+    currencies = np.array(["DKK", "EUR", "GBP", "SEK", "USD"], dtype=object)
+    start = np.datetime64("2022-01-01")
+    return {
+        "invoice_file": np.array(
+            [str(uuid.UUID(int=i)) for i in range(invoices)], dtype=object
+        ),
+        "invoice_vendor_codes": rng.integers(0, vendors, invoices),
+        "invoice_currency_codes": rng.integers(0, len(currencies), invoices),
+        "invoice_date": start
+        + rng.integers(0, 3 * 365, invoices).astype("timedelta64[D]"),
+        "invoice_total": np.round(rng.lognormal(8, 1.5, invoices), 2),
+        "vendor_labels": np.array([f"Vendor {i}" for i in range(vendors)], object),
+        "currency_labels": currencies,
+        "invoice_index": rng.integers(0, invoices, rows),
+        "sku_codes": rng.integers(0, skus, rows),
+        "sku_labels": np.array([""] + [f"SKU-{i}" for i in range(1, skus)], object),
+        "amount": np.round(rng.lognormal(4, 1.5, rows), 2),
+        "quantity": rng.integers(1, 20, rows).astype(np.float64),
+    }
+
+
+class Command(BaseCommand):
+    help = "Time the vectorized spend analytics on synthetic or stored line items"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1_000_000,
+            help="Number of synthetic line items (default: 1,000,000)",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Timed runs per measurement"
+        )
+        parser.add_argument(
+            "--database",
+            action="store_true",
+            help="Also time loading and summarizing the line items in the database",
+        )
+
+    def time(self, label, rows, func):
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(
+            f"{label}: {rows:,} rows, median {statistics.median(timings):.3f}s, "
+            f"best {min(timings):.3f}s over {self.repeat} runs"
+        )
+
+    def handle(self, *args, **options):
+        self.repeat = options["repeat"]
+        columns = synthetic_columns(options["rows"])
+        queries = [
+            ("all line items", {}),
+            (
+                "currency=EUR, date range",
+                {"currency": "EUR", "date_from": "2023-01-01"},
+            ),
+        ]
+        for label, params in queries:
+            for bucket in ("month", "week"):
+                self.time(
+                    f"select + summarize ({label}, bucket={bucket})",
+                    options["rows"],
+                    lambda: analytics.summarize(
+                        analytics.select(columns, params), bucket=bucket
+                    ),
+                )
+
+        if options["database"]:
+            rows = InvoiceLineItem.objects.count()
+            self.time("load_columns (cold)", rows, analytics.load_columns)
+            self.time(
+                "get_columns + select + summarize (warm)",
+                rows,
+                lambda: analytics.summarize(
+                    analytics.select(analytics.get_columns(), {})
+                ),
+            )
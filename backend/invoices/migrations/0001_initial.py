@@ -0,0 +1,190 @@
+# Generated by Django 4.2.10 on 2026-10-17 07:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("files", "0004_upload_metadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Invoice",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Invoice ID",
+                    ),
+                ),
+                (
+                    "parser_version",
+                    models.CharField(max_length=20, verbose_name="Parser Version"),
+                ),
+                (
+                    "vendor",
+                    models.CharField(
+                        blank=True, db_index=True, max_length=255, verbose_name="Vendor"
+                    ),
+                ),
+                (
+                    "invoice_number",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Invoice Number"
+                    ),
+                ),
+                (
+                    "invoice_date",
+                    models.DateField(
+                        blank=True,
+                        db_index=True,
+                        null=True,
+                        verbose_name="Invoice Date",
+                    ),
+                ),
+                (
+                    "due_date",
+                    models.DateField(blank=True, null=True, verbose_name="Due Date"),
+                ),
+                (
+                    "currency",
+                    models.CharField(
+                        blank=True, db_index=True, max_length=3, verbose_name="Currency"
+                    ),
+                ),
+                (
+                    "subtotal",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=14,
+                        null=True,
+                        verbose_name="Subtotal",
+                    ),
+                ),
+                (
+                    "tax",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=14,
+                        null=True,
+                        verbose_name="Tax",
+                    ),
+                ),
+                (
+                    "total",
+                    models.DecimalField(
+                        blank=True,
+                        db_index=True,
+                        decimal_places=2,
+                        max_digits=14,
+                        null=True,
+                        verbose_name="Total",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created At"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated At"),
+                ),
+                (
+                    "file",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="invoice",
+                        to="files.file",
+                        verbose_name="File",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Invoice",
+                "verbose_name_plural": "Invoices",
+                "ordering": ["-invoice_date", "-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="InvoiceLineItem",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Line Item ID",
+                    ),
+                ),
+                ("position", models.PositiveIntegerField(verbose_name="Position")),
+                (
+                    "sku",
+                    models.CharField(
+                        blank=True, db_index=True, max_length=100, verbose_name="SKU"
+                    ),
+                ),
+                (
+                    "description",
+                    models.TextField(blank=True, verbose_name="Description"),
+                ),
+                (
+                    "quantity",
+                    models.DecimalField(
+                        decimal_places=4, max_digits=14, verbose_name="Quantity"
+                    ),
+                ),
+                (
+                    "unit_price",
+                    models.DecimalField(
+                        decimal_places=4, max_digits=14, verbose_name="Unit Price"
+                    ),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=14, verbose_name="Amount"
+                    ),
+                ),
+                (
+                    "invoice",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="line_items",
+                        to="invoices.invoice",
+                        verbose_name="Invoice",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Invoice Line Item",
+                "verbose_name_plural": "Invoice Line Items",
+                "ordering": ["invoice", "position"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="invoicelineitem",
+            constraint=models.UniqueConstraint(
+                fields=("invoice", "position"), name="unique_line_item_position"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(
+                fields=["vendor", "invoice_date"], name="invoices_in_vendor_a93799_idx"
+            ),
+        ),
+    ]
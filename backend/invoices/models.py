@@ -0,0 +1,109 @@
+import uuid
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from files.models import File
+
+
+class Invoice(models.Model):
+    """
+    Invoice header fields extracted from a parsed file
+    """
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        verbose_name=_("Invoice ID"),
+    )
+    file = models.OneToOneField(
+        File, on_delete=models.CASCADE, related_name="invoice", verbose_name=_("File")
+    )
+    parser_version = models.CharField(max_length=20, verbose_name=_("Parser Version"))
+    vendor = models.CharField(
+        max_length=255, blank=True, db_index=True, verbose_name=_("Vendor")
+    )
+    invoice_number = models.CharField(
+        max_length=100, blank=True, verbose_name=_("Invoice Number")
+    )
+    invoice_date = models.DateField(
+        blank=True, null=True, db_index=True, verbose_name=_("Invoice Date")
+    )
+    due_date = models.DateField(blank=True, null=True, verbose_name=_("Due Date"))
+    currency = models.CharField(
+        max_length=3, blank=True, db_index=True, verbose_name=_("Currency")
+    )
+    subtotal = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        verbose_name=_("Subtotal"),
+    )
+    tax = models.DecimalField(
+        max_digits=14, decimal_places=2, blank=True, null=True, verbose_name=_("Tax")
+    )
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        blank=True,
+        null=True,
+        db_index=True,
+        verbose_name=_("Total"),
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Invoice")
+        verbose_name_plural = _("Invoices")
+        ordering = ["-invoice_date", "-created_at"]
+        indexes = [models.Index(fields=["vendor", "invoice_date"])]
+
+    def __str__(self):
+        return f"{self.vendor or self.file} {self.invoice_number}".strip()
+
+
+class InvoiceLineItem(models.Model):
+    """
+    A line of an invoice
+    """
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        verbose_name=_("Line Item ID"),
+    )
+    invoice = models.ForeignKey(
+        Invoice,
+        on_delete=models.CASCADE,
+        related_name="line_items",
+        verbose_name=_("Invoice"),
+    )
+    position = models.PositiveIntegerField(verbose_name=_("Position"))
+    sku = models.CharField(
+        max_length=100, blank=True, db_index=True, verbose_name=_("SKU")
+    )
+    description = models.TextField(blank=True, verbose_name=_("Description"))
+    quantity = models.DecimalField(
+        max_digits=14, decimal_places=4, verbose_name=_("Quantity")
+    )
+    unit_price = models.DecimalField(
+        max_digits=14, decimal_places=4, verbose_name=_("Unit Price")
+    )
+    amount = models.DecimalField(
+        max_digits=14, decimal_places=2, verbose_name=_("Amount")
+    )
+
+    class Meta:
+        verbose_name = _("Invoice Line Item")
+        verbose_name_plural = _("Invoice Line Items")
+        ordering = ["invoice", "position"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["invoice", "position"], name="unique_line_item_position"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.position}. {self.description}"
@@ -0,0 +1,52 @@
+from rest_framework import serializers
+from .models import Invoice, InvoiceLineItem
+
+
+class InvoiceLineItemSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the InvoiceLineItem model
+    """
+
+    class Meta:
+        model = InvoiceLineItem
+        fields = [
+            "id",
+            "invoice",
+            "position",
+            "sku",
+            "description",
+            "quantity",
+            "unit_price",
+            "amount",
+        ]
+        read_only_fields = fields
+
+
+class InvoiceSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the Invoice model with its line items
+    """
+
+    file_name = serializers.CharField(source="file.filename", read_only=True)
+    line_items = InvoiceLineItemSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Invoice
+        fields = [
+            "id",
+            "file",
+            "file_name",
+            "parser_version",
+            "vendor",
+            "invoice_number",
+            "invoice_date",
+            "due_date",
+            "currency",
+            "subtotal",
+            "tax",
+            "total",
+            "line_items",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,80 @@
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from .models import Invoice, InvoiceLineItem
+
+# Line items are inserted in batches of this size
+LINE_ITEM_BATCH_SIZE = 500
+
+# Largest magnitude a DecimalField with 14 digits can hold
+MAX_AMOUNT = Decimal("1e10")
+
+
+def to_decimal(value, places):
+    """
+    Parsed amount as a Decimal rounded to `places`, or None if it does not fit
+    """
+    if value in (None, ""):
+        return None
+    try:
+        amount = Decimal(str(value)).quantize(Decimal(1).scaleb(-places))
+    except InvalidOperation:
+        return None
+    return amount if abs(amount) < MAX_AMOUNT else None
+
+
+def to_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+@transaction.atomic
+def store_invoice(file_id, data):
+    """
+    Write the invoice parsed from a file, replacing any earlier version
+
+    The header is upserted and all line items are inserted with bulk_create, so
+    a document costs a handful of queries regardless of its number of lines.
+    """
+    fields = data.get("fields", {})
+    invoice, created = Invoice.objects.update_or_create(
+        file_id=file_id,
+        defaults={
+            "parser_version": data.get("parser_version", ""),
+            "vendor": (fields.get("vendor") or "")[:255],
+            "invoice_number": (fields.get("invoice_number") or "")[:100],
+            "invoice_date": to_date(fields.get("invoice_date")),
+            "due_date": to_date(fields.get("due_date")),
+            "currency": (fields.get("currency") or "")[:3],
+            "subtotal": to_decimal(fields.get("subtotal"), 2),
+            "tax": to_decimal(fields.get("tax"), 2),
+            "total": to_decimal(fields.get("total"), 2),
+        },
+    )
+    if not created:
+        invoice.line_items.all().delete()
+
+    line_items = []
+    for item in data.get("line_items", []):
+        quantity = to_decimal(item.get("quantity"), 4)
+        unit_price = to_decimal(item.get("unit_price"), 4)
+        amount = to_decimal(item.get("amount"), 2)
+        if None in (quantity, unit_price, amount):
+            continue
+        line_items.append(
+            InvoiceLineItem(
+                invoice=invoice,
+                position=len(line_items) + 1,
+                sku=(item.get("sku") or "")[:100],
+                description=item.get("description") or "",
+                quantity=quantity,
+                unit_price=unit_price,
+                amount=amount,
+            )
+        )
+    InvoiceLineItem.objects.bulk_create(line_items, batch_size=LINE_ITEM_BATCH_SIZE)
+    return invoice
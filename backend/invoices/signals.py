@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from parsing.models import ParseResult
+
+from .services import store_invoice
+
+
+@receiver(post_save, sender=ParseResult)
+def store_parsed_invoice(sender, instance, raw=False, **kwargs):
+    """
+    Keep the structured invoice of a file in sync with its parse result
+    """
+    if not raw:
+        store_invoice(instance.file_id, instance.data)
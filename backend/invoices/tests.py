@@ -0,0 +1,43 @@
+from files.testing import MediaTestCase
+
+from .services import store_invoice
+
+INVOICE = {
+    "parser_version": "1",
+    "fields": {"vendor": "Acme", "currency": "EUR", "total": "12.50"},
+    "line_items": [
+        {"sku": "A-1", "quantity": "1", "unit_price": "12.50", "amount": "12.50"}
+    ],
+}
+
+
+class InvoiceFilterTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.file = self.upload(b"%PDF-1.4 a", name="a.pdf")
+        self.invoice = store_invoice(self.file.pk, INVOICE)
+
+    def test_filter_by_file(self):
+        response = self.client.get("/api/v1/invoices/", {"file": str(self.file.pk)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+        response = self.client.get("/api/v1/line-items/", {"file": str(self.file.pk)})
+        self.assertEqual(response.data["count"], 1)
+
+    def test_filter_by_invoice(self):
+        response = self.client.get(
+            "/api/v1/line-items/", {"invoice": str(self.invoice.pk)}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+
+    def test_invalid_ids(self):
+        for url, name in [
+            ("/api/v1/invoices/", "file"),
+            ("/api/v1/line-items/", "file"),
+            ("/api/v1/line-items/", "invoice"),
+        ]:
+            with self.subTest(url=url, name=name):
+                response = self.client.get(url, {name: "notauuid"})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(name, response.data)
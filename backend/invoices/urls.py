@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import SpendAnalyticsView
+
+urlpatterns = [
+    path("analytics/", SpendAnalyticsView.as_view(), name="analytics"),
+]
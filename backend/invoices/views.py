@@ -0,0 +1,113 @@
+import uuid
+
+from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
+from . import analytics
+from .filters import filter_invoices, parse_param
+from .models import Invoice, InvoiceLineItem
+from .serializers import InvoiceLineItemSerializer, InvoiceSerializer
+
+INVOICE_FILTER_PARAMETERS = [
+    OpenApiParameter("vendor", str, description="Exact vendor name"),
+    OpenApiParameter("vendor_contains", str, description="Part of the vendor name"),
+    OpenApiParameter("currency", str, description="ISO 4217 currency code"),
+    OpenApiParameter("date_from", str, description="Earliest invoice date"),
+    OpenApiParameter("date_to", str, description="Latest invoice date"),
+    OpenApiParameter("min_total", str, description="Smallest invoice total"),
+    OpenApiParameter("max_total", str, description="Largest invoice total"),
+    OpenApiParameter("file", OpenApiTypes.UUID, description="ID of the parsed file"),
+]
+
+
+@extend_schema_view(
+    list=extend_schema(
+        description="List parsed invoices", parameters=INVOICE_FILTER_PARAMETERS
+    ),
+    retrieve=extend_schema(description="Retrieve a parsed invoice"),
+)
+class InvoiceViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for invoices extracted from parsed files.
+    """
+
+    queryset = Invoice.objects.select_related("file").prefetch_related("line_items")
+    serializer_class = InvoiceSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            queryset = filter_invoices(queryset, self.request.query_params)
+        return queryset
+
+
+@extend_schema_view(
+    list=extend_schema(
+        description="List invoice line items",
+        parameters=INVOICE_FILTER_PARAMETERS
+        + [
+            OpenApiParameter(
+                "invoice", OpenApiTypes.UUID, description="ID of the invoice"
+            ),
+            OpenApiParameter("sku", str, description="Exact SKU"),
+        ],
+    ),
+    retrieve=extend_schema(description="Retrieve an invoice line item"),
+)
+class InvoiceLineItemViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint for line items of parsed invoices.
+    """
+
+    queryset = InvoiceLineItem.objects.all()
+    serializer_class = InvoiceLineItemSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            params = self.request.query_params
+            queryset = filter_invoices(queryset, params, prefix="invoice__")
+            invoice = parse_param(params, "invoice", uuid.UUID)
+            if invoice is not None:
+                queryset = queryset.filter(invoice=invoice)
+            if params.get("sku"):
+                queryset = queryset.filter(sku=params["sku"])
+        return queryset
+
+
+class SpendAnalyticsView(APIView):
+    """
+    API endpoint for spend aggregates over parsed invoice line items.
+    """
+
+    @extend_schema(
+        description=(
+            "Spend totals by currency (with percentiles of line amounts), by "
+            "vendor, by date bucket and for the top SKUs"
+        ),
+        parameters=INVOICE_FILTER_PARAMETERS
+        + [
+            OpenApiParameter(
+                "bucket", str, enum=analytics.BUCKETS, description="Period size"
+            ),
+            OpenApiParameter("top", int, description="Length of the top-N lists"),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        params = request.query_params
+        bucket = params.get("bucket", "month")
+        if bucket not in analytics.BUCKETS:
+            raise ValidationError({"bucket": f"Must be one of {analytics.BUCKETS}"})
+        try:
+            top = int(params.get("top", 10))
+        except ValueError:
+            top = 0
+        if not 1 <= top <= 1000:
+            raise ValidationError({"top": "Must be an integer from 1 to 1000"})
+
+        columns = analytics.select(analytics.get_columns(), params)
+        return Response(analytics.summarize(columns, top=top, bucket=bucket))
@@ -0,0 +1,46 @@
+from django.contrib import admin
+from .models import ParseCacheEntry, ParseJob, ParseResult
+
+
+@admin.register(ParseJob)
+class ParseJobAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the ParseJob model
+    """
+
+    list_display = ("id", "file", "status", "attempts", "queued_at", "finished_at")
+    list_filter = ("status", "queued_at")
+    search_fields = ("file__original_file_name", "file__user_defined_file_name")
+    readonly_fields = (
+        "id",
+        "file",
+        "attempts",
+        "error",
+        "queued_at",
+        "started_at",
+        "finished_at",
+    )
+
+
+@admin.register(ParseResult)
+class ParseResultAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the ParseResult model
+    """
+
+    list_display = ("id", "file", "parser_version", "updated_at")
+    list_filter = ("parser_version",)
+    search_fields = ("file__original_file_name", "file__user_defined_file_name")
+    readonly_fields = ("id", "file", "parser_version", "data", "created_at")
+
+
+@admin.register(ParseCacheEntry)
+class ParseCacheEntryAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the ParseCacheEntry model
+    """
+
+    list_display = ("sha256", "parser_version", "size", "hits", "last_used_at")
+    list_filter = ("parser_version",)
+    search_fields = ("sha256",)
+    readonly_fields = ("id", "sha256", "parser_version", "data", "size", "created_at")
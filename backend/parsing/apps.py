@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ParsingConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "parsing"
+    verbose_name = "Invoice Parsing"
+
+    def ready(self):
+        from . import signals  # noqa: F401
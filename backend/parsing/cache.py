@@ -0,0 +1,195 @@
+"""
+Parse-result cache keyed by (content hash, parser version)
+
+Parsing is deterministic for given bytes and parser version, so identical
+invoices and re-runs after a deploy reuse the stored output. The cache is bounded
+by the JSON size of its entries and evicts the least recently used ones.
+
+The total size is kept in a counter updated by every store, so storing does not
+sum the whole table. Once the counter passes the bound, eviction recounts the
+entries, which also corrects any drift such as entries deleted in the admin, and
+trims the cache well below the bound so that this happens only now and then.
+"""
+
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .extract import PARSER_VERSION
+from .models import ParseCacheCounter, ParseCacheEntry, ParseResult
+
+HITS = "hits"
+MISSES = "misses"
+EVICTIONS = "evictions"
+SIZE = "size"
+
+# Eviction trims the cache to this fraction of its bound
+LOW_WATER_MARK = 0.9
+
+
+def increment(name, amount=1):
+    """
+    Add to a cache counter, creating it on first use
+    """
+    if not ParseCacheCounter.objects.filter(name=name).update(
+        value=F("value") + amount
+    ):
+        counter, created = ParseCacheCounter.objects.get_or_create(
+            name=name, defaults={"value": amount}
+        )
+        if not created:
+            increment(name, amount)
+
+
+def lookup(sha256, parser_version=PARSER_VERSION, record_miss=True):
+    """
+    Cached parse output for the content, or None
+    Records a hit or a miss and refreshes the entry's recency
+    """
+    entry = (
+        ParseCacheEntry.objects.filter(sha256=sha256, parser_version=parser_version)
+        .only("id", "data")
+        .first()
+        if sha256
+        else None
+    )
+    if entry is None:
+        if record_miss:
+            increment(MISSES)
+        return None
+    ParseCacheEntry.objects.filter(pk=entry.pk).update(
+        hits=F("hits") + 1, last_used_at=timezone.now()
+    )
+    increment(HITS)
+    return entry.data
+
+
+def store(sha256, data):
+    """
+    Cache parse output for the content and evict entries over the size bound
+    """
+    if not sha256:
+        return
+    size = len(json.dumps(data))
+    with transaction.atomic():
+        entries = ParseCacheEntry.objects.filter(
+            sha256=sha256, parser_version=data["parser_version"]
+        )
+        previous = entries.values_list("size", flat=True).first() or 0
+        ParseCacheEntry.objects.update_or_create(
+            sha256=sha256,
+            parser_version=data["parser_version"],
+            defaults={"data": data, "size": size, "last_used_at": timezone.now()},
+        )
+        add_size(size - previous)
+    if total_size() > settings.PARSE_CACHE_MAX_SIZE:
+        evict()
+
+
+def add_size(amount):
+    if amount and not ParseCacheCounter.objects.filter(name=SIZE).update(
+        value=Greatest(F("value") + amount, 0)
+    ):
+        recount_size()
+
+
+def total_size():
+    """
+    Size of the cache entries from its counter, counted on first use
+    """
+    size = (
+        ParseCacheCounter.objects.filter(name=SIZE)
+        .values_list("value", flat=True)
+        .first()
+    )
+    return recount_size() if size is None else size
+
+
+def recount_size():
+    """
+    Reset the size counter to the summed size of the entries, returning it
+    """
+    size = ParseCacheEntry.objects.aggregate(total=Sum("size"))["total"] or 0
+    ParseCacheCounter.objects.update_or_create(name=SIZE, defaults={"value": size})
+    return size
+
+
+def evict(max_size=None):
+    """
+    Delete least recently used entries while the cache is over `max_size`
+    bytes, down to `LOW_WATER_MARK` of it
+    Returns the number of entries evicted
+    """
+    if max_size is None:
+        max_size = settings.PARSE_CACHE_MAX_SIZE
+    excess = recount_size() - max_size
+    if excess <= 0:
+        return 0
+    excess += max_size * (1 - LOW_WATER_MARK)
+
+    evicted = []
+    freed = 0
+    for entry_id, size in (
+        ParseCacheEntry.objects.order_by("last_used_at")
+        .values_list("id", "size")
+        .iterator()
+    ):
+        evicted.append(entry_id)
+        freed += size
+        if freed >= excess:
+            break
+    ParseCacheEntry.objects.filter(pk__in=evicted).delete()
+    add_size(-freed)
+    increment(EVICTIONS, len(evicted))
+    return len(evicted)
+
+
+def cached_sha256s(sha256s, parser_version=PARSER_VERSION):
+    """
+    Those of the given content hashes that have cached parse output
+    """
+    return set(
+        ParseCacheEntry.objects.filter(
+            sha256__in=[sha256 for sha256 in sha256s if sha256],
+            parser_version=parser_version,
+        ).values_list("sha256", flat=True)
+    )
+
+
+@transaction.atomic
+def apply_cached_result(file):
+    """
+    Give a file the cached parse output for its content, if there is one
+    Returns True when the file needs no parse job
+    """
+    # A miss is counted by the worker, which checks the cache again
+    data = lookup(file.sha256, record_miss=False)
+    if data is None:
+        return False
+    ParseResult.objects.update_or_create(
+        file=file, defaults={"parser_version": data["parser_version"], "data": data}
+    )
+    return True
+
+
+def stats():
+    """
+    Counters and current size of the cache
+    """
+    counters = dict(ParseCacheCounter.objects.values_list("name", "value"))
+    hits, misses = counters.get(HITS, 0), counters.get(MISSES, 0)
+    usage = ParseCacheEntry.objects.aggregate(size=Sum("size"))
+    return {
+        "hits": hits,
+        "misses": misses,
+        "evictions": counters.get(EVICTIONS, 0),
+        "hit_ratio": hits / (hits + misses) if hits + misses else None,
+        "entries": ParseCacheEntry.objects.count(),
+        "size": usage["size"] or 0,
+        "max_size": settings.PARSE_CACHE_MAX_SIZE,
+        "parser_version": PARSER_VERSION,
+    }
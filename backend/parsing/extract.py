@@ -0,0 +1,265 @@
+"""
+Invoice text and field extraction
+
+Everything in this module is plain Python with no Django dependencies, so it
+can run inside the worker processes of the parse pool.
+"""
+
+import re
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+# Bump whenever the extracted output changes, so stored results can be told apart
+PARSER_VERSION = "1"
+
+
+class UnsupportedDocument(Exception):
+    """
+    Raised for documents the parser cannot extract text from
+    """
+
+
+CURRENCY_SYMBOLS = {"$": "USD", "€": "EUR", "£": "GBP", "¥": "JPY", "kr": "DKK"}
+CURRENCY_CODES = {
+    "AUD",
+    "CAD",
+    "CHF",
+    "CNY",
+    "DKK",
+    "EUR",
+    "GBP",
+    "JPY",
+    "NOK",
+    "SEK",
+    "USD",
+}
+
+AMOUNT = r"-?\d{1,3}(?:[ ,. ]?\d{3})*(?:[.,]\d{1,2})?|-?\d+(?:[.,]\d{1,2})?"
+CURRENCY = r"[A-Z]{3}|[$€£¥]"
+DATE = r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[./-]\d{1,2}[./-]\d{2,4}"
+
+INVOICE_NUMBER_RE = re.compile(
+    r"invoice\s*(?:no\.?|number|num\.?|#)\s*[:#]?\s*([A-Z0-9][A-Z0-9\-/]*)",
+    re.IGNORECASE,
+)
+INVOICE_DATE_RE = re.compile(
+    rf"(?:invoice\s+date|date\s+of\s+issue|issue\s+date|date)\s*:?\s*({DATE})",
+    re.IGNORECASE,
+)
+DUE_DATE_RE = re.compile(
+    rf"(?:due\s+date|payment\s+due|due)\s*:?\s*({DATE})", re.IGNORECASE
+)
+TOTAL_RE = re.compile(
+    rf"(?:grand\s+total|total\s+due|amount\s+due|balance\s+due|total)"
+    rf"\s*(?:\([^)]*\))?\s*:?\s*({CURRENCY})?\s*({AMOUNT})\s*({CURRENCY})?",
+    re.IGNORECASE,
+)
+TAX_RE = re.compile(
+    rf"(?:vat|tax|moms|gst)\s*(?:\([^)]*\))?\s*:?\s*(?:{CURRENCY})?\s*({AMOUNT})",
+    re.IGNORECASE,
+)
+LINE_ITEM_RE = re.compile(
+    rf"^(?P<description>\S.*?)\s+(?P<quantity>\d+(?:[.,]\d+)?)\s*(?:x|pcs|stk)?\s+"
+    rf"(?P<unit_price>{AMOUNT})\s+(?P<amount>{AMOUNT})\s*$",
+    re.IGNORECASE,
+)
+SKU_RE = re.compile(r"^(?P<sku>[A-Z0-9][A-Z0-9\-_.]{2,})\s+(?P<rest>.+)$")
+
+
+def parse_amount(value):
+    """
+    Parse an amount written with either `,` or `.` as the decimal separator
+    Returns a Decimal, or None when the value is not a number
+    """
+    value = value.replace(" ", "").replace(" ", "")
+    if "," in value and "." in value:
+        # The separator that comes last is the decimal separator
+        if value.rfind(",") > value.rfind("."):
+            value = value.replace(".", "").replace(",", ".")
+        else:
+            value = value.replace(",", "")
+    elif "," in value:
+        whole, _, fraction = value.rpartition(",")
+        if len(fraction) <= 2:
+            value = f"{whole}.{fraction}"
+        else:
+            value = value.replace(",", "")
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def parse_date(value):
+    """
+    Parse an ISO or day-first date into an ISO 8601 string, or None
+    """
+    try:
+        if re.match(r"^\d{4}-", value):
+            year, month, day = (int(part) for part in value.split("-"))
+        else:
+            day, month, year = (int(part) for part in re.split(r"[./-]", value))
+            if year < 100:
+                year += 2000
+            if month > 12 >= day:
+                day, month = month, day
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+def detect_currency(text):
+    """
+    Most frequently mentioned currency code or symbol in the text
+    """
+    counts = {}
+    for code in re.findall(r"\b[A-Z]{3}\b", text):
+        if code in CURRENCY_CODES:
+            counts[code] = counts.get(code, 0) + 1
+    for symbol, code in CURRENCY_SYMBOLS.items():
+        if symbol.isalpha():
+            hits = len(re.findall(rf"\b{symbol}\b", text))
+        else:
+            hits = text.count(symbol)
+        if hits:
+            counts[code] = counts.get(code, 0) + hits
+    if not counts:
+        return None
+    return max(counts, key=counts.get)
+
+
+def extract_text_layers(path, mime_type):
+    """
+    Text of each page of a document as a list of strings
+    """
+    if mime_type == "text/plain":
+        with open(path, "rb") as f:
+            return [f.read().decode("utf-8", errors="replace")]
+
+    if mime_type == "application/pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise UnsupportedDocument("PDF parsing requires the pypdf package")
+        reader = PdfReader(path)
+        return [page.extract_text() or "" for page in reader.pages]
+
+    if mime_type and mime_type.startswith("image/"):
+        try:
+            import pytesseract
+            from PIL import Image
+        except ImportError:
+            raise UnsupportedDocument("Image parsing requires the pytesseract package")
+        try:
+            with Image.open(path) as image:
+                return [pytesseract.image_to_string(image)]
+        except pytesseract.TesseractNotFoundError:
+            raise UnsupportedDocument("Image parsing requires the Tesseract binary")
+
+    raise UnsupportedDocument(
+        f"Cannot parse documents of type {mime_type or 'unknown'}"
+    )
+
+
+def extract_line_items(lines):
+    """
+    Rows that look like `description quantity unit_price amount`
+    """
+    items = []
+    for line in lines:
+        match = LINE_ITEM_RE.match(line.strip())
+        if not match:
+            continue
+        quantity = parse_amount(match["quantity"])
+        unit_price = parse_amount(match["unit_price"])
+        amount = parse_amount(match["amount"])
+        if None in (quantity, unit_price, amount):
+            continue
+        description, sku = match["description"].strip(), None
+        sku_match = SKU_RE.match(description)
+        if sku_match and any(c.isdigit() for c in sku_match["sku"]):
+            sku, description = sku_match["sku"], sku_match["rest"].strip()
+        items.append(
+            {
+                "position": len(items) + 1,
+                "sku": sku,
+                "description": description,
+                "quantity": str(quantity),
+                "unit_price": str(unit_price),
+                "amount": str(amount),
+            }
+        )
+    return items
+
+
+def extract_fields(text):
+    """
+    Header fields detected in the text of an invoice
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    fields = {
+        "vendor": lines[0][:255] if lines else None,
+        "invoice_number": None,
+        "invoice_date": None,
+        "due_date": None,
+        "currency": detect_currency(text),
+        "subtotal": None,
+        "tax": None,
+        "total": None,
+    }
+
+    match = INVOICE_NUMBER_RE.search(text)
+    if match:
+        fields["invoice_number"] = match.group(1)
+
+    match = DUE_DATE_RE.search(text)
+    if match:
+        fields["due_date"] = parse_date(match.group(1))
+
+    for match in INVOICE_DATE_RE.finditer(text):
+        # A bare "date" label may belong to "Due date"
+        if "due" not in text[max(match.start() - 8, 0) : match.start()].lower():
+            fields["invoice_date"] = parse_date(match.group(1))
+            break
+
+    match = TAX_RE.search(text)
+    if match:
+        tax = parse_amount(match.group(1))
+        fields["tax"] = str(tax) if tax is not None else None
+
+    for match in TOTAL_RE.finditer(text):
+        label = match.group(0).lower()
+        amount = parse_amount(match.group(2))
+        if amount is None:
+            continue
+        if "sub" in text[max(match.start() - 3, 0) : match.start()].lower():
+            fields["subtotal"] = str(amount)
+            continue
+        # The last total on the document is usually the amount payable
+        fields["total"] = str(amount)
+        for code in (match.group(1), match.group(3)):
+            code = CURRENCY_SYMBOLS.get(code, code.upper() if code else None)
+            if code in CURRENCY_CODES and "total" in label:
+                fields["currency"] = code
+                break
+
+    return fields, extract_line_items(lines)
+
+
+def parse_document(path, mime_type):
+    """
+    Extract text layers, header fields and line items from a stored document
+
+    Runs in a worker process, so it only takes and returns plain data.
+    """
+    pages = extract_text_layers(path, mime_type)
+    text = "\n".join(pages)
+    fields, line_items = extract_fields(text)
+    return {
+        "parser_version": PARSER_VERSION,
+        "pages": [
+            {"number": number, "text": page} for number, page in enumerate(pages, 1)
+        ],
+        "fields": fields,
+        "line_items": line_items,
+    }
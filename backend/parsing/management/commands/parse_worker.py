@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from parsing.worker import ParseWorker
+
+
+class Command(BaseCommand):
+    help = "Run queued invoice parse jobs on a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=settings.PARSE_WORKER_CONCURRENCY,
+            help="Number of worker processes (default: PARSE_WORKER_CONCURRENCY)",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=int,
+            default=settings.PARSE_JOB_TIMEOUT,
+            help="Seconds before an attempt is abandoned (default: PARSE_JOB_TIMEOUT)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of waiting for new jobs",
+        )
+
+    def handle(self, *args, **options):
+        worker = ParseWorker(
+            concurrency=options["concurrency"],
+            timeout=options["timeout"],
+            poll_interval=settings.PARSE_WORKER_POLL_INTERVAL,
+            niceness=settings.PARSE_WORKER_NICENESS,
+        )
+        self.stdout.write(
+            f"Parse worker started with {worker.concurrency} processes "
+            f"and a {worker.timeout}s job timeout"
+        )
+        try:
+            worker.run(once=options["once"])
+        except KeyboardInterrupt:
+            self.stdout.write("Parse worker stopped")
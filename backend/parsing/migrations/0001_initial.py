@@ -0,0 +1,132 @@
+# Generated by Django 4.2.10 on 2026-10-17 07:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("files", "0004_upload_metadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ParseResult",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Result ID",
+                    ),
+                ),
+                (
+                    "parser_version",
+                    models.CharField(max_length=20, verbose_name="Parser Version"),
+                ),
+                ("data", models.JSONField(verbose_name="Data")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created At"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated At"),
+                ),
+                (
+                    "file",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="parse_result",
+                        to="files.file",
+                        verbose_name="File",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Parse Result",
+                "verbose_name_plural": "Parse Results",
+                "ordering": ["-updated_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ParseJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Job ID",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(default=0, verbose_name="Attempts"),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="Error")),
+                (
+                    "queued_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Queued At"
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Started At"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Finished At"
+                    ),
+                ),
+                (
+                    "file",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="parse_jobs",
+                        to="files.file",
+                        verbose_name="File",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Parse Job",
+                "verbose_name_plural": "Parse Jobs",
+                "ordering": ["-queued_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "queued_at"],
+                        name="parsing_par_status_50e525_idx",
+                    )
+                ],
+            },
+        ),
+    ]
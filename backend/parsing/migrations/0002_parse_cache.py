@@ -0,0 +1,89 @@
+# Generated by Django 4.2.10 on 2026-10-17 07:36
+
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("parsing", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ParseCacheCounter",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Counter ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=50, unique=True, verbose_name="Name"),
+                ),
+                (
+                    "value",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Value"),
+                ),
+            ],
+            options={
+                "verbose_name": "Parse Cache Counter",
+                "verbose_name_plural": "Parse Cache Counters",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ParseCacheEntry",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Cache Entry ID",
+                    ),
+                ),
+                ("sha256", models.CharField(max_length=64, verbose_name="SHA-256")),
+                (
+                    "parser_version",
+                    models.CharField(max_length=20, verbose_name="Parser Version"),
+                ),
+                ("data", models.JSONField(verbose_name="Data")),
+                ("size", models.PositiveIntegerField(verbose_name="Size")),
+                ("hits", models.PositiveIntegerField(default=0, verbose_name="Hits")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Created At"),
+                ),
+                (
+                    "last_used_at",
+                    models.DateTimeField(
+                        db_index=True,
+                        default=django.utils.timezone.now,
+                        verbose_name="Last Used At",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Parse Cache Entry",
+                "verbose_name_plural": "Parse Cache Entries",
+                "ordering": ["-last_used_at"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="parsecacheentry",
+            constraint=models.UniqueConstraint(
+                fields=("sha256", "parser_version"), name="unique_parse_cache_key"
+            ),
+        ),
+    ]
@@ -0,0 +1,148 @@
+import uuid
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from files.models import File
+
+
+class ParseJob(models.Model):
+    """
+    Queued request to parse a file, claimed and run by the parse worker
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", _("Queued")
+        RUNNING = "running", _("Running")
+        DONE = "done", _("Done")
+        FAILED = "failed", _("Failed")
+
+    id = models.UUIDField(
+        primary_key=True, default=uuid.uuid4, editable=False, verbose_name=_("Job ID")
+    )
+    file = models.ForeignKey(
+        File,
+        on_delete=models.CASCADE,
+        related_name="parse_jobs",
+        verbose_name=_("File"),
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.QUEUED,
+        verbose_name=_("Status"),
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Attempts"))
+    error = models.TextField(blank=True, verbose_name=_("Error"))
+    queued_at = models.DateTimeField(default=timezone.now, verbose_name=_("Queued At"))
+    started_at = models.DateTimeField(
+        blank=True, null=True, verbose_name=_("Started At")
+    )
+    finished_at = models.DateTimeField(
+        blank=True, null=True, verbose_name=_("Finished At")
+    )
+
+    class Meta:
+        verbose_name = _("Parse Job")
+        verbose_name_plural = _("Parse Jobs")
+        ordering = ["-queued_at"]
+        indexes = [models.Index(fields=["status", "queued_at"])]
+
+    def __str__(self):
+        return f"{self.file} ({self.status})"
+
+    def duration(self):
+        """
+        Seconds spent running the last attempt, if it has finished
+        """
+        if self.started_at and self.finished_at:
+            return (self.finished_at - self.started_at).total_seconds()
+        return None
+
+
+class ParseResult(models.Model):
+    """
+    Output of the most recent successful parse of a file
+    """
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        verbose_name=_("Result ID"),
+    )
+    file = models.OneToOneField(
+        File,
+        on_delete=models.CASCADE,
+        related_name="parse_result",
+        verbose_name=_("File"),
+    )
+    parser_version = models.CharField(max_length=20, verbose_name=_("Parser Version"))
+    data = models.JSONField(verbose_name=_("Data"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Parse Result")
+        verbose_name_plural = _("Parse Results")
+        ordering = ["-updated_at"]
+
+    def __str__(self):
+        return f"{self.file} (v{self.parser_version})"
+
+
+class ParseCacheEntry(models.Model):
+    """
+    Parse output shared by every file with the same content and parser version
+    """
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        verbose_name=_("Cache Entry ID"),
+    )
+    sha256 = models.CharField(max_length=64, verbose_name=_("SHA-256"))
+    parser_version = models.CharField(max_length=20, verbose_name=_("Parser Version"))
+    data = models.JSONField(verbose_name=_("Data"))
+    size = models.PositiveIntegerField(verbose_name=_("Size"))
+    hits = models.PositiveIntegerField(default=0, verbose_name=_("Hits"))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Created At"))
+    last_used_at = models.DateTimeField(
+        default=timezone.now, db_index=True, verbose_name=_("Last Used At")
+    )
+
+    class Meta:
+        verbose_name = _("Parse Cache Entry")
+        verbose_name_plural = _("Parse Cache Entries")
+        ordering = ["-last_used_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sha256", "parser_version"], name="unique_parse_cache_key"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.sha256} (v{self.parser_version})"
+
+
+class ParseCacheCounter(models.Model):
+    """
+    Named counter for parse cache activity, shared by all processes
+    """
+
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+        verbose_name=_("Counter ID"),
+    )
+    name = models.CharField(max_length=50, unique=True, verbose_name=_("Name"))
+    value = models.PositiveBigIntegerField(default=0, verbose_name=_("Value"))
+
+    class Meta:
+        verbose_name = _("Parse Cache Counter")
+        verbose_name_plural = _("Parse Cache Counters")
+        ordering = ["name"]
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
@@ -0,0 +1,130 @@
+"""
+Database-backed parse job queue
+
+Jobs are claimed with a conditional UPDATE on their status, so any number of
+worker processes can share the queue without an external broker and without
+row locks that SQLite does not support.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache
+from .models import ParseJob, ParseResult
+
+
+def enqueue(file):
+    """
+    Queue a parse job for a file unless one is already waiting
+    """
+    job = file.parse_jobs.filter(status=ParseJob.Status.QUEUED).first()
+    if job is None:
+        job = ParseJob.objects.create(file=file)
+    return job
+
+
+def enqueue_many(files):
+    """
+    Queue parse jobs for a batch of new files in one query
+    """
+    return ParseJob.objects.bulk_create([ParseJob(file=file) for file in files])
+
+
+def claim_next():
+    """
+    Atomically move the oldest queued job to running and return it
+    Returns None when the queue is empty
+    """
+    while True:
+        job_id = (
+            ParseJob.objects.filter(status=ParseJob.Status.QUEUED)
+            .order_by("queued_at")
+            .values_list("id", flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        claimed = ParseJob.objects.filter(
+            pk=job_id, status=ParseJob.Status.QUEUED
+        ).update(
+            status=ParseJob.Status.RUNNING,
+            started_at=timezone.now(),
+            finished_at=None,
+            attempts=F("attempts") + 1,
+        )
+        if claimed:
+            job = ParseJob.objects.select_related("file").filter(pk=job_id).first()
+            if job is not None:
+                return job
+            # Deleted along with its file right after the claim
+        # Another worker claimed it first, try the next one
+
+
+def complete(job, data, cached=False):
+    """
+    Store the parse output of a job and mark it done
+    Fresh output is also added to the parse cache. Returns False, storing no
+    result, if the job was deleted along with its file in the meantime.
+    """
+    if not cached:
+        cache.store(job.file.sha256, data)
+    with transaction.atomic():
+        # Marking the job first locks it, so its file cannot be deleted
+        # before the result is stored
+        if not ParseJob.objects.filter(pk=job.pk).update(
+            status=ParseJob.Status.DONE, error="", finished_at=timezone.now()
+        ):
+            return False
+        ParseResult.objects.update_or_create(
+            file_id=job.file_id,
+            defaults={"parser_version": data["parser_version"], "data": data},
+        )
+    return True
+
+
+def fail(job, error, retry=True):
+    """
+    Record a failed attempt, putting the job back in the queue while it has
+    attempts left
+    Returns False if the job was deleted along with its file in the meantime.
+    """
+    job.error = error
+    job.finished_at = timezone.now()
+    if retry and job.attempts < settings.PARSE_JOB_MAX_ATTEMPTS:
+        job.status = ParseJob.Status.QUEUED
+        job.queued_at = job.finished_at
+    else:
+        job.status = ParseJob.Status.FAILED
+    return bool(
+        ParseJob.objects.filter(pk=job.pk).update(
+            status=job.status,
+            error=job.error,
+            finished_at=job.finished_at,
+            queued_at=job.queued_at,
+        )
+    )
+
+
+def release(job):
+    """
+    Put a running job back in the queue without counting the attempt
+    """
+    ParseJob.objects.filter(pk=job.pk, status=ParseJob.Status.RUNNING).update(
+        status=ParseJob.Status.QUEUED, attempts=F("attempts") - 1
+    )
+
+
+def requeue_stale():
+    """
+    Requeue jobs left running by a worker that died, judged by the job timeout
+    Returns the number of jobs requeued
+    """
+    cutoff = timezone.now() - timedelta(seconds=2 * settings.PARSE_JOB_TIMEOUT)
+    stale = ParseJob.objects.filter(
+        status=ParseJob.Status.RUNNING, started_at__lt=cutoff
+    )
+    return stale.update(status=ParseJob.Status.QUEUED, queued_at=timezone.now())
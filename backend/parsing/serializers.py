@@ -0,0 +1,59 @@
+from rest_framework import serializers
+from .models import ParseJob, ParseResult
+
+
+class ParseJobSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the ParseJob model
+    """
+
+    duration = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = ParseJob
+        fields = [
+            "id",
+            "status",
+            "attempts",
+            "error",
+            "queued_at",
+            "started_at",
+            "finished_at",
+            "duration",
+        ]
+        read_only_fields = fields
+
+
+class ParseResultSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the ParseResult model
+    """
+
+    class Meta:
+        model = ParseResult
+        fields = ["id", "parser_version", "data", "created_at", "updated_at"]
+        read_only_fields = fields
+
+
+class FileParseSerializer(serializers.Serializer):
+    """
+    Parse state of a file: its latest job and the stored result
+    """
+
+    job = ParseJobSerializer(allow_null=True)
+    result = ParseResultSerializer(allow_null=True)
+
+
+class ParseCacheStatsSerializer(serializers.Serializer):
+    """
+    Parse cache counters and usage
+    """
+
+    hits = serializers.IntegerField()
+    misses = serializers.IntegerField()
+    evictions = serializers.IntegerField()
+    hit_ratio = serializers.FloatField(allow_null=True)
+    entries = serializers.IntegerField()
+    size = serializers.IntegerField(help_text="Size of cached output in bytes")
+    max_size = serializers.IntegerField(help_text="Cache size bound in bytes")
+    parser_version = serializers.CharField()
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from files.models import File
+from files.signals import files_bulk_created
+
+from .cache import apply_cached_result, cached_sha256s
+from .queue import enqueue, enqueue_many
+
+
+@receiver(post_save, sender=File)
+def queue_parse_job(sender, instance, created, raw=False, **kwargs):
+    """
+    Queue every newly uploaded file for parsing, unless its content has already
+    been parsed by the current parser
+    """
+    if created and not raw and not apply_cached_result(instance):
+        enqueue(instance)
+
+
+@receiver(files_bulk_created)
+def queue_parse_jobs(sender, files, **kwargs):
+    """
+    Queue parse jobs for files uploaded in bulk, looking up the cache for the
+    whole batch at once
+    """
+    cached = cached_sha256s(file.sha256 for file in files)
+    enqueue_many(
+        [
+            file
+            for file in files
+            if file.sha256 not in cached or not apply_cached_result(file)
+        ]
+    )
@@ -0,0 +1,186 @@
+import io
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+
+import pytesseract
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from files.testing import MediaTestCase
+
+from . import cache, queue
+from .extract import PARSER_VERSION, UnsupportedDocument, parse_document
+from .models import ParseCacheEntry, ParseJob, ParseResult
+from .worker import ParseWorker
+
+
+def parse_output(text="Invoice 1"):
+    return {
+        "parser_version": PARSER_VERSION,
+        "pages": [{"number": 1, "text": text}],
+        "fields": {},
+        "line_items": [],
+    }
+
+
+class FinishedResult:
+    """
+    Stand-in for the async result of a pool task that has finished
+    """
+
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+
+    def ready(self):
+        return True
+
+    def get(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class ImageParsingTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        output = io.BytesIO()
+        Image.new("RGB", (32, 32), "white").save(output, "PNG")
+        self.path = self.upload(output.getvalue(), name="scan.png").file.path
+
+    def test_image_text_is_recognized(self):
+        text = "ACME Corp\nInvoice Number: 42\nTotal: 12.50 EUR"
+        with mock.patch("pytesseract.image_to_string", return_value=text):
+            data = parse_document(self.path, "image/png")
+        self.assertEqual(data["fields"]["invoice_number"], "42")
+
+    def test_missing_tesseract_binary(self):
+        error = pytesseract.TesseractNotFoundError()
+        with mock.patch("pytesseract.image_to_string", side_effect=error):
+            with self.assertRaises(UnsupportedDocument):
+                parse_document(self.path, "image/png")
+
+
+class QueueTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        # Uploads are queued for parsing as they are saved
+        self.first = self.upload(b"%PDF-1.4 first")
+        self.second = self.upload(b"%PDF-1.4 second")
+        ParseJob.objects.filter(file=self.second).update(
+            queued_at=timezone.now() + timedelta(seconds=1)
+        )
+
+    def test_claim_oldest_first(self):
+        first = queue.claim_next()
+        second = queue.claim_next()
+        self.assertEqual((first.file, second.file), (self.first, self.second))
+        self.assertEqual(first.status, ParseJob.Status.RUNNING)
+        self.assertEqual(first.attempts, 1)
+        self.assertIsNone(queue.claim_next())
+
+    def test_enqueue_keeps_one_waiting_job(self):
+        self.assertEqual(queue.enqueue(self.first), self.first.parse_jobs.get())
+
+    def test_complete(self):
+        job = queue.claim_next()
+        self.assertTrue(queue.complete(job, parse_output()))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ParseJob.Status.DONE)
+        self.assertEqual(self.first.parse_result.data, parse_output())
+        self.assertTrue(
+            ParseCacheEntry.objects.filter(sha256=self.first.sha256).exists()
+        )
+
+    @override_settings(PARSE_JOB_MAX_ATTEMPTS=2)
+    def test_fail_retries_until_out_of_attempts(self):
+        job = queue.claim_next()
+        self.assertTrue(queue.fail(job, "Broken"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (ParseJob.Status.QUEUED, "Broken"))
+
+        job = queue.claim_next()
+        self.assertEqual(job.attempts, 2)
+        queue.fail(job, "Still broken")
+        job.refresh_from_db()
+        self.assertEqual(job.status, ParseJob.Status.FAILED)
+
+    def test_fail_without_retry(self):
+        job = queue.claim_next()
+        queue.fail(job, "Not an invoice", retry=False)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ParseJob.Status.FAILED)
+
+    def test_release(self):
+        job = queue.claim_next()
+        queue.release(job)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ParseJob.Status.QUEUED, 0))
+
+
+class ParseCacheTests(TestCase):
+    def entry_size(self, text):
+        return len(json.dumps(parse_output(text)))
+
+    def test_store_keeps_a_running_total(self):
+        cache.store("a" * 64, parse_output("first"))
+        cache.store("b" * 64, parse_output("second"))
+        cache.store("a" * 64, parse_output("first, parsed again"))
+        self.assertEqual(
+            cache.total_size(),
+            self.entry_size("second") + self.entry_size("first, parsed again"),
+        )
+        self.assertEqual(cache.total_size(), cache.recount_size())
+
+    def test_eviction_trims_below_the_bound(self):
+        size = self.entry_size("x")
+        with override_settings(PARSE_CACHE_MAX_SIZE=size * 10):
+            for n in range(11):
+                cache.store(f"{n:064}", parse_output("x"))
+        # Over the bound of ten, evicted down to nine entries at most
+        self.assertEqual(ParseCacheEntry.objects.count(), 9)
+        self.assertFalse(ParseCacheEntry.objects.filter(sha256=f"{0:064}").exists())
+        self.assertEqual(cache.total_size(), size * 9)
+        self.assertEqual(cache.stats()["evictions"], 2)
+
+    def test_eviction_corrects_drift(self):
+        cache.store("a" * 64, parse_output())
+        ParseCacheEntry.objects.all().delete()
+        self.assertEqual(cache.evict(max_size=0), 0)
+        self.assertEqual(cache.total_size(), 0)
+
+
+class WorkerDeletedFileTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.file = self.upload()
+        queue.enqueue(self.file)
+        self.job = queue.claim_next()
+        self.worker = ParseWorker(concurrency=1, timeout=60)
+
+    def collect(self, result):
+        self.worker.in_flight[self.job.pk] = (self.job, result, time.monotonic())
+        self.worker.collect()
+
+    def test_output_of_deleted_file_is_dropped(self):
+        self.file.delete()
+        self.collect(FinishedResult(parse_output()))
+        self.assertEqual(self.worker.in_flight, {})
+        self.assertFalse(ParseJob.objects.exists())
+        self.assertFalse(ParseResult.objects.exists())
+
+    def test_failure_of_deleted_file_is_dropped(self):
+        self.file.delete()
+        self.collect(FinishedResult(error=UnsupportedDocument("Not an invoice")))
+        with self.assertLogs("parsing.worker", "ERROR"):
+            self.collect(FinishedResult(error=ValueError("Broken")))
+        self.assertEqual(self.worker.in_flight, {})
+        self.assertFalse(ParseJob.objects.exists())
+
+    def test_queue_reports_deleted_jobs(self):
+        self.file.delete()
+        self.assertFalse(queue.complete(self.job, parse_output()))
+        self.assertFalse(queue.fail(self.job, "Broken"))
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import FileParseView, ParseCacheStatsView
+
+urlpatterns = [
+    path("files/<uuid:file_pk>/parse/", FileParseView.as_view(), name="file-parse"),
+    path("parse-cache/", ParseCacheStatsView.as_view(), name="parse-cache"),
+]
@@ -0,0 +1,54 @@
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema
+from files.models import File
+from . import cache
+from .models import ParseResult
+from .queue import enqueue
+from .serializers import FileParseSerializer, ParseCacheStatsSerializer
+
+
+class FileParseView(APIView):
+    """
+    API endpoint for the parse job and parse result of a file
+    """
+
+    serializer_class = FileParseSerializer
+
+    def get_state(self, file):
+        return {
+            "job": file.parse_jobs.order_by("-queued_at").first(),
+            "result": ParseResult.objects.filter(file=file).first(),
+        }
+
+    @extend_schema(description="Get the latest parse job and parse result of a file")
+    def get(self, request, file_pk):
+        file = get_object_or_404(File, pk=file_pk)
+        return Response(self.serializer_class(self.get_state(file)).data)
+
+    @extend_schema(
+        description="Queue the file to be parsed again",
+        request=None,
+        responses={202: FileParseSerializer},
+    )
+    def post(self, request, file_pk):
+        file = get_object_or_404(File, pk=file_pk)
+        enqueue(file)
+        return Response(
+            self.serializer_class(self.get_state(file)).data,
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class ParseCacheStatsView(APIView):
+    """
+    API endpoint for parse cache hit/miss counters and usage
+    """
+
+    serializer_class = ParseCacheStatsSerializer
+
+    @extend_schema(description="Get parse cache hit/miss counters and usage")
+    def get(self, request):
+        return Response(self.serializer_class(cache.stats()).data)
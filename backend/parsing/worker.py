@@ -0,0 +1,150 @@
+"""
+Process-pool engine that runs parse jobs
+
+The dispatcher runs in the main process and is the only one that talks to the
+database. It keeps up to `concurrency` jobs in flight on a multiprocessing pool,
+so CPU-bound extraction runs on all cores while the API processes stay free.
+A job that exceeds the timeout fails its attempt and the pool is replaced, as a
+running task cannot be cancelled otherwise.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+
+from django.db import close_old_connections, connections
+
+from . import cache, queue
+from .extract import UnsupportedDocument, parse_document
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker_process(niceness):
+    """
+    Lower the priority of pool processes so request handling wins on a busy host
+    """
+    if niceness:
+        os.nice(niceness)
+
+
+class ParseWorker:
+    """
+    Claims queued parse jobs and runs them on a pool of worker processes
+    """
+
+    def __init__(self, concurrency, timeout, poll_interval=0.5, niceness=0):
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.niceness = niceness
+        self.pool = None
+        self.in_flight = {}  # job id -> (job, async result, started monotonic)
+
+    def start_pool(self):
+        # Forked processes must not inherit open database connections
+        connections.close_all()
+        self.pool = multiprocessing.Pool(
+            self.concurrency,
+            initializer=_init_worker_process,
+            initargs=(self.niceness,),
+        )
+
+    def stop_pool(self, terminate=False):
+        if self.pool is None:
+            return
+        if terminate:
+            self.pool.terminate()
+        else:
+            self.pool.close()
+        self.pool.join()
+        self.pool = None
+
+    def fill(self):
+        """
+        Claim jobs until every pool slot is busy
+        Returns the number of jobs submitted
+        """
+        submitted = 0
+        while len(self.in_flight) < self.concurrency:
+            job = queue.claim_next()
+            if job is None:
+                break
+            if not job.file.file:
+                queue.fail(job, "File has no stored content", retry=False)
+                continue
+            cached = cache.lookup(job.file.sha256)
+            if cached is not None:
+                queue.complete(job, cached, cached=True)
+                continue
+            result = self.pool.apply_async(
+                parse_document, (job.file.file.path, job.file.mime_type)
+            )
+            self.in_flight[job.pk] = (job, result, time.monotonic())
+            submitted += 1
+        return submitted
+
+    def finish(self, job, result):
+        """
+        Record the outcome of a finished job
+        Jobs deleted along with their file while running are dropped.
+        """
+        try:
+            recorded = queue.complete(job, result.get())
+        except UnsupportedDocument as e:
+            recorded = queue.fail(job, str(e), retry=False)
+        except Exception as e:
+            logger.exception("Parse job %s failed", job.pk)
+            recorded = queue.fail(job, f"{type(e).__name__}: {e}")
+        if not recorded:
+            logger.info("Parse job %s was deleted with its file, dropped", job.pk)
+
+    def collect(self):
+        """
+        Record the outcome of finished jobs and fail the ones that timed out
+        """
+        timed_out = []
+        for job_id, (job, result, started) in list(self.in_flight.items()):
+            if result.ready():
+                del self.in_flight[job_id]
+                self.finish(job, result)
+            elif time.monotonic() - started > self.timeout:
+                timed_out.append(job_id)
+
+        if timed_out:
+            for job_id in timed_out:
+                job, _, _ = self.in_flight.pop(job_id)
+                queue.fail(job, f"Timed out after {self.timeout} seconds")
+            # Replacing the pool kills the stuck processes; jobs that were
+            # running alongside them go back to the queue untouched
+            for job, _, _ in self.in_flight.values():
+                queue.release(job)
+            self.in_flight.clear()
+            self.stop_pool(terminate=True)
+            self.start_pool()
+
+    def run(self, once=False):
+        """
+        Process jobs until interrupted, or until the queue is drained if `once`
+        """
+        queue.requeue_stale()
+        self.start_pool()
+        last_stale_check = time.monotonic()
+        try:
+            while True:
+                close_old_connections()
+                self.collect()
+                submitted = self.fill()
+                if once and not self.in_flight:
+                    break
+                if time.monotonic() - last_stale_check > self.timeout:
+                    queue.requeue_stale()
+                    last_stale_check = time.monotonic()
+                if not submitted:
+                    time.sleep(self.poll_interval)
+        finally:
+            for job, _, _ in self.in_flight.values():
+                queue.release(job)
+            self.in_flight.clear()
+            self.stop_pool(terminate=True)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class PreviewsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "previews"
+    verbose_name = "Previews"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,109 @@
+"""
+Size-bounded disk cache of rendered previews
+
+Entries are files named by a hash of the content's SHA-256, the page, the
+width and the renderer version, fanned out into subdirectories like uploads.
+Content never changes for a hash, so entries are never invalidated, only
+evicted. The modification time of an entry records when it was last used, and
+eviction deletes the least recently used entries once the cache outgrows its
+bound. Writes go to a temporary file renamed into place, so concurrent readers
+and renderers never see a partial entry.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+
+from .render import RENDERER_VERSION
+
+# Refresh an entry's modification time on a hit at most this often, seconds
+TOUCH_INTERVAL = 3600
+# Eviction trims the cache to this fraction of its bound
+LOW_WATER_MARK = 0.9
+
+
+def cache_key(sha256, page, width):
+    return hashlib.sha256(
+        f"{sha256}:{page}:{width}:{RENDERER_VERSION}".encode()
+    ).hexdigest()
+
+
+class PreviewCache:
+    """
+    Rendered previews below `directory`, at most about `max_size` bytes
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:4], f"{key}.webp")
+
+    def exists(self, key):
+        return os.path.exists(self.path(key))
+
+    def read(self, key):
+        """
+        Content of a cached entry, or None
+        """
+        try:
+            with open(self.path(key), "rb") as entry:
+                data = entry.read()
+                now = time.time()
+                if now - os.fstat(entry.fileno()).st_mtime > TOUCH_INTERVAL:
+                    os.utime(entry.fileno(), (now, now))
+        except FileNotFoundError:
+            return None
+        return data
+
+    def store(self, key, data):
+        path = self.path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(descriptor, "wb") as out:
+                out.write(data)
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return path
+
+    def entries(self):
+        """
+        (modification time, size, path) of every entry
+        """
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def evict(self):
+        """
+        Delete least recently used entries while the cache is over its bound
+        Returns (entries evicted, bytes freed)
+        """
+        entries = list(self.entries())
+        excess = sum(size for _, size, _ in entries) - self.max_size
+        if excess <= 0:
+            return 0, 0
+        excess += self.max_size * (1 - LOW_WATER_MARK)
+        evicted = freed = 0
+        for _, size, path in sorted(entries):
+            if freed >= excess:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            evicted += 1
+            freed += size
+        return evicted, freed
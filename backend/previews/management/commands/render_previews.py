@@ -0,0 +1,43 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from files.models import File
+from previews.pool import prerender
+
+
+class Command(BaseCommand):
+    help = "Render the missing thumbnails of stored PDFs and images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Rendering processes (default: one per CPU)",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        files = (
+            File.objects.filter(
+                Q(mime_type="application/pdf") | Q(mime_type__startswith="image/")
+            )
+            .only("id", "file", "sha256", "mime_type")
+            .iterator()
+        )
+
+        def progress(rendered, failed):
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"{rendered} rendered, {failed} failed")
+
+        rendered, failed = prerender(files, max(1, options["workers"]), progress)
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(
+            style(
+                f"Rendered {rendered} thumbnails, {failed} failed, "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,204 @@
+"""
+Background rendering of previews
+
+Each server process renders on a small pool of worker processes
+(`PREVIEW_WORKERS`, at lower priority), started on first use with the spawn
+method so they inherit no threads or database connections. Requests for a
+preview that is already being rendered wait for the same render. At most
+`PREVIEW_QUEUE_MAX` renders wait per process: beyond that, requests are told
+to retry later and thumbnails of new uploads are not pre-rendered; they are
+rendered when first asked for instead. After every tenth of the cache bound
+written, the pool also runs an eviction.
+
+Workers import only the rendering and cache modules, never Django models.
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .cache import PreviewCache, cache_key
+from .render import previewable, render
+
+logger = logging.getLogger(__name__)
+
+
+class Busy(Exception):
+    """
+    Raised when too many renders are waiting
+    """
+
+
+def _init_worker_process(niceness):
+    if niceness:
+        os.nice(niceness)
+
+
+def render_entry(cache, key, path, mime_type, page, width):
+    """
+    Render a preview into the cache, returning it
+    """
+    data = render(path, mime_type, page, width)
+    cache.store(key, data)
+    return data
+
+
+def evict_entries(cache):
+    return cache.evict()
+
+
+def executor(workers, niceness):
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker_process,
+        initargs=(niceness,),
+    )
+
+
+def content_key(file):
+    # Files stored before content addressing have no digest, but fixed content
+    return file.sha256 or str(file.pk)
+
+
+class PreviewPool:
+    """
+    Renders previews of stored files into a `PreviewCache`
+    """
+
+    def __init__(self, cache, workers, queue_max, niceness=0):
+        self.cache = cache
+        self.workers = workers
+        self.queue_max = queue_max
+        self.niceness = niceness
+        self.executor = None
+        self.pending = {}  # cache key -> future of the render
+        self.written = 0
+        self.lock = threading.Lock()
+
+    def submit(self, key, file, page, width):
+        """
+        Future of the render of a preview into the cache, shared with other
+        callers asking for the same one
+        """
+        with self.lock:
+            future = self.pending.get(key)
+            if future is not None:
+                return future
+            if len(self.pending) >= self.queue_max:
+                raise Busy(f"{len(self.pending)} previews are waiting to render")
+            args = (self.cache, key, file.file.path, file.mime_type, page, width)
+            try:
+                if self.executor is None:
+                    self.executor = executor(self.workers, self.niceness)
+                future = self.executor.submit(render_entry, *args)
+            except BrokenProcessPool:
+                # A worker died, for example killed while out of memory
+                self.executor = executor(self.workers, self.niceness)
+                future = self.executor.submit(render_entry, *args)
+            self.pending[key] = future
+        future.add_done_callback(functools.partial(self.finished, key))
+        return future
+
+    def finished(self, key, future):
+        with self.lock:
+            self.pending.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self.written += len(future.result())
+            if self.written < self.cache.max_size / 10:
+                return
+            self.written = 0
+            try:
+                self.executor.submit(evict_entries, self.cache)
+            except (BrokenProcessPool, RuntimeError):
+                pass
+
+    async def aget(self, file, page, width, timeout):
+        """
+        A preview of the file, from the cache or rendered now
+        Raises `Busy` or TimeoutError if it cannot be had in time, and the
+        exceptions of `render`.
+        """
+        key = cache_key(content_key(file), page, width)
+        data = self.cache.read(key)
+        if data is None:
+            future = asyncio.wrap_future(self.submit(key, file, page, width))
+            # On a timeout the render goes on and lands in the cache for a retry
+            data = await asyncio.wait_for(asyncio.shield(future), timeout)
+        return data
+
+    def prefetch(self, files, width):
+        """
+        Render missing thumbnails of the files in the background while the
+        pool has room, leaving the rest to be rendered on demand
+        """
+        for file in files:
+            if not (previewable(file.mime_type) and file.file):
+                continue
+            key = cache_key(content_key(file), 0, width)
+            if self.cache.exists(key):
+                continue
+            try:
+                self.submit(key, file, 0, width)
+            except Busy:
+                return
+
+
+@functools.cache
+def get_pool():
+    return PreviewPool(
+        PreviewCache(settings.PREVIEW_CACHE_DIR, settings.PREVIEW_CACHE_MAX_SIZE),
+        workers=settings.PREVIEW_WORKERS,
+        queue_max=settings.PREVIEW_QUEUE_MAX,
+        niceness=settings.PREVIEW_WORKER_NICENESS,
+    )
+
+
+def prerender(files, workers=1, progress=None):
+    """
+    Render the missing thumbnails of the files on a pool of `workers`
+    processes, for example after an ingest
+    Returns (thumbnails rendered, failures).
+    """
+    cache = get_pool().cache
+    width = settings.PREVIEW_THUMBNAIL_WIDTH
+    rendered = failed = 0
+    queued = set()
+
+    def collect(futures):
+        nonlocal rendered, failed
+        for future in futures:
+            error = future.exception()
+            if error is None:
+                rendered += 1
+            else:
+                failed += 1
+                logger.warning("Cannot render a thumbnail: %s", error)
+        if progress:
+            progress(rendered, failed)
+
+    with executor(workers, settings.PREVIEW_WORKER_NICENESS) as pool:
+        in_flight = set()
+        for file in files:
+            if not (previewable(file.mime_type) and file.file):
+                continue
+            key = cache_key(content_key(file), 0, width)
+            if key in queued or cache.exists(key):
+                continue
+            queued.add(key)
+            if len(in_flight) >= workers * 2:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            args = (cache, key, file.file.path, file.mime_type, 0, width)
+            in_flight.add(pool.submit(render_entry, *args))
+        collect(wait(in_flight).done)
+        pool.submit(evict_entries, cache).result()
+    return rendered, failed
@@ -0,0 +1,97 @@
+"""
+Rendering of document pages as small WebP images
+
+PDFs are rasterized with PDFium at the target width, images are decoded at a
+reduced size where the format allows it and scaled down. Rendering is CPU
+bound and runs in the processes of `previews.pool`, so this module does not
+depend on Django.
+"""
+
+import io
+
+# Part of every cache key, bump it when the output of `render` changes
+RENDERER_VERSION = 1
+
+WEBP_QUALITY = 75
+
+
+class UnsupportedDocument(Exception):
+    """
+    Raised for documents no preview can be rendered of
+    """
+
+
+class PageOutOfRange(Exception):
+    """
+    Raised for pages the document does not have
+    """
+
+
+def previewable(mime_type):
+    return mime_type == "application/pdf" or bool(
+        mime_type and mime_type.startswith("image/")
+    )
+
+
+def render_pdf_page(path, page, width):
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        raise UnsupportedDocument("PDF previews require the pypdfium2 package")
+    try:
+        document = pdfium.PdfDocument(path)
+    except pdfium.PdfiumError as e:
+        raise UnsupportedDocument(f"Cannot open PDF: {e}")
+    try:
+        if page >= len(document):
+            raise PageOutOfRange(f"The document has {len(document)} pages")
+        pdf_page = document[page]
+        page_width = pdf_page.get_width()
+        if page_width <= 0:
+            raise UnsupportedDocument("The page has no width")
+        bitmap = pdf_page.render(scale=width / page_width)
+        return bitmap.to_pil()
+    except pdfium.PdfiumError as e:
+        raise UnsupportedDocument(f"Cannot render PDF page: {e}")
+    finally:
+        document.close()
+
+
+def render_image_frame(path, page, width):
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(path) as image:
+            pages = getattr(image, "n_frames", 1)
+            if page >= pages:
+                raise PageOutOfRange(f"The image has {pages} pages")
+            image.seek(page)
+            # JPEG decodes at 1/2 to 1/8 scale directly, much faster for photos
+            image.draft("RGB", (width, image.height * width // image.width))
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+            image.thumbnail((width, image.height))
+            return image
+    except FileNotFoundError:
+        raise
+    except (OSError, Image.DecompressionBombError) as e:
+        # Unidentified, truncated or corrupt images, and oversized ones
+        raise UnsupportedDocument(f"Cannot decode image: {e}")
+
+
+def render(path, mime_type, page, width):
+    """
+    WebP image of a page (counted from 0) of a document, `width` pixels wide
+    at most
+    Raises FileNotFoundError if the document is missing from storage.
+    """
+    if mime_type == "application/pdf":
+        image = render_pdf_page(path, page, width)
+    elif previewable(mime_type):
+        image = render_image_frame(path, page, width)
+    else:
+        raise UnsupportedDocument(f"No previews of {mime_type or 'unknown'} files")
+    output = io.BytesIO()
+    image.save(output, "WEBP", quality=WEBP_QUALITY, method=4)
+    return output.getvalue()
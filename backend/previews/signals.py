@@ -0,0 +1,31 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from files.models import File
+from files.signals import files_bulk_created
+
+from .pool import get_pool
+
+
+def prefetch(files):
+    if settings.PREVIEW_RENDER_ON_UPLOAD:
+        transaction.on_commit(
+            partial(get_pool().prefetch, files, settings.PREVIEW_THUMBNAIL_WIDTH)
+        )
+
+
+@receiver(post_save, sender=File)
+def prerender_thumbnail(sender, instance, created, raw=False, **kwargs):
+    """
+    Render the thumbnail of a new upload once it is committed
+    """
+    if created and not raw:
+        prefetch([instance])
+
+
+@receiver(files_bulk_created)
+def prerender_thumbnails(sender, files, **kwargs):
+    prefetch(files)
@@ -0,0 +1,121 @@
+import io
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.test import SimpleTestCase
+from PIL import Image
+
+from files.testing import MediaTestCase
+
+from .cache import PreviewCache
+from .pool import PreviewPool
+from .render import PageOutOfRange, UnsupportedDocument, render
+
+PDF = b"""%PDF-1.4
+1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj
+2 0 obj<</Type/Pages/Kids[3 0 R]/Count 1>>endobj
+3 0 obj<</Type/Page/Parent 2 0 R/MediaBox[0 0 612 792]>>endobj
+trailer<</Root 1 0 R>>
+%%EOF"""
+
+
+def jpeg(width=64, height=48):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), "white").save(output, "JPEG")
+    return output.getvalue()
+
+
+class RenderTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, "document")
+
+    def write(self, content):
+        with open(self.path, "wb") as out:
+            out.write(content)
+
+    def test_image(self):
+        self.write(jpeg())
+        data = render(self.path, "image/jpeg", 0, 32)
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (32, 24)))
+
+    def test_page_out_of_range(self):
+        self.write(jpeg())
+        with self.assertRaises(PageOutOfRange):
+            render(self.path, "image/jpeg", 1, 32)
+
+    def test_truncated_image(self):
+        self.write(jpeg()[:200])
+        with self.assertRaises(UnsupportedDocument):
+            render(self.path, "image/jpeg", 0, 32)
+
+    def test_unidentified_image(self):
+        self.write(b"not an image")
+        with self.assertRaises(UnsupportedDocument):
+            render(self.path, "image/png", 0, 32)
+
+    def test_decompression_bomb(self):
+        self.write(jpeg())
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 100):
+            with self.assertRaises(UnsupportedDocument):
+                render(self.path, "image/jpeg", 0, 32)
+
+    def test_pdf(self):
+        self.write(PDF)
+        data = render(self.path, "application/pdf", 0, 306)
+        with Image.open(io.BytesIO(data)) as image:
+            self.assertEqual(image.size, (306, 396))
+
+    def test_pdf_page_without_width(self):
+        self.write(PDF)
+        with mock.patch("pypdfium2.PdfPage.get_width", return_value=0):
+            with self.assertRaises(UnsupportedDocument):
+                render(self.path, "application/pdf", 0, 32)
+
+    def test_corrupt_pdf(self):
+        self.write(b"%PDF-1.4 broken")
+        with self.assertRaises(UnsupportedDocument):
+            render(self.path, "application/pdf", 0, 32)
+
+    def test_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            render(self.path, "image/jpeg", 0, 32)
+        with self.assertRaises(FileNotFoundError):
+            render(self.path, "application/pdf", 0, 32)
+
+
+class PreviewViewTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        # Render on a thread, spawning processes is slow for a handful of tests
+        cache = PreviewCache(os.path.join(self.media_root, "previews"), 10**7)
+        pool = PreviewPool(cache, 1, 8)
+        pool.executor = ThreadPoolExecutor(1)
+        self.addCleanup(pool.executor.shutdown)
+        patcher = mock.patch("previews.views.get_pool", return_value=pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def thumbnail(self, content):
+        file = self.upload(content, name="scan.jpg")
+        return file, f"/api/v1/files/{file.pk}/thumbnail/"
+
+    def test_thumbnail(self):
+        _, url = self.thumbnail(jpeg())
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+
+    def test_truncated_image(self):
+        _, url = self.thumbnail(jpeg()[:200])
+        self.assertEqual(self.client.get(url).status_code, 422)
+
+    def test_missing_stored_file(self):
+        file, url = self.thumbnail(jpeg())
+        os.remove(file.file.path)
+        self.assertEqual(self.client.get(url).status_code, 404)
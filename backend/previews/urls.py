@@ -0,0 +1,11 @@
+from django.urls import path
+from .views import page_preview_view, thumbnail_view
+
+urlpatterns = [
+    path("files/<uuid:pk>/thumbnail/", thumbnail_view, name="file-thumbnail"),
+    path(
+        "files/<uuid:pk>/preview/<int:page>/",
+        page_preview_view,
+        name="file-preview",
+    ),
+]
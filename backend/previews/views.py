@@ -0,0 +1,81 @@
+"""
+Thumbnails and page previews of files
+
+Both are async views: a cached preview is answered on the event loop with one
+indexed query and one small file read, and a missing one is awaited while the
+render pool works on it. A preview of a given file never changes, as file
+content is immutable, so responses may be cached by browsers and proxies for
+a year. Their ETag is the cache key, so revalidation needs no disk access.
+"""
+
+import asyncio
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from files.models import File
+from files.views import json_response
+
+from .cache import cache_key
+from .pool import Busy, content_key, get_pool
+from .render import PageOutOfRange, UnsupportedDocument, previewable
+
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+CONTENT_TYPE = "image/webp"
+
+
+def retry_later(detail):
+    response = json_response({"detail": detail}, status=503)
+    response["Retry-After"] = "1"
+    return response
+
+
+async def preview_response(request, pk, page, width):
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    files = File.objects.filter(pk=pk).only("id", "file", "sha256", "mime_type")
+    file = await files.afirst()
+    if file is None:
+        return json_response({"detail": "Not found."}, status=404)
+    if not (previewable(file.mime_type) and file.file):
+        return json_response({"detail": "No preview for this type of file"}, status=404)
+
+    etag = quote_etag(cache_key(content_key(file), page, width))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            data = await get_pool().aget(
+                file, page, width, settings.PREVIEW_RENDER_TIMEOUT
+            )
+        except Busy:
+            return retry_later("Too many previews are rendering, retry shortly")
+        except asyncio.TimeoutError:
+            return retry_later("The preview is still rendering, retry shortly")
+        except FileNotFoundError:
+            return json_response({"detail": "The stored file is missing"}, status=404)
+        except PageOutOfRange as e:
+            return json_response({"detail": str(e)}, status=404)
+        except UnsupportedDocument as e:
+            return json_response({"detail": str(e)}, status=422)
+        response = HttpResponse(data, content_type=CONTENT_TYPE)
+    response["ETag"] = etag
+    response["Cache-Control"] = CACHE_CONTROL
+    return response
+
+
+async def thumbnail_view(request, pk):
+    """
+    Image of the first page, `PREVIEW_THUMBNAIL_WIDTH` pixels wide at most
+    """
+    return await preview_response(request, pk, 0, settings.PREVIEW_THUMBNAIL_WIDTH)
+
+
+async def page_preview_view(request, pk, page):
+    """
+    Image of a page counted from 1, `PREVIEW_PAGE_WIDTH` pixels wide at most
+    """
+    if page < 1:
+        return json_response({"detail": "Pages are counted from 1"}, status=404)
+    return await preview_response(request, pk, page - 1, settings.PREVIEW_PAGE_WIDTH)
@@ -0,0 +1,290 @@
+"""
+Full-text search over file names and extracted invoice text
+
+Documents live in the `SearchDocument` table and are indexed by the database
+itself: SQLite through an FTS5 table, PostgreSQL through a tsvector column (see
+the migrations). Queries are ranked by the index (bm25 on SQLite, ts_rank_cd on
+PostgreSQL) and only the requested page of hits is highlighted, so the cost of
+a search depends on the number of matches rather than on the number of files.
+Ranking still scores every match, so queries matching more than
+`SEARCH_MAX_RANKED_MATCHES` files list the newest matches first instead.
+"""
+
+import html
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import SearchDocument
+
+# Longest stretch of extracted text indexed per file, in characters; the
+# PostgreSQL tsvector type is limited to 1MB
+MAX_CONTENT_LENGTH = 200_000
+# Most terms taken from a query, longer queries are truncated
+MAX_QUERY_TERMS = 16
+# Words of context shown around matches in content snippets
+SNIPPET_TOKENS = 12
+
+# Control characters mark highlights until the text has been HTML escaped
+START, STOP = "\x02", "\x03"
+TERM_RE = re.compile(r"[^\W_]+")
+
+FTS_TABLE = "search_searchdocument_fts"
+DOCUMENT_TABLE = SearchDocument._meta.db_table
+
+
+def document_name(file):
+    """
+    Indexed name of a file: its original name and any name given by the user
+    """
+    names = [file.original_file_name]
+    if file.user_defined_file_name and file.user_defined_file_name not in names:
+        names.append(file.user_defined_file_name)
+    return " ".join(names)
+
+
+def document_content(data):
+    """
+    Indexed text of a parse result
+    """
+    text = "\n".join(page["text"] for page in data.get("pages", []))
+    return text[:MAX_CONTENT_LENGTH]
+
+
+def index_name(file, created=False):
+    """
+    Add a file to the index, or update its name when it was renamed
+    """
+    name = document_name(file)
+    if created:
+        SearchDocument.objects.create(file_id=file.pk, name=name)
+        return
+    updated = (
+        SearchDocument.objects.filter(file_id=file.pk)
+        .exclude(name=name)
+        .update(name=name, updated_at=timezone.now())
+    )
+    if not updated and not SearchDocument.objects.filter(file_id=file.pk).exists():
+        SearchDocument.objects.create(file_id=file.pk, name=name)
+
+
+def index_names(files):
+    """
+    Add or update the indexed names of a batch of files in one query
+    """
+    SearchDocument.objects.bulk_create(
+        [SearchDocument(file_id=file.pk, name=document_name(file)) for file in files],
+        update_conflicts=True,
+        unique_fields=["file"],
+        update_fields=["name", "updated_at"],
+    )
+
+
+def index_content(file_id, data):
+    """
+    Replace the indexed text of a file with the text of its latest parse
+    """
+    SearchDocument.objects.filter(file_id=file_id).update(
+        content=document_content(data), updated_at=timezone.now()
+    )
+
+
+def query_terms(q):
+    """
+    Lowercased words of a user query, stripped of any query syntax
+    """
+    return [term.lower() for term in TERM_RE.findall(q)][:MAX_QUERY_TERMS]
+
+
+def fts5_query(terms):
+    """
+    FTS5 MATCH expression requiring every term, the last one as a prefix so
+    results follow along while a word is being typed
+    """
+    return " ".join([f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*'])
+
+
+def tsquery(terms):
+    """
+    to_tsquery expression requiring every term, the last one as a prefix
+    """
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+
+def highlight(text):
+    """
+    HTML escape a highlighted snippet and wrap its matches in <mark> tags
+    """
+    if text is None:
+        return None
+    return html.escape(text).replace(START, "<mark>").replace(STOP, "</mark>")
+
+
+def _sqlite_search(terms, limit, offset):
+    match = fts5_query(terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT count(*) FROM (SELECT rowid FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s LIMIT %s)",
+            [match, settings.SEARCH_MAX_RANKED_MATCHES + 1],
+        )
+        ranked = cursor.fetchone()[0] <= settings.SEARCH_MAX_RANKED_MATCHES
+        # FTS5 returns matches in rowid order without sorting, and only scores
+        # the rows that are returned
+        order = "fts.rank, fts.rowid" if ranked else "fts.rowid DESC"
+        cursor.execute(
+            f"""
+            SELECT d.file_id, -fts.rank,
+                   highlight({FTS_TABLE}, 0, %s, %s),
+                   snippet({FTS_TABLE}, 1, %s, %s, '…', %s)
+            FROM {FTS_TABLE} AS fts
+            JOIN {DOCUMENT_TABLE} AS d ON d.id = fts.rowid
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY {order}
+            LIMIT %s OFFSET %s
+            """,
+            [START, STOP, START, STOP, SNIPPET_TOKENS, match, limit, offset],
+        )
+        return cursor.fetchall(), ranked
+
+
+def _postgresql_search(terms, limit, offset):
+    query = tsquery(terms)
+    options = f"StartSel={START}, StopSel={STOP}, MaxWords={2 * SNIPPET_TOKENS}, "
+    options += f"MinWords={SNIPPET_TOKENS // 2}, MaxFragments=2, FragmentDelimiter=…"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT count(*) FROM (SELECT 1 FROM {DOCUMENT_TABLE} "
+            "WHERE vector @@ to_tsquery('simple', %s) LIMIT %s) AS matches",
+            [query, settings.SEARCH_MAX_RANKED_MATCHES + 1],
+        )
+        ranked = cursor.fetchone()[0] <= settings.SEARCH_MAX_RANKED_MATCHES
+        order = "rank DESC, d.id" if ranked else "d.id DESC"
+        cursor.execute(
+            f"""
+            SELECT hits.file_id, hits.rank,
+                   ts_headline('simple', hits.name, hits.query, %s),
+                   ts_headline('simple', hits.content, hits.query, %s)
+            FROM (
+                SELECT d.id, d.file_id, d.name, d.content, query,
+                       ts_rank_cd(d.vector, query) AS rank
+                FROM {DOCUMENT_TABLE} AS d, to_tsquery('simple', %s) AS query
+                WHERE d.vector @@ query
+                ORDER BY {order}
+                LIMIT %s OFFSET %s
+            ) AS hits
+            ORDER BY {order.replace("d.id", "hits.id")}
+            """,
+            [f"{options}, HighlightAll=true", options, query, limit, offset],
+        )
+        return cursor.fetchall(), ranked
+
+
+def _fallback_search(terms, limit, offset):
+    condition = Q()
+    for term in terms:
+        condition &= Q(name__icontains=term) | Q(content__icontains=term)
+    documents = SearchDocument.objects.filter(condition).order_by("-id")
+    rows = documents.values_list("file_id", "name")[offset : offset + limit]
+    return [(file_id, 0.0, name, None) for file_id, name in rows], False
+
+
+def search(q, limit, offset=0):
+    """
+    Best matching files for a query, as dicts with the file id, a relevance
+    score where higher is better, and HTML snippets of the name and content
+
+    Also returns whether the hits are ordered by relevance, which is not the
+    case for queries matching too many files to rank.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return [], True
+    run = {
+        "sqlite": _sqlite_search,
+        "postgresql": _postgresql_search,
+    }.get(connection.vendor, _fallback_search)
+    rows, ranked = run(terms, limit, offset)
+    hits = [
+        {
+            "file_id": file_id,
+            "rank": float(rank),
+            "name": highlight(name),
+            "snippet": highlight(snippet) if snippet and START in snippet else None,
+        }
+        for file_id, rank, name, snippet in rows
+    ]
+    return hits, ranked
+
+
+def filter_files(queryset, q):
+    """
+    Restrict a File queryset to the files matching a query
+    """
+    terms = query_terms(q)
+    if not terms:
+        return queryset.none()
+    if connection.vendor == "sqlite":
+        matches = RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [fts5_query(terms)],
+        )
+    elif connection.vendor == "postgresql":
+        matches = RawSQL(
+            f"SELECT id FROM {DOCUMENT_TABLE} "
+            "WHERE vector @@ to_tsquery('simple', %s)",
+            [tsquery(terms)],
+        )
+    else:
+        condition = Q()
+        for term in terms:
+            condition &= Q(name__icontains=term) | Q(content__icontains=term)
+        matches = SearchDocument.objects.filter(condition).values("id")
+    return queryset.filter(search_document__id__in=matches)
+
+
+def rebuild(batch_size=1000):
+    """
+    Index every file from scratch, e.g. after restoring a database
+    Returns the number of files indexed
+    """
+    from files.models import File
+
+    rows = File.objects.order_by().values_list(
+        "id", "original_file_name", "user_defined_file_name", "parse_result__data"
+    )
+    batch, total = [], 0
+    for file_id, original, user_defined, data in rows.iterator(chunk_size=batch_size):
+        file = File(original_file_name=original, user_defined_file_name=user_defined)
+        batch.append(
+            SearchDocument(
+                file_id=file_id,
+                name=document_name(file),
+                content=document_content(data) if data else "",
+            )
+        )
+        if len(batch) >= batch_size:
+            total += _upsert(batch)
+            batch = []
+    if batch:
+        total += _upsert(batch)
+
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            # Merge the index segments written by the triggers into one b-tree
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def _upsert(documents):
+    SearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["file"],
+        update_fields=["name", "content", "updated_at"],
+    )
+    return len(documents)
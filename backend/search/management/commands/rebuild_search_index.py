@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from search.engine import rebuild
+
+
+class Command(BaseCommand):
+    help = "Index the names and extracted text of every file from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Files written per statement (default: 1000)",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} files"))
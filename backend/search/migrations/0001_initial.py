@@ -0,0 +1,46 @@
+# Generated by Django 4.2.10 on 2026-10-17 07:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("files", "0005_file_keyset_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchDocument",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        primary_key=True, serialize=False, verbose_name="Document ID"
+                    ),
+                ),
+                ("name", models.TextField(blank=True, verbose_name="Name")),
+                ("content", models.TextField(blank=True, verbose_name="Content")),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated At"),
+                ),
+                (
+                    "file",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_document",
+                        to="files.file",
+                        verbose_name="File",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Search Document",
+                "verbose_name_plural": "Search Documents",
+            },
+        ),
+    ]
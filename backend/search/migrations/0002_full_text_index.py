@@ -0,0 +1,129 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    # External content table: the text is stored once, in search_searchdocument
+    """
+    CREATE VIRTUAL TABLE search_searchdocument_fts USING fts5(
+        name, content,
+        content='search_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    # Name matches weigh ten times as much as content matches
+    """
+    INSERT INTO search_searchdocument_fts(search_searchdocument_fts, rank)
+    VALUES ('rank', 'bm25(10.0, 1.0)')
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_ai AFTER INSERT ON search_searchdocument
+    BEGIN
+        INSERT INTO search_searchdocument_fts(rowid, name, content)
+        VALUES (new.id, new.name, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_ad AFTER DELETE ON search_searchdocument
+    BEGIN
+        INSERT INTO search_searchdocument_fts(
+            search_searchdocument_fts, rowid, name, content
+        ) VALUES ('delete', old.id, old.name, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER search_searchdocument_au
+    AFTER UPDATE OF name, content ON search_searchdocument
+    BEGIN
+        INSERT INTO search_searchdocument_fts(
+            search_searchdocument_fts, rowid, name, content
+        ) VALUES ('delete', old.id, old.name, old.content);
+        INSERT INTO search_searchdocument_fts(rowid, name, content)
+        VALUES (new.id, new.name, new.content);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS search_searchdocument_au",
+    "DROP TRIGGER IF EXISTS search_searchdocument_ad",
+    "DROP TRIGGER IF EXISTS search_searchdocument_ai",
+    "DROP TABLE IF EXISTS search_searchdocument_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    # Punctuation in file names is turned into spaces so "invoice_2024.pdf"
+    # is indexed as separate words rather than as one file name token
+    """
+    ALTER TABLE search_searchdocument ADD COLUMN vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(
+            to_tsvector(
+                'simple', regexp_replace(name, '[^[:alnum:]]+', ' ', 'g')
+            ),
+            'A'
+        )
+        || setweight(to_tsvector('simple', content), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX search_searchdocument_vector_idx
+    ON search_searchdocument USING GIN (vector)
+    """,
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP INDEX IF EXISTS search_searchdocument_vector_idx",
+    "ALTER TABLE search_searchdocument DROP COLUMN IF EXISTS vector",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+def index_existing_files(apps, schema_editor):
+    """
+    Index the files uploaded before search existed
+    """
+    File = apps.get_model("files", "File")
+    SearchDocument = apps.get_model("search", "SearchDocument")
+    rows = File.objects.values_list(
+        "id", "original_file_name", "user_defined_file_name", "parse_result__data"
+    )
+    batch = []
+    for file_id, original, user_defined, data in rows.iterator(chunk_size=1000):
+        names = [original]
+        if user_defined and user_defined != original:
+            names.append(user_defined)
+        pages = (data or {}).get("pages", [])
+        content = "\n".join(page["text"] for page in pages)[:200_000]
+        batch.append(
+            SearchDocument(file_id=file_id, name=" ".join(names), content=content)
+        )
+        if len(batch) >= 1000:
+            SearchDocument.objects.bulk_create(batch)
+            batch = []
+    SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0001_initial"),
+        ("parsing", "0002_parse_cache"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(
+                {"sqlite": SQLITE_FORWARD, "postgresql": POSTGRESQL_FORWARD}
+            ),
+            run_for_vendor(
+                {"sqlite": SQLITE_REVERSE, "postgresql": POSTGRESQL_REVERSE}
+            ),
+        ),
+        migrations.RunPython(index_existing_files, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+from files.models import File
+
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of a file, mirrored into the database's full-text index
+
+    The full-text index itself is created by the migrations for the database in
+    use: an FTS5 table kept in sync by triggers on SQLite, a generated tsvector
+    column with a GIN index on PostgreSQL. The integer primary key is the FTS5
+    rowid, which has to stay stable across VACUUM.
+    """
+
+    id = models.BigAutoField(primary_key=True, verbose_name=_("Document ID"))
+    file = models.OneToOneField(
+        File,
+        on_delete=models.CASCADE,
+        related_name="search_document",
+        verbose_name=_("File"),
+    )
+    name = models.TextField(blank=True, verbose_name=_("Name"))
+    content = models.TextField(blank=True, verbose_name=_("Content"))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Updated At"))
+
+    class Meta:
+        verbose_name = _("Search Document")
+        verbose_name_plural = _("Search Documents")
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,28 @@
+from files.serializers import FileSerializer
+from rest_framework import serializers
+
+
+class SearchHitSerializer(serializers.Serializer):
+    """
+    Relevance and highlighted snippets of a search hit
+    """
+
+    rank = serializers.FloatField(help_text="Relevance score, higher is better")
+    name = serializers.CharField(
+        help_text="File name with matches wrapped in <mark> tags"
+    )
+    snippet = serializers.CharField(
+        allow_null=True,
+        help_text="Extract of the invoice text around the matches, if any",
+    )
+
+
+class FileSearchResultSerializer(FileSerializer):
+    """
+    File matching a search query, with its relevance and snippets
+    """
+
+    search = SearchHitSerializer(source="search_hit", read_only=True)
+
+    class Meta(FileSerializer.Meta):
+        fields = FileSerializer.Meta.fields + ["search"]
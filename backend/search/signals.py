@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from files.models import File
+from files.signals import files_bulk_created, files_bulk_updated
+from parsing.models import ParseResult
+
+from .engine import index_content, index_name, index_names
+
+
+@receiver(post_save, sender=File)
+def index_file_name(sender, instance, created, raw=False, **kwargs):
+    """
+    Index the names of new and renamed files
+    Deleted files drop out of the index with their search document
+    """
+    if not raw:
+        index_name(instance, created)
+
+
+@receiver(files_bulk_created)
+@receiver(files_bulk_updated)
+def index_file_names(sender, files, **kwargs):
+    """
+    Index the names of files created or renamed in bulk
+    """
+    index_names(files)
+
+
+@receiver(post_save, sender=ParseResult)
+def index_parsed_text(sender, instance, raw=False, **kwargs):
+    """
+    Index the extracted text of a file whenever it is parsed
+    """
+    if not raw:
+        index_content(instance.file_id, instance.data)
@@ -0,0 +1,90 @@
+from django.test import override_settings
+
+from files.testing import MediaTestCase
+from parsing.models import ParseResult
+
+
+class SearchTests(MediaTestCase):
+    def add(self, name, text=None):
+        file = self.upload(f"%PDF-1.4 {name}".encode(), name=name)
+        if text is not None:
+            ParseResult.objects.create(
+                file=file, parser_version="1", data={"pages": [{"text": text}]}
+            )
+        return file
+
+    def search(self, q, **params):
+        response = self.client.get("/api/v1/files/", {"q": q, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_name_matches_rank_above_text_matches(self):
+        in_text = self.add("scan.pdf", "Invoice from Acme Corp, due in March")
+        in_name = self.add("acme-march.pdf")
+        self.add("other.pdf", "Invoice from Globex")
+
+        results = self.search("acme")["results"]
+        self.assertEqual(
+            [hit["id"] for hit in results], [str(in_name.pk), str(in_text.pk)]
+        )
+        self.assertGreater(results[0]["search"]["rank"], results[1]["search"]["rank"])
+
+    def test_snippets(self):
+        self.add("scan.pdf", "Total <b>42</b> for consulting by Acme Corp")
+
+        hit = self.search("consult")["results"][0]["search"]
+        self.assertEqual(hit["name"], "scan.pdf")
+        self.assertIn(
+            "&lt;b&gt;42&lt;/b&gt; for <mark>consulting</mark>", hit["snippet"]
+        )
+
+    def test_every_term_is_required(self):
+        both = self.add("acme-march.pdf")
+        self.add("acme-april.pdf")
+
+        results = self.search("march acme")["results"]
+        self.assertEqual([hit["id"] for hit in results], [str(both.pk)])
+        self.assertEqual(
+            results[0]["search"]["name"], "<mark>acme</mark>-<mark>march</mark>.pdf"
+        )
+
+    def test_renamed_and_parsed_files_are_reindexed(self):
+        file = self.add("scan.pdf")
+        self.assertEqual(self.search("globex")["results"], [])
+
+        file.user_defined_file_name = "Globex March"
+        file.save()
+        self.assertEqual(len(self.search("globex")["results"]), 1)
+
+        ParseResult.objects.create(
+            file=file, parser_version="1", data={"pages": [{"text": "Initech"}]}
+        )
+        self.assertEqual(len(self.search("initech")["results"]), 1)
+
+    def test_offset_paging(self):
+        for n in range(3):
+            self.add(f"acme-{n}.pdf")
+
+        first = self.search("acme", page_size=2)
+        self.assertEqual(len(first["results"]), 2)
+        self.assertIsNone(first["previous"])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual(len(second["results"]), 1)
+        self.assertIsNone(second["next"])
+        ids = {hit["id"] for hit in first["results"] + second["results"]}
+        self.assertEqual(len(ids), 3)
+
+    @override_settings(SEARCH_MAX_RANKED_MATCHES=1)
+    def test_too_many_matches_are_listed_newest_first(self):
+        files = [self.add(f"acme-{n}.pdf") for n in range(3)]
+
+        body = self.search("acme")
+        self.assertFalse(body["ranked"])
+        self.assertEqual(
+            [hit["id"] for hit in body["results"]],
+            [str(file.pk) for file in reversed(files)],
+        )
+
+    def test_query_without_terms(self):
+        self.add("acme.pdf")
+        self.assertEqual(self.search("*:()")["results"], [])
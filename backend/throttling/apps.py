@@ -0,0 +1,7 @@
+from django.apps import AppConfig
+
+
+class ThrottlingConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "throttling"
+    verbose_name = "Throttling"
@@ -0,0 +1,69 @@
+"""
+Admission of API requests before Django receives their body
+
+Django's ASGI handler reads the whole request body, spooling large bodies to a
+temporary file, before any middleware runs, so `AdmissionMiddleware` alone
+would refuse an upload only once it has been transferred. `AdmissionApplication`
+wraps Django's application and admits API requests from their headers, with the
+size taken from Content-Length: a refused request is answered without reading
+its body, and an admitted upload holds its slot until its response is sent.
+"""
+
+import io
+import time
+
+from asgiref.sync import sync_to_async
+from corsheaders.middleware import CorsMiddleware
+from django.core.handlers.asgi import ASGIRequest
+
+from config.metrics import RequestStats, record_request
+
+from .limits import release_upload_slot
+from .middleware import ADMITTED, acquire_slot, admit, needs_admission
+
+
+class AdmissionApplication:
+    """
+    ASGI application admitting API requests before passing them on
+    """
+
+    def __init__(self, application):
+        self.application = application
+        # Refusals carry the CORS headers the middleware would have added
+        self.cors = CorsMiddleware(application)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.application(scope, receive, send)
+        # Reads the headers only, the body is left with the server
+        request = ASGIRequest(scope, io.BytesIO())
+        if not needs_admission(request):
+            return await self.application(scope, receive, send)
+        started = time.perf_counter()
+        holder, rejected = None, admit(request)
+        if not rejected:
+            holder, rejected = await sync_to_async(acquire_slot)(request)
+        if rejected:
+            self.cors.add_response_headers(request, rejected)
+            duration = time.perf_counter() - started
+            record_request(request, rejected, RequestStats(), duration)
+            return await self.send_response(rejected, send)
+        try:
+            await self.application({**scope, ADMITTED: True}, receive, send)
+        finally:
+            if holder:
+                await sync_to_async(release_upload_slot)(holder)
+
+    async def send_response(self, response, send):
+        headers = [
+            (name.encode("latin1"), value.encode("latin1"))
+            for name, value in response.items()
+        ]
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": headers,
+            }
+        )
+        await send({"type": "http.response.body", "body": response.content})
@@ -0,0 +1,123 @@
+"""
+Per-client token buckets and a global cap on uploads in flight
+
+A bucket of `burst` tokens refills at `rate` tokens per second. Instead of a
+token count and a refill time, each bucket stores the single time at which it
+will be full again (the generic cell rate algorithm): taking `cost` tokens
+moves that time `cost / rate` seconds later, and is allowed while it stays
+within `burst / rate` seconds of now. A refused request takes nothing.
+
+Buckets live in the memory of each server process, so admitting a request is a
+dictionary lookup under a lock instead of a database write. The price is that
+limits hold per process: a client whose requests are spread over N workers can
+reach up to N times the configured rates. A full bucket is the same as no
+bucket, so full buckets are dropped every `SWEEP_INTERVAL` seconds.
+
+Uploads in flight are capped by a fixed number of `UploadSlot` rows. A slot is
+claimed by locking a free row, skipping rows other processes are claiming, and
+updating it, so concurrent claimers never pick the same row. Slots are leased,
+so a worker that dies with a slot does not leak it for longer than
+`UPLOAD_SLOT_LEASE` seconds.
+"""
+
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UploadSlot
+
+# Seconds between sweeps of full buckets
+SWEEP_INTERVAL = 60
+
+
+class TokenBuckets:
+    """
+    Token buckets of this process, by key
+    """
+
+    def __init__(self):
+        self.full_at = {}
+        self.lock = threading.Lock()
+        self.swept_at = time.time()
+
+    def take(self, takes):
+        """
+        Take tokens from buckets, given as (key, rate, burst, cost) tuples
+        Returns 0 if they were taken, otherwise the seconds until they can be,
+        and nothing is taken from any bucket. A cost above the burst takes the
+        whole bucket, so large uploads still pass.
+        """
+        now = time.time()
+        taken = []
+        with self.lock:
+            for key, rate, burst, cost in takes:
+                full_at = max(self.full_at.get(key, now), now) + min(cost, burst) / rate
+                wait = full_at - now - burst / rate
+                if wait > 0:
+                    return wait
+                taken.append((key, full_at))
+            self.full_at.update(taken)
+            if now - self.swept_at > SWEEP_INTERVAL:
+                self.full_at = {
+                    key: full_at
+                    for key, full_at in self.full_at.items()
+                    if full_at > now
+                }
+                self.swept_at = now
+        return 0.0
+
+
+buckets = TokenBuckets()
+
+
+def take(key, rate, burst, cost=1):
+    """
+    Take `cost` tokens from the bucket named `key`, see `TokenBuckets.take`
+    """
+    return buckets.take([(key, rate, burst, cost)])
+
+
+def create_upload_slots(capacity):
+    UploadSlot.objects.bulk_create(
+        [
+            UploadSlot(id=slot, expires_at=timezone.now())
+            for slot in range(1, capacity + 1)
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def acquire_upload_slot(capacity, lease):
+    """
+    Claim one of `capacity` upload slots for `lease` seconds
+    Returns the holder id to release it with, or None if all are taken.
+    """
+    now = timezone.now()
+    holder = uuid.uuid4()
+    with transaction.atomic():
+        slot = (
+            UploadSlot.objects.select_for_update(skip_locked=True)
+            .filter(id__lte=capacity, expires_at__lte=now)
+            .values_list("id", flat=True)
+            .first()
+        )
+        if slot is not None:
+            UploadSlot.objects.filter(id=slot).update(
+                holder=holder, expires_at=now + timedelta(seconds=lease)
+            )
+            return holder
+    if UploadSlot.objects.filter(id__lte=capacity).count() < capacity:
+        # First use, or the capacity was raised
+        create_upload_slots(capacity)
+        return acquire_upload_slot(capacity, lease)
+    return None
+
+
+def release_upload_slot(holder):
+    UploadSlot.objects.filter(holder=holder).update(
+        holder=None, expires_at=timezone.now()
+    )
@@ -0,0 +1,144 @@
+import math
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+
+from .limits import acquire_upload_slot, buckets, release_upload_slot
+
+API_PREFIX = "/api/"
+UPLOAD_METHODS = ("POST", "PUT")
+UPLOAD_CONTENT_TYPES = ("multipart/form-data", "application/octet-stream")
+# Seconds a refused upload is asked to wait for a free slot
+UPLOAD_RETRY_AFTER = 2
+# Scope key of requests admitted by `throttling.asgi.AdmissionApplication`
+ADMITTED = "throttling.admitted"
+
+
+def client_address(request):
+    """
+    Address of the client, from `RATE_LIMIT_CLIENT_HEADER` behind a proxy
+    For lists such as X-Forwarded-For the last entry is used, the one added by
+    the proxy in front of Django; earlier entries can be forged by clients.
+    """
+    header = settings.RATE_LIMIT_CLIENT_HEADER
+    value = request.headers.get(header, "") if header else ""
+    return value.rsplit(",", 1)[-1].strip() or request.META.get("REMOTE_ADDR", "")
+
+
+def is_upload(request):
+    return request.method in UPLOAD_METHODS and request.content_type in (
+        UPLOAD_CONTENT_TYPES
+    )
+
+
+def rejection(status, detail, retry_after):
+    response = JsonResponse({"detail": detail}, status=status)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def admit(request):
+    """
+    Take the request's tokens from its client's buckets
+    Returns a 429 response if the client is over a limit, otherwise None. A
+    request refused by one bucket takes nothing from the others.
+    """
+    client = client_address(request)
+    length = int(request.META.get("CONTENT_LENGTH") or 0)
+    takes = []
+    if settings.RATE_LIMIT_REQUESTS:
+        rate, burst = settings.RATE_LIMIT_REQUESTS, settings.RATE_LIMIT_REQUESTS_BURST
+        takes.append((f"requests:{client}", rate, burst, 1))
+    if settings.RATE_LIMIT_BYTES and length:
+        rate, burst = settings.RATE_LIMIT_BYTES, settings.RATE_LIMIT_BYTES_BURST
+        takes.append((f"bytes:{client}", rate, burst, length))
+    wait = buckets.take(takes)
+    if wait:
+        return rejection(
+            429,
+            f"Request was throttled. Expected available in {math.ceil(wait)} seconds.",
+            wait,
+        )
+    return None
+
+
+def acquire_slot(request):
+    """
+    Holder of an upload slot for uploads, None for other requests
+    Returns (holder, 503 response if every slot is taken).
+    """
+    capacity = settings.UPLOAD_MAX_CONCURRENT
+    if not (capacity and is_upload(request)):
+        return None, None
+    holder = acquire_upload_slot(capacity, settings.UPLOAD_SLOT_LEASE)
+    if holder is None:
+        return None, rejection(
+            503,
+            f"The server is handling {capacity} uploads, retry shortly",
+            UPLOAD_RETRY_AFTER,
+        )
+    return holder, None
+
+
+def needs_admission(request):
+    """
+    Whether the request is an API request not yet admitted at the ASGI level
+    """
+    scope = getattr(request, "scope", {})
+    return request.path.startswith(API_PREFIX) and not scope.get(ADMITTED)
+
+
+class AdmissionMiddleware:
+    """
+    Refuse API requests of clients over their rate limits with 429, and
+    uploads beyond `UPLOAD_MAX_CONCURRENT` in flight with 503, both with a
+    Retry-After header. See `throttling.limits`.
+
+    Under ASGI the body has been received by the time middleware runs, so
+    `throttling.asgi.AdmissionApplication` admits requests before that and
+    this middleware passes them on. It admits requests under WSGI, where the
+    body is only read by the view, and under ASGI without the wrapper.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not needs_admission(request):
+            return self.get_response(request)
+        rejected = admit(request)
+        if rejected:
+            return rejected
+        holder, rejected = acquire_slot(request)
+        if rejected:
+            return rejected
+        try:
+            return self.get_response(request)
+        finally:
+            if holder:
+                release_upload_slot(holder)
+
+    async def __acall__(self, request):
+        if not needs_admission(request):
+            return await self.get_response(request)
+        rejected = admit(request)
+        if rejected:
+            return rejected
+        holder, rejected = await sync_to_async(acquire_slot)(request)
+        if rejected:
+            return rejected
+        try:
+            return await self.get_response(request)
+        finally:
+            if holder:
+                await sync_to_async(release_upload_slot)(holder)
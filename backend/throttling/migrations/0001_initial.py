@@ -0,0 +1,65 @@
+# Generated by Django 4.2.10 on 2026-10-17 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="RateLimitBucket",
+            fields=[
+                (
+                    "key",
+                    models.CharField(
+                        max_length=200,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Key",
+                    ),
+                ),
+                (
+                    "full_at",
+                    models.FloatField(
+                        db_index=True,
+                        help_text="Unix time at which the bucket is full again",
+                        verbose_name="Full At",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Rate Limit Bucket",
+                "verbose_name_plural": "Rate Limit Buckets",
+            },
+        ),
+        migrations.CreateModel(
+            name="UploadSlot",
+            fields=[
+                (
+                    "id",
+                    models.PositiveIntegerField(
+                        primary_key=True, serialize=False, verbose_name="Slot"
+                    ),
+                ),
+                (
+                    "holder",
+                    models.UUIDField(
+                        blank=True, null=True, unique=True, verbose_name="Holder"
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="Expires At"),
+                ),
+            ],
+            options={
+                "verbose_name": "Upload Slot",
+                "verbose_name_plural": "Upload Slots",
+                "ordering": ["id"],
+            },
+        ),
+    ]
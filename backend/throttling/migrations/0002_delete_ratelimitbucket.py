@@ -0,0 +1,16 @@
+# Generated by Django 4.2.10 on 2026-10-17 09:52
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("throttling", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="RateLimitBucket",
+        ),
+    ]
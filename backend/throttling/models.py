@@ -0,0 +1,25 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class UploadSlot(models.Model):
+    """
+    One of the `UPLOAD_MAX_CONCURRENT` uploads allowed in flight at a time
+
+    A slot is free once its lease has expired, so slots held by a crashed
+    worker are reclaimed after `UPLOAD_SLOT_LEASE` seconds.
+    """
+
+    id = models.PositiveIntegerField(primary_key=True, verbose_name=_("Slot"))
+    holder = models.UUIDField(
+        blank=True, null=True, unique=True, verbose_name=_("Holder")
+    )
+    expires_at = models.DateTimeField(db_index=True, verbose_name=_("Expires At"))
+
+    class Meta:
+        verbose_name = _("Upload Slot")
+        verbose_name_plural = _("Upload Slots")
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"Upload slot {self.id}"
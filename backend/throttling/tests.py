@@ -0,0 +1,143 @@
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from . import limits
+from .asgi import AdmissionApplication
+from .limits import acquire_upload_slot, release_upload_slot, take
+from .middleware import ADMITTED, admit
+from .models import UploadSlot
+
+
+class BucketsMixin:
+    def setUp(self):
+        super().setUp()
+        self.buckets = limits.buckets
+        self.buckets.full_at.clear()
+
+
+class TakeTests(BucketsMixin, SimpleTestCase):
+    def test_burst_then_refused(self):
+        for _ in range(3):
+            self.assertEqual(take("client", rate=1, burst=3), 0)
+        wait = take("client", rate=1, burst=3)
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 1)
+
+    def test_cost_above_burst_takes_whole_bucket(self):
+        self.assertEqual(take("client", rate=1, burst=3, cost=10), 0)
+        self.assertGreater(take("client", rate=1, burst=3), 0)
+
+    def test_refused_take_takes_nothing(self):
+        take("client", rate=1, burst=3, cost=3)
+        full_at = self.buckets.full_at["client"]
+        take("client", rate=1, burst=3)
+        self.assertEqual(self.buckets.full_at["client"], full_at)
+
+    def test_full_buckets_are_swept(self):
+        take("idle", rate=1000, burst=1)
+        take("busy", rate=1, burst=3)
+        with mock.patch("time.time", return_value=self.buckets.swept_at + 61):
+            take("busy", rate=1, burst=3)
+        self.assertEqual(list(self.buckets.full_at), ["busy"])
+
+
+@override_settings(
+    RATE_LIMIT_REQUESTS=1,
+    RATE_LIMIT_REQUESTS_BURST=5,
+    RATE_LIMIT_BYTES=100,
+    RATE_LIMIT_BYTES_BURST=100,
+)
+class AdmitTests(BucketsMixin, SimpleTestCase):
+    def request(self, length=0):
+        return RequestFactory().post(
+            "/api/v1/files/",
+            data=b"x" * length,
+            content_type="application/octet-stream",
+        )
+
+    def test_over_request_limit(self):
+        for _ in range(5):
+            self.assertIsNone(admit(self.request()))
+        response = admit(self.request())
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_refused_by_bytes_takes_no_request_token(self):
+        self.assertIsNone(admit(self.request(length=100)))
+        for _ in range(3):
+            self.assertEqual(admit(self.request(length=50)).status_code, 429)
+        # Only the first request took a token, four of the burst of five remain
+        for _ in range(4):
+            self.assertIsNone(admit(self.request()))
+        self.assertEqual(admit(self.request()).status_code, 429)
+
+
+class UploadSlotTests(TestCase):
+    def test_capacity(self):
+        holders = [acquire_upload_slot(capacity=2, lease=60) for _ in range(3)]
+        self.assertIsNotNone(holders[0])
+        self.assertIsNotNone(holders[1])
+        self.assertIsNone(holders[2])
+
+        release_upload_slot(holders[0])
+        self.assertIsNotNone(acquire_upload_slot(capacity=2, lease=60))
+
+    def test_expired_lease_is_reclaimed(self):
+        self.assertIsNotNone(acquire_upload_slot(capacity=1, lease=0))
+        self.assertIsNotNone(acquire_upload_slot(capacity=1, lease=60))
+        self.assertEqual(UploadSlot.objects.count(), 1)
+
+
+@override_settings(
+    RATE_LIMIT_REQUESTS=0,
+    RATE_LIMIT_BYTES=100,
+    RATE_LIMIT_BYTES_BURST=100,
+    UPLOAD_MAX_CONCURRENT=1,
+)
+class AdmissionApplicationTests(BucketsMixin, TestCase):
+    async def call(self, application, length=100):
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/api/v1/files/",
+            "query_string": b"",
+            "headers": [
+                (b"content-type", b"application/octet-stream"),
+                (b"content-length", str(length).encode()),
+            ],
+            "client": ("10.0.0.1", 50000),
+        }
+        sent = []
+
+        async def receive():
+            self.fail("The body was read")
+
+        async def send(message):
+            sent.append(message)
+
+        await AdmissionApplication(application)(scope, receive, send)
+        return sent[0]["status"] if sent else None
+
+    async def test_refused_before_the_body_is_read(self):
+        scopes = []
+
+        async def application(scope, receive, send):
+            scopes.append(scope)
+
+        self.assertIsNone(await self.call(application))
+        self.assertTrue(scopes[0][ADMITTED])
+        self.assertEqual(await self.call(application), 429)
+        self.assertEqual(len(scopes), 1)
+
+    async def test_upload_holds_its_slot_until_the_response(self):
+        statuses = []
+
+        async def application(scope, receive, send):
+            statuses.append(await self.call(application, length=0))
+
+        await self.call(application, length=0)
+        self.assertEqual(statuses, [503])
+        self.assertFalse(
+            await UploadSlot.objects.filter(holder__isnull=False).aexists()
+        )
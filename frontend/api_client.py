@@ -0,0 +1,394 @@
+"""
+Client for the backend API
+
+One `ApiClient` holds a pooled HTTP session, so requests reuse kept-alive
+connections instead of opening one each, and at most `max_connections` are
+open at a time. Failed requests are retried with exponential backoff and full
+jitter: requests that are safe to repeat on connection errors and on 429, 502,
+503 and 504 responses, others only when they never reached the server or were
+refused by its rate limits or upload admission. Retry-After is honored.
+
+Uploads are sent straight from the bytes Streamlit holds in memory. `UploadRun`
+keeps up to N uploads in flight on an asyncio event loop in a background
+thread, each request running in the loop's thread pool with the shared
+session.
+"""
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+def refused(response):
+    """
+    Whether the server refused a request without handling it, so any request
+    may be retried safely: rate limited, or turned away with a Retry-After
+    """
+    return response.status_code == 429 or (
+        response.status_code == 503 and "Retry-After" in response.headers
+    )
+
+
+class ApiError(Exception):
+    """
+    Raised for responses with an unexpected status
+    """
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.detail = response.text
+        super().__init__(f"{response.status_code} - {response.text}")
+
+
+def never_sent(error):
+    """
+    Whether a failed request never reached the server, so any request may be
+    retried safely
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0] if error.args else None, "reason", None)
+    return isinstance(reason, NewConnectionError)
+
+
+def rewind(kwargs):
+    """
+    Seek the file objects of a request back to their start, as an earlier
+    attempt or read leaves them at their end
+    """
+    bodies = [kwargs.get("data")]
+    for item in kwargs.get("files") or []:
+        value = item[1] if isinstance(item, tuple) else item
+        bodies.append(value[1] if isinstance(value, tuple) else value)
+    for body in bodies:
+        if hasattr(body, "seek"):
+            body.seek(0)
+
+
+class ApiClient:
+    """
+    Pooled, retrying client for the backend API
+    """
+
+    def __init__(
+        self,
+        base_url,
+        public_url=None,
+        max_connections=10,
+        retries=3,
+        backoff=0.5,
+        max_backoff=10.0,
+        timeout=(5, 60),
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_url = f"{self.base_url}/api/v1"
+        self.public_url = public_url
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Blocks instead of opening more connections than the pool holds
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=max_connections, pool_block=True
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_env(cls, public_url=None):
+        return cls(
+            os.getenv("BACKEND_URL", "http://localhost:8000"),
+            public_url=public_url,
+            max_connections=int(os.getenv("API_MAX_CONNECTIONS", 10)),
+            retries=int(os.getenv("API_RETRIES", 3)),
+            backoff=float(os.getenv("API_RETRY_BACKOFF", 0.5)),
+        )
+
+    def delay(self, attempt, response=None):
+        """
+        Seconds to wait before retry number `attempt` (from 0), honoring a
+        Retry-After header in seconds
+        """
+        retry_after = None
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def request(self, method, path, retry=None, **kwargs):
+        """
+        Send a request to a path below /api/v1/ (or a full URL), retrying
+        failures; `retry` forces retrying a request that is not idempotent
+        """
+        url = path if "://" in path else f"{self.api_url}/{path.lstrip('/')}"
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.retries + 1):
+            rewind(kwargs)
+            response = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries or not (retry or never_sent(e)):
+                    raise
+            else:
+                retryable = retry and response.status_code in RETRY_STATUSES
+                if attempt == self.retries or not (retryable or refused(response)):
+                    return response
+                response.close()
+            time.sleep(self.delay(attempt, response))
+
+    def public(self, file):
+        """
+        File data with its URLs rewritten for browsers outside the backend's
+        network
+        """
+        if self.public_url:
+            for field in ("file_url", "thumbnail_url"):
+                if file.get(field):
+                    file[field] = file[field].replace(
+                        self.base_url, self.public_url.rstrip("/")
+                    )
+        return file
+
+    def expect(self, response, *statuses):
+        if response.status_code not in statuses:
+            raise ApiError(response)
+        return response
+
+    # Files
+
+    def list_files(self, etag=None):
+        """
+        (etag, files) of the first page of files, or (etag, None) if the
+        listing tagged `etag` is still current
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self.request("GET", "files/", headers=headers)
+        if response.status_code == 304:
+            return etag, None
+        self.expect(response, 200)
+        files = [self.public(file) for file in response.json().get("results", [])]
+        return response.headers.get("ETag"), files
+
+    def rename_file(self, file_id, name):
+        response = self.request(
+            "PATCH", f"files/{file_id}/", json={"user_defined_file_name": name}
+        )
+        return self.public(self.expect(response, 200).json())
+
+    def delete_file(self, file_id):
+        self.expect(self.request("DELETE", f"files/{file_id}/"), 204)
+
+    def delete_files(self, file_ids):
+        """
+        Delete files in one request, returning the number deleted
+        """
+        response = self.request(
+            "POST", "files/bulk-delete/", json={"ids": file_ids}, retry=True
+        )
+        results = self.expect(response, 200, 207).json()["results"]
+        return sum(result["status"] == 204 for result in results)
+
+    # Uploads
+
+    def upload_bulk(self, items, batch_id=None):
+        """
+        Upload small files in one request, given (file, user-defined name)
+        pairs; returns an (ok, file data or error) pair per file
+        """
+        path = f"batches/{batch_id}/files/" if batch_id else "files/bulk/"
+        response = self.request(
+            "POST",
+            path,
+            files=[("file", (file.name, file)) for file, _ in items],
+            data={"user_defined_file_name": [name or "" for _, name in items]},
+            timeout=(self.timeout[0], 300),
+        )
+        self.expect(response, 201, 207)
+        return [
+            (
+                (True, self.public(item["file"]))
+                if item["status"] == 201
+                else (False, f"Failed to upload file: {item['errors']}")
+            )
+            for item in response.json()["results"]
+        ]
+
+    def open_upload_session(self, file, name=None, batch_id=None):
+        data = {"original_file_name": file.name, "total_size": file.size}
+        if name:
+            data["user_defined_file_name"] = name
+        # A repeated session is harmless, it expires unused
+        response = self.request("POST", "uploads/", json=data, retry=True)
+        session = self.expect(response, 201).json()
+        if batch_id:
+            response = self.request(
+                "POST",
+                f"batches/{batch_id}/items/",
+                json={"sessions": [session["id"]]},
+                retry=True,
+            )
+            self.expect(response, 201)
+        return session
+
+    def get_upload_session(self, session_id):
+        response = self.request("GET", f"uploads/{session_id}/")
+        return response.json() if response.status_code == 200 else None
+
+    def upload_chunks(self, file, session, chunk_size):
+        """
+        Send the byte ranges of a file a session is missing, as views of the
+        file's buffer
+        """
+        buffer = file.getbuffer()
+        chunk_size = min(chunk_size, session["chunk_size"])
+        for start, end in session["missing_ranges"]:
+            for offset in range(start, end, chunk_size):
+                last = min(offset + chunk_size, end)
+                response = self.request(
+                    "PUT",
+                    f"uploads/{session['id']}/chunks/",
+                    data=buffer[offset:last],
+                    headers={
+                        "Content-Type": "application/octet-stream",
+                        "Content-Range": f"bytes {offset}-{last - 1}/{file.size}",
+                    },
+                )
+                self.expect(response, 200)
+
+    def finalize_upload_session(self, session_id):
+        # Finalizing again returns the same file
+        response = self.request("POST", f"uploads/{session_id}/finalize/", retry=True)
+        return self.public(self.expect(response, 201).json())
+
+    # Batches
+
+    def create_batch(self, total):
+        response = self.request("POST", "batches/", json={"total": total}, retry=True)
+        return self.expect(response, 201).json()
+
+    def follow_batch(self, batch_id):
+        """
+        (event, data) pairs of a batch's server-sent events, until the server
+        closes the stream
+        """
+        response = self.request(
+            "GET",
+            f"batches/{batch_id}/events/",
+            stream=True,
+            headers={"Accept": "text/event-stream"},
+        )
+        with self.expect(response, 200):
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: ") :]
+                elif line.startswith("data: ") and event:
+                    yield event, json.loads(line[len("data: ") :])
+                    event = None
+
+
+class UploadRun:
+    """
+    Uploads of a list of jobs in the background, with at most `concurrency`
+    requests in flight
+
+    A job is a list of (file, user-defined name) pairs: small files go
+    together through the bulk endpoint, a large file alone through an upload
+    session, where a failed chunk is retried without resending the others.
+    """
+
+    def __init__(self, client, jobs, concurrency, chunk_size, batch_id=None):
+        self.client = client
+        self.jobs = jobs
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.batch_id = batch_id
+        self.total = sum(len(job) for job in jobs)
+        self.completed = 0
+        self.results: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=asyncio.run, args=(self.run(),))
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    @property
+    def done(self):
+        return self.completed >= self.total
+
+    async def run(self):
+        # One thread per request in flight, each with a pooled connection
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(self.concurrency))
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def upload(job):
+            async with semaphore:
+                try:
+                    outcomes = await asyncio.to_thread(self.upload, job)
+                except Exception as e:
+                    outcomes = [(False, f"Error uploading file: {e}")] * len(job)
+            self.record(job, outcomes)
+
+        await asyncio.gather(*(upload(job) for job in self.jobs))
+
+    def upload(self, job):
+        if len(job) == 1 and job[0][0].size > self.chunk_size:
+            return [self.upload_resumable(*job[0])]
+        return self.client.upload_bulk(job, self.batch_id)
+
+    def upload_resumable(self, file, name=None) -> Tuple[bool, Any]:
+        session = self.client.open_upload_session(file, name, self.batch_id)
+        self.client.upload_chunks(file, session, self.chunk_size)
+        return True, self.client.finalize_upload_session(session["id"])
+
+    def record(self, job, outcomes):
+        with self.lock:
+            for (file, _), (success, result) in zip(job, outcomes):
+                self.results.append(
+                    {"filename": file.name, "success": success, "result": result}
+                )
+            self.completed += len(job)
+
+
+def plan_jobs(files, common_name, max_files, max_bytes, chunk_size):
+    """
+    Group files into upload jobs: files up to `chunk_size` in batches of at
+    most `max_files` files and `max_bytes`, larger files alone
+    Files are named `<common_name>_<n>.<ext>` if a common name is given.
+    """
+    jobs, batch, batch_size = [], [], 0
+    for i, file in enumerate(files):
+        name: Optional[str] = None
+        if common_name:
+            name = f"{common_name}_{i + 1}{os.path.splitext(file.name)[1]}"
+        if file.size > chunk_size:
+            jobs.append([(file, name)])
+            continue
+        if batch and (len(batch) >= max_files or batch_size + file.size > max_bytes):
+            jobs.append(batch)
+            batch, batch_size = [], 0
+        batch.append((file, name))
+        batch_size += file.size
+    if batch:
+        jobs.append(batch)
+    return jobs
@@ -1,34 +1,40 @@
 import os
 import streamlit as st
-import requests
 from dotenv import load_dotenv
-import tempfile
 import time
-import threading
-import queue
-from typing import List, Dict, Any
+
+from api_client import ApiClient, ApiError, UploadRun, plan_jobs
 
 # Load environment variables
 load_dotenv()
 
 # API Configuration
-BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
-API_URL = f"{BACKEND_URL}/api/v1"
-FILES_ENDPOINT = f"{API_URL}/files/"
+# Chunked upload configuration
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 4 * 1024 * 1024))
 
-# Thread configuration
-NUMBER_OF_WORKER_THREADS = int(os.getenv("NUMBER_OF_WORKER_THREADS", 10))
+# Files up to the chunk size are sent together through the bulk endpoint
+BULK_UPLOAD_MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", 100))
+BULK_UPLOAD_MAX_BYTES = int(os.getenv("BULK_UPLOAD_MAX_BYTES", 32 * 1024 * 1024))
 
-# Upload queue
-upload_queue = queue.Queue()
-upload_results: List[Dict[str, Any]] = []
-upload_in_progress = False
-upload_completed = 0
-upload_total = 0
+# Uploads kept in flight at once
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", 10))
 
 # Public URL for browser access
 PUBLIC_BACKEND_URL = "http://localhost:8888"  # Use the exposed port from docker-compose
 
+
+# One pooled client per server process, shared by every session and rerun
+@st.cache_resource
+def get_client():
+    return ApiClient.from_env(public_url=PUBLIC_BACKEND_URL)
+
+
+api = get_client()
+# Uploads started by this run, followed for progress
+upload_run = None
+# Server-side batch the current uploads belong to
+upload_batch_id = None
+
 # App title and configuration
 st.set_page_config(
     page_title="Invoice Parser",
@@ -72,198 +78,75 @@ st.markdown("Upload, manage, and process your invoice files")
 # Function to get all files
 def get_files():
     try:
-        response = requests.get(FILES_ENDPOINT)
-        if response.status_code == 200:
-            results = response.json().get("results", [])
-            # Fix URLs for browser access
-            for file in results:
-                if file.get("file_url"):
-                    file["file_url"] = file["file_url"].replace(
-                        "backend:8000", f"localhost:8888"
-                    )
-            return results
-        else:
-            st.error(f"Error fetching files: {response.status_code}")
-            return []
+        # Revalidate the last listing, the backend answers 304 if it is current
+        cached = st.session_state.get("files_listing")
+        etag, results = api.list_files(cached["etag"] if cached else None)
+        if results is None:
+            return cached["results"]
+        if etag:
+            st.session_state["files_listing"] = {"etag": etag, "results": results}
+        return results
+    except ApiError as e:
+        st.error(f"Error fetching files: {e.status_code}")
+        return []
     except Exception as e:
         st.error(f"Error connecting to API: {str(e)}")
         return []
 
 
-# Function to upload a file
-def upload_file(file, user_defined_name=None):
+# Function to open a server-side batch that reports upload and parse progress
+def create_batch(total):
     try:
-        # Create a temporary file with the same name
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=os.path.splitext(file.name)[1]
-        ) as tmp_file:
-            tmp_file.write(file.getbuffer())
-            tmp_file_path = tmp_file.name
-
-        # Prepare form data
-        files = {"file": open(tmp_file_path, "rb")}
-        data = {}
-        if user_defined_name:
-            data["user_defined_file_name"] = user_defined_name
-
-        # Send request with increased timeout
-        response = requests.post(FILES_ENDPOINT, files=files, data=data, timeout=60)
-
-        # Clean up temporary file
-        os.unlink(tmp_file_path)
-
-        if response.status_code == 201:
-            result = response.json()
-            # Fix URL for browser access
-            if result.get("file_url"):
-                result["file_url"] = result["file_url"].replace(
-                    "backend:8000", f"localhost:8888"
-                )
-            return True, result
-        else:
-            return (
-                False,
-                f"Failed to upload file: {response.status_code} - {response.text}",
-            )
-    except requests.exceptions.ConnectionError as e:
-        return False, f"Connection error: {str(e)}"
-    except requests.exceptions.Timeout as e:
-        return False, f"Request timed out: {str(e)}"
-    except Exception as e:
-        return False, f"Error uploading file: {str(e)}"
-
-
-# Worker function for the thread pool
-def upload_worker():
-    global upload_completed
-    while True:
-        # Get file from queue
-        try:
-            file_data = upload_queue.get()
-            if file_data is None:  # Sentinel value to terminate worker
-                upload_queue.task_done()
-                break
-
-            file, user_name = file_data
-
-            # Add retry logic
-            max_retries = 3
-            retry_delay = 2  # seconds
-            success = False
-            result = None
-
-            for attempt in range(max_retries):
-                if attempt > 0:
-                    # Wait before retrying
-                    time.sleep(retry_delay)
-                    retry_delay *= 2  # Exponential backoff
-
-                success, result = upload_file(file, user_name)
-                if success:
-                    break
-
-                # If it's a connection error, retry
-                if "Connection error" in str(result) or "timed out" in str(result):
-                    continue
-                else:
-                    # For other errors, don't retry
-                    break
-
-            # Store result
-            upload_results.append(
-                {
-                    "filename": file.name,
-                    "success": success,
-                    "result": result,
-                    "attempts": attempt + 1,
-                }
-            )
-
-            upload_completed += 1
-            upload_queue.task_done()
-        except Exception as e:
-            # Catch any unexpected errors in the worker thread itself
-            upload_results.append(
-                {
-                    "filename": file_data[0].name if file_data else "Unknown",
-                    "success": False,
-                    "result": f"Worker thread error: {str(e)}",
-                    "attempts": 0,
-                }
-            )
-            upload_completed += 1
-            upload_queue.task_done()
-
-
-# Start worker threads
-def start_upload_threads():
-    # Create and start worker threads
-    threads = []
-    for _ in range(NUMBER_OF_WORKER_THREADS):
-        t = threading.Thread(target=upload_worker, daemon=True)
-        t.start()
-        threads.append(t)
-    return threads
+        return api.create_batch(total)["id"]
+    except Exception:
+        # Uploads still work without progress events
+        return None
 
 
 # Process batch of files
 def process_files(files, common_name=None):
-    global upload_in_progress, upload_completed, upload_total, upload_results
-
-    # Reset counters
-    upload_completed = 0
-    upload_total = len(files)
-    upload_results = []
-    upload_in_progress = True
-
-    # Start worker threads
-    threads = start_upload_threads()
-
-    # Add files to queue with a small delay between each file
-    for i, file in enumerate(files):
-        # Generate custom name if common name is provided
-        custom_name = None
-        if common_name:
-            extension = os.path.splitext(file.name)[1]
-            custom_name = f"{common_name}_{i+1}{extension}"
-
-        # Add to queue
-        upload_queue.put((file, custom_name))
-        # Small delay between queuing files to avoid overwhelming the server
-        time.sleep(0.1)
-
-    # Return threads for potential cleanup later
-    return threads
+    global upload_run, upload_batch_id
+
+    upload_batch_id = create_batch(len(files))
+    # Small files go in batches through the bulk endpoint, large ones alone
+    jobs = plan_jobs(
+        files,
+        common_name,
+        BULK_UPLOAD_MAX_FILES,
+        BULK_UPLOAD_MAX_BYTES,
+        UPLOAD_CHUNK_SIZE,
+    )
+    upload_run = UploadRun(
+        api, jobs, UPLOAD_CONCURRENCY, UPLOAD_CHUNK_SIZE, upload_batch_id
+    ).start()
+    return upload_run
 
 
 # Function to delete a file
 def delete_file(file_id):
     try:
-        response = requests.delete(f"{FILES_ENDPOINT}{file_id}/")
-        return response.status_code == 204, response.status_code
+        api.delete_file(file_id)
+        return True, 204
+    except ApiError as e:
+        return False, e.status_code
     except Exception as e:
         return False, str(e)
 
 
+# Function to delete several files in one request
+def delete_files(file_ids):
+    try:
+        return api.delete_files(file_ids), None
+    except Exception as e:
+        return 0, str(e)
+
+
 # Function to update file name
 def update_file_name(file_id, new_name):
     try:
-        response = requests.patch(
-            f"{FILES_ENDPOINT}{file_id}/", json={"user_defined_file_name": new_name}
-        )
-        if response.status_code == 200:
-            result = response.json()
-            # Fix URL for browser access
-            if result.get("file_url"):
-                result["file_url"] = result["file_url"].replace(
-                    "backend:8000", f"localhost:8888"
-                )
-            return True, result
-        else:
-            return (
-                False,
-                f"Failed to update file name: {response.status_code} - {response.text}",
-            )
+        return True, api.rename_file(file_id, new_name)
+    except ApiError as e:
+        return False, f"Failed to update file name: {e}"
     except Exception as e:
         return False, f"Error updating file name: {str(e)}"
 
@@ -308,42 +191,85 @@ with tab1:
         if st.button("Upload Files", key="upload_btn", type="primary"):
             # Start uploading files
             with st.spinner(f"Preparing to upload {len(uploaded_files)} files..."):
-                threads = process_files(uploaded_files, common_name)
+                process_files(uploaded_files, common_name)
 
     # Display upload progress if in progress
-    if "upload_in_progress" in globals() and upload_in_progress:
+    if upload_run is not None:
         # Create a progress container that will be updated
         progress_container = st.container()
 
         with progress_container:
-            if upload_total > 0:
+            if upload_run.total > 0:
                 progress_bar = st.progress(0)
                 status_text = st.empty()
 
-                # Update progress until complete
-                while upload_completed < upload_total:
-                    # Calculate progress
-                    progress = upload_completed / upload_total
-                    progress_bar.progress(progress)
+                # Follow the batch's events until every file is parsed or failed
+                items = {}
+                if upload_batch_id:
+                    try:
+                        while True:
+                            progress = None
+                            for event, data in api.follow_batch(upload_batch_id):
+                                if event == "item":
+                                    items[data["id"]] = data
+                                elif event == "progress":
+                                    progress = data
+                                    finished = data["parsed"] + data["failed"]
+                                    progress_bar.progress(finished / data["total"])
+                                    status_text.text(
+                                        f"Parsed {data['parsed']} of {data['total']} "
+                                        f"files, {data['stored']} waiting to be "
+                                        f"parsed, {data['failed']} failed"
+                                    )
+                                if event == "done":
+                                    break
+                                # Files lost on the way never reach the batch
+                                if (
+                                    upload_run.done
+                                    and progress
+                                    and not progress["received"] + progress["stored"]
+                                ):
+                                    break
+                            if progress is None or progress["done"] or upload_run.done:
+                                break
+                            # The server closes long streams; reconnect and resume
+                    except Exception as e:
+                        st.warning(f"Lost track of the upload progress: {e}")
+
+                # Without a batch, or if it ends early, wait for the uploads
+                while not upload_run.done:
+                    progress_bar.progress(upload_run.completed / upload_run.total)
                     status_text.text(
-                        f"Uploading: {upload_completed} of {upload_total} completed"
+                        f"Uploading: {upload_run.completed} of {upload_run.total} "
+                        "completed"
                     )
-                    time.sleep(0.1)
+                    time.sleep(0.5)
 
                 # Final update
                 progress_bar.progress(1.0)
-                status_text.text(f"Upload complete: {upload_total} files processed")
+                status_text.text(f"Upload complete: {upload_run.total} files processed")
 
                 # Display results
                 st.subheader("Upload Results")
-                for result in upload_results:
+                names = set()
+                for item in items.values():
+                    names.add(item["name"])
+                    if item["status"] == "parsed":
+                        st.success(f"✅ {item['name']} uploaded and parsed")
+                    elif item["status"] == "failed":
+                        st.error(f"❌ {item['name']}: {item['error']}")
+                    else:
+                        st.info(f"⏳ {item['name']} uploaded, parsing continues")
+                for result in upload_run.results:
+                    if result["filename"] in names:
+                        continue
                     if result["success"]:
                         st.success(f"✅ {result['filename']} uploaded successfully")
                     else:
                         st.error(f"❌ {result['filename']}: {result['result']}")
 
                 # Reset upload state
-                upload_in_progress = False
+                upload_run = None
 
 # Tab 2: File Management
 with tab2:
@@ -362,13 +288,35 @@ with tab2:
     else:
         st.write(f"Found {len(files)} files")
 
+        # Delete several files at once
+        labels = {
+            f"{file.get('user_defined_file_name') or file.get('original_file_name')}"
+            f" ({file.get('id')[:8]})": file.get("id")
+            for file in files
+        }
+        selected = st.multiselect("Select files to delete", list(labels))
+        if selected and st.button("Delete Selected", type="primary"):
+            with st.spinner("Deleting..."):
+                deleted, error = delete_files([labels[label] for label in selected])
+                if error:
+                    st.error(f"Error: {error}")
+                else:
+                    st.success(f"{deleted} files deleted!")
+                    time.sleep(1)
+                    st.experimental_rerun()
+
         # Create a container for each file
         for file in files:
             with st.expander(
                 f"{file.get('user_defined_file_name') or file.get('original_file_name')}",
                 expanded=True,
             ):
-                col1, col2, col3 = st.columns([3, 1, 1])
+                col0, col1, col2, col3 = st.columns([1, 3, 1, 1])
+
+                with col0:
+                    # Small pre-rendered image, fetched and cached by the browser
+                    if file.get("thumbnail_url"):
+                        st.image(file["thumbnail_url"], width=80)
 
                 with col1:
                     st.write(f"**Original filename:** {file.get('original_file_name')}")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+"""
+Measure concurrent database writes under SQLite connection profiles
+
+Runs the backend's own write paths (bulk upload, rename, claiming parse jobs)
+and a file listing from several processes with several threads each, as the
+server workers and the parse worker do, against a fresh database per profile.
+Reports operations per second, latency percentiles and "database is locked"
+errors per operation. `default` is Django's stock SQLite setup, `tuned` the
+settings' defaults (WAL, synchronous=NORMAL, busy timeout, BEGIN IMMEDIATE).
+
+    python scripts/benchmark_database.py --processes 4 --threads 4 --duration 10
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+PROFILES = {
+    "default": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_BUSY_TIMEOUT": "5",
+        "SQLITE_TRANSACTION_MODE": "DEFERRED",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE": "-2000",
+    },
+    "tuned": {},
+}
+# Relative frequency of each operation
+OPERATIONS = {"upload": 4, "rename": 2, "claim": 2, "list": 4}
+
+
+def setup(env):
+    os.environ.update(env)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    sys.path.insert(0, str(BACKEND_DIR))
+    import django
+
+    django.setup()
+
+
+def operations():
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    from files.bulk import create_files, rename_files
+    from files.models import File
+    from parsing import queue
+
+    created = []
+
+    def upload():
+        content = f"Invoice {uuid.uuid4()}\nTotal: 10.00\n".encode()
+        upload = SimpleUploadedFile("invoice.txt", content, "text/plain")
+        result = create_files([upload], context={})[0]
+        created.append(result["file"]["id"])
+
+    def rename():
+        if created:
+            item = {"id": random.choice(created), "user_defined_file_name": "renamed"}
+            rename_files([item], context={})
+
+    def claim():
+        job = queue.claim_next()
+        if job is not None:
+            queue.fail(job, "benchmark", retry=False)
+
+    def listing():
+        list(File.objects.order_by("-uploaded_at")[:50])
+
+    return {"upload": upload, "rename": rename, "claim": claim, "list": listing}
+
+
+def work(env, threads, duration):
+    """
+    Run the operations on `threads` threads of this process, returning
+    latencies and errors per operation
+    """
+    setup(env)
+    from django.db import OperationalError, connection
+
+    latencies, errors = defaultdict(list), defaultdict(list)
+    deadline = time.monotonic() + duration
+
+    def loop():
+        ops = operations()
+        names = list(OPERATIONS)
+        weights = list(OPERATIONS.values())
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                ops[name]()
+            except OperationalError as e:
+                errors[name].append(str(e))
+                continue
+            latencies[name].append(time.perf_counter() - started)
+        connection.close()
+
+    pool = [threading.Thread(target=loop) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return dict(latencies), dict(errors)
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(profile, processes, threads, duration):
+    with tempfile.TemporaryDirectory() as root:
+        env = {
+            **PROFILES[profile],
+            "DATABASE_URL": f"sqlite:///{root}/db.sqlite3",
+            "MEDIA_ROOT": f"{root}/media",
+            "DEBUG": "0",
+        }
+        subprocess.run(
+            [sys.executable, "manage.py", "migrate", "--verbosity", "0"],
+            cwd=BACKEND_DIR,
+            env={**os.environ, **env},
+            check=True,
+        )
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(processes) as pool:
+            outcomes = pool.starmap(work, [(env, threads, duration)] * processes)
+
+    results = []
+    for name in OPERATIONS:
+        latencies = sorted(
+            value for latency, _ in outcomes for value in latency.get(name, [])
+        )
+        errors = [error for _, error in outcomes for error in error.get(name, [])]
+        result = {
+            "profile": profile,
+            "operation": name,
+            "operations": len(latencies),
+            "errors": len(errors),
+            "locked": sum("locked" in error for error in errors),
+            "per_second": round(len(latencies) / duration, 1),
+        }
+        if latencies:
+            result.update(
+                {
+                    "p50_ms": round(statistics.median(latencies) * 1000, 1),
+                    "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+                }
+            )
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--profile", action="append", choices=PROFILES, help="Profile to run (repeat)"
+    )
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4, help="Per process")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds each")
+    args = parser.parse_args()
+
+    for profile in args.profile or list(PROFILES):
+        for result in run(profile, args.processes, args.threads, args.duration):
+            print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
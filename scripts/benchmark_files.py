@@ -0,0 +1,320 @@
+#!/usr/bin/env python
+"""
+Measure the files API of a running backend under load
+
+Runs each scenario (upload, listing a first and a deep page, retrieve, rename
+and delete) for a while at a fixed number of keep-alive connections, and
+prints one JSON document with throughput and p50/p95/p99 latency per
+scenario. Seed the database first, for example with
+`python manage.py seed_files 100000`, so listings and lookups see a
+realistic table. A result saved with --save can be passed as --baseline to a
+later run, which then reports the change per scenario and exits with status 1
+if throughput dropped or p95 latency rose by more than --tolerance percent.
+Uses only the standard library.
+
+    python scripts/benchmark_files.py http://localhost:8888 \
+        --concurrency 16 --duration 20 --save baseline.json
+    python scripts/benchmark_files.py http://localhost:8888 --baseline baseline.json
+"""
+
+import argparse
+import http.client
+import json
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlsplit
+
+SCENARIOS = ["upload", "list", "list_deep", "retrieve", "rename", "delete"]
+FILES_PATH = "/api/v1/files/"
+PAGE_SIZE = 50
+JSON_HEADERS = {"Accept": "application/json"}
+
+
+def connect(url):
+    parts = urlsplit(url)
+    if parts.scheme == "https":
+        return http.client.HTTPSConnection(parts.netloc, timeout=60)
+    return http.client.HTTPConnection(parts.netloc, timeout=60)
+
+
+def fetch_json(url, path):
+    connection = connect(url)
+    try:
+        connection.request("GET", path, headers=JSON_HEADERS)
+        response = connection.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise SystemExit(f"GET {path} answered {response.status}: {body[:200]}")
+        return json.loads(body)
+    finally:
+        connection.close()
+
+
+def cursor_of(link):
+    return parse_qs(urlsplit(link).query)["cursor"][0] if link else None
+
+
+class Target:
+    """
+    Files the scenarios work on, shared by all connections
+
+    `ids` are existing files to read and rename, sampled while walking the
+    listing; `deep_cursor` points `deep_rows` rows into the listing. Files
+    uploaded by the run are deleted before any seeded ones.
+    """
+
+    def __init__(self, url, deep_rows, sample_size):
+        self.lock = threading.Lock()
+        self.uploaded = []
+        self.ids = []
+        self.deep_cursor = None
+        self.total = fetch_json(url, f"{FILES_PATH}?page_size=1&count=true")["count"]
+
+        walked, cursor = 0, None
+        while walked < deep_rows:
+            size = min(500, deep_rows - walked)
+            query = f"?page_size={size}" + (f"&cursor={cursor}" if cursor else "")
+            page = fetch_json(url, FILES_PATH + query)
+            self.ids.extend(file["id"] for file in page["results"])
+            walked += len(page["results"])
+            cursor = cursor_of(page["next"])
+            if cursor is None:
+                break
+        self.deep_cursor = cursor
+        self.deep_rows = walked
+        self.ids = random.sample(self.ids, min(sample_size, len(self.ids)))
+
+    def pick(self):
+        return random.choice(self.ids) if self.ids else None
+
+    def add_upload(self, file_id):
+        with self.lock:
+            self.uploaded.append(file_id)
+
+    def take_for_delete(self):
+        with self.lock:
+            if self.uploaded:
+                return self.uploaded.pop()
+            if self.ids:
+                return self.ids.pop()
+        return None
+
+
+def multipart(content):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="invoice.txt"\r\n'
+        "Content-Type: text/plain\r\n\r\n"
+    ).encode()
+    body += content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def upload(target):
+    content = f"Invoice {uuid.uuid4()}\nTotal: 10.00\n".encode()
+    body, content_type = multipart(content)
+    headers = {**JSON_HEADERS, "Content-Type": content_type}
+    return "POST", FILES_PATH, body, headers, 201
+
+
+def listing(target):
+    return "GET", f"{FILES_PATH}?page_size={PAGE_SIZE}", None, JSON_HEADERS, 200
+
+
+def listing_deep(target):
+    if target.deep_cursor is None:
+        return None
+    path = f"{FILES_PATH}?page_size={PAGE_SIZE}&cursor={target.deep_cursor}"
+    return "GET", path, None, JSON_HEADERS, 200
+
+
+def retrieve(target):
+    return "GET", f"{FILES_PATH}{target.pick()}/", None, JSON_HEADERS, 200
+
+
+def rename(target):
+    body = json.dumps({"user_defined_file_name": f"bench-{uuid.uuid4().hex[:8]}"})
+    headers = {**JSON_HEADERS, "Content-Type": "application/json"}
+    return "PATCH", f"{FILES_PATH}{target.pick()}/", body.encode(), headers, 200
+
+
+def delete(target):
+    file_id = target.take_for_delete()
+    if file_id is None:
+        return None
+    return "DELETE", f"{FILES_PATH}{file_id}/", None, JSON_HEADERS, 204
+
+
+REQUESTS = {
+    "upload": upload,
+    "list": listing,
+    "list_deep": listing_deep,
+    "retrieve": retrieve,
+    "rename": rename,
+    "delete": delete,
+}
+
+
+def load(url, scenario, target, deadline, latencies, errors):
+    make_request = REQUESTS[scenario]
+    connection = connect(url)
+    while time.monotonic() < deadline:
+        request = make_request(target)
+        if request is None:
+            break
+        method, path, body, headers, expected = request
+        started = time.perf_counter()
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append("connection")
+            connection.close()
+            connection = connect(url)
+            continue
+        elapsed = time.perf_counter() - started
+        if response.status != expected:
+            errors.append(response.status)
+            continue
+        latencies.append(elapsed)
+        if scenario == "upload":
+            target.add_upload(json.loads(data)["id"])
+    connection.close()
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(url, scenario, target, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=load, args=(url, scenario, target, deadline, latencies, errors)
+        )
+        for _ in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    result = {"requests": len(latencies), "errors": len(errors)}
+    if latencies:
+        result.update(
+            {
+                "requests_per_second": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(statistics.median(latencies) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            }
+        )
+    return result
+
+
+def change(current, baseline):
+    return round((current - baseline) / baseline * 100, 1) if baseline else None
+
+
+def compare(results, baseline, tolerance):
+    """
+    Percent change of throughput and p95 latency per scenario against a
+    baseline, flagging changes beyond the tolerance as regressions
+    """
+    comparison = {}
+    for scenario, result in results.items():
+        before = baseline["results"].get(scenario)
+        if not before or "p95_ms" not in before or "p95_ms" not in result:
+            continue
+        throughput = change(
+            result["requests_per_second"], before["requests_per_second"]
+        )
+        p95 = change(result["p95_ms"], before["p95_ms"])
+        comparison[scenario] = {
+            "requests_per_second_change": throughput,
+            "p95_change": p95,
+            "regression": (throughput is not None and throughput < -tolerance)
+            or (p95 is not None and p95 > tolerance),
+        }
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("url", help="Base URL of the backend")
+    parser.add_argument(
+        "--scenario", action="append", choices=SCENARIOS, help="Scenario (repeat)"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds each")
+    parser.add_argument(
+        "--deep-rows",
+        type=int,
+        default=10000,
+        help="How far into the listing the deep page starts",
+    )
+    parser.add_argument(
+        "--sample", type=int, default=5000, help="Files to retrieve and rename"
+    )
+    parser.add_argument("--save", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare with results saved by --save")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=10,
+        help="Percent change of throughput or p95 counted as a regression",
+    )
+    args = parser.parse_args()
+
+    scenarios = args.scenario or SCENARIOS
+    target = Target(args.url, args.deep_rows, args.sample)
+    if not target.ids:
+        raise SystemExit("No files to benchmark, seed some with manage.py seed_files")
+
+    report = {
+        "meta": {
+            "url": args.url,
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "files": target.total,
+            "deep_rows": target.deep_rows,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "page_size": PAGE_SIZE,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": {},
+    }
+    for scenario in scenarios:
+        report["results"][scenario] = run(
+            args.url, scenario, target, args.concurrency, args.duration
+        )
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as saved:
+            comparison = compare(report["results"], json.load(saved), args.tolerance)
+        report["comparison"] = comparison
+        regressed = any(scenario["regression"] for scenario in comparison.values())
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.save:
+        with open(args.save, "w") as out:
+            out.write(output + "\n")
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Measure request throughput of a running backend
+
+Keeps a fixed number of keep-alive connections busy for a while and reports
+requests per second and latency percentiles per path. Optionally keeps slow
+clients trickling upload bodies in the background, to see how a server copes
+with them. Uses only the standard library.
+
+    python scripts/benchmark_serving.py http://localhost:8888 \
+        --path /health/ --path /api/v1/files/ --concurrency 16 --duration 20
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def connect(url):
+    parts = urlsplit(url)
+    if parts.scheme == "https":
+        return http.client.HTTPSConnection(parts.netloc, timeout=60)
+    return http.client.HTTPConnection(parts.netloc, timeout=60)
+
+
+def load(url, path, deadline, latencies, errors):
+    connection = connect(url)
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request("GET", path, headers={"Accept": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 400:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException):
+            errors.append("connection")
+            connection.close()
+            connection = connect(url)
+            continue
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+
+
+def trickle(url, deadline, rate):
+    """
+    Upload a file body at `rate` bytes per second until the deadline
+    """
+    body_size = 10 * 1024 * 1024
+    connection = connect(url)
+    connection.putrequest("POST", "/api/v1/files/")
+    connection.putheader("Content-Type", "multipart/form-data; boundary=x")
+    connection.putheader("Content-Length", str(body_size))
+    connection.endheaders()
+    try:
+        while time.monotonic() < deadline:
+            connection.send(b"-" * rate)
+            time.sleep(1)
+    except OSError:
+        pass
+    connection.close()
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def run(url, path, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=load, args=(url, path, deadline, latencies, errors))
+        for _ in range(concurrency)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    latencies.sort()
+    result = {"path": path, "requests": len(latencies), "errors": len(errors)}
+    if latencies:
+        result.update(
+            {
+                "requests_per_second": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(statistics.median(latencies) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            }
+        )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("url", help="Base URL of the backend")
+    parser.add_argument("--path", action="append", help="Path to request (repeat)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per path")
+    parser.add_argument(
+        "--slow-clients",
+        type=int,
+        default=0,
+        help="Connections uploading at 1KB/s while the paths are measured",
+    )
+    args = parser.parse_args()
+
+    paths = args.path or ["/health/", "/api/v1/files/"]
+    deadline = time.monotonic() + args.duration * len(paths) + 5
+    for _ in range(args.slow_clients):
+        threading.Thread(
+            target=trickle, args=(args.url, deadline, 1024), daemon=True
+        ).start()
+    time.sleep(1 if args.slow_clients else 0)
+
+    for path in paths:
+        print(json.dumps(run(args.url, path, args.concurrency, args.duration)))
+
+
+if __name__ == "__main__":
+    main()